@@ -5,12 +5,36 @@ import time
 from mlgame.argument.cmd_argument import parse_cmd_and_get_arg_obj
 from mlgame.argument.tool import revise_ai_clients
 from mlgame.game.paia_game import get_paia_game_obj
+from mlgame.utils.enum import ExecutionMode
 from mlgame.utils.logger import logger
 
 if __name__ == '__main__':
     import os
     os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
+    if sys.argv[1:2] == ["tournament"]:
+        from mlgame.argument.cmd_argument import parse_tournament_cmd_and_get_arg_obj
+        from mlgame.core.tournament import load_tournament_manifest, run_tournament
+
+        tournament_arg = parse_tournament_cmd_and_get_arg_obj(sys.argv[2:])
+        matches = load_tournament_manifest(str(tournament_arg.manifest))
+        success_count = run_tournament(matches, str(tournament_arg.output), tournament_arg.workers)
+        print(f"{success_count}/{len(matches)} matches are finished. Results are saved in {tournament_arg.output}")
+        sys.exit()
+
+    if sys.argv[1:2] == ["render-replay"]:
+        from mlgame.argument.cmd_argument import parse_render_replay_cmd_and_get_arg_obj
+        from mlgame.core.replay_renderer import render_replay
+
+        render_arg = parse_render_replay_cmd_and_get_arg_obj(sys.argv[2:])
+        start_time = time.perf_counter()
+        image_count = render_replay(
+            str(render_arg.progress_folder), str(render_arg.output_folder), render_arg.workers,
+            render_arg.start_frame, render_arg.stop_frame, render_arg.image_format)
+        print(f"{image_count} images are saved in {render_arg.output_folder} "
+              f"in {time.perf_counter() - start_time:.2f} s")
+        sys.exit()
+
     # 1. parse command line
     arg_obj = parse_cmd_and_get_arg_obj(sys.argv[1:])
 
@@ -28,10 +52,13 @@ if __name__ == '__main__':
 
     print(f"===========Game is started at {datetime.datetime.now()}===========")
     from mlgame.core.communication import GameCommManager
-    from mlgame.core.process import create_process_of_ai_clients_and_start, create_process_of_ws_and_start, create_process_of_progress_log_and_start, terminate
+    from mlgame.core.process import create_process_of_ai_clients_and_start, create_process_of_ws_and_start, create_process_of_progress_log_and_start, terminate, \
+        create_in_process_ai_clients_and_start
     from mlgame.core.executor import GameExecutor
     from mlgame.view.view import PygameView, DummyPygameView
     game_comm = GameCommManager()
+    if arg_obj.progress_delta:
+        game_comm.enable_progress_delta(arg_obj.progress_keyframe_interval)
     try:
         if arg_obj.ws_url:
             # prepare transmitter for game executor
@@ -39,24 +66,41 @@ if __name__ == '__main__':
         
         if arg_obj.progress_folder:
             # prepare transmitter for game executor
-            progress_proc = create_process_of_progress_log_and_start(game_comm, arg_obj.progress_folder, arg_obj.progress_frame_frequency)
+            progress_proc = create_process_of_progress_log_and_start(
+                game_comm, arg_obj.progress_folder, arg_obj.progress_frame_frequency,
+                arg_obj.progress_compress_level, arg_obj.progress_format)
 
         # 4. prepare ai_clients , create pipe, start ai_client process
+        if arg_obj.execution_mode == ExecutionMode.TURBO:
+            # turbo mode is always headless
+            arg_obj.no_display = True
         if arg_obj.no_display:
             game_view = DummyPygameView(game.get_scene_init_data())
         else:
-            game_view = PygameView(game.get_scene_init_data())
-        ai_process = create_process_of_ai_clients_and_start(
-            game_comm=game_comm,
-            path_of_ai_clients=path_of_ai_clients,
-            game_params=parsed_game_params
-        )
+            game_view = PygameView(game.get_scene_init_data(), dirty_rect=arg_obj.dirty_rect)
+        if arg_obj.in_process:
+            create_in_process_ai_clients_and_start(
+                game_comm=game_comm,
+                path_of_ai_clients=path_of_ai_clients,
+                game_params=parsed_game_params
+            )
+        else:
+            ai_process = create_process_of_ai_clients_and_start(
+                game_comm=game_comm,
+                path_of_ai_clients=path_of_ai_clients,
+                game_params=parsed_game_params,
+                use_shared_memory=arg_obj.shared_memory,
+                shm_capacity=arg_obj.shm_capacity * 1024 * 1024
+            )
 
         # 5. run game in main process
         game_executor = GameExecutor(
             game, game_comm, game_view,
             fps=arg_obj.fps, one_shot_mode=arg_obj.one_shot_mode, no_display=arg_obj.no_display,
-            output_folder=arg_obj.output_folder
+            output_folder=arg_obj.output_folder, execution_mode=arg_obj.execution_mode,
+            ml_init_timeout=arg_obj.ai_init_timeout,
+            capture_stride=arg_obj.capture_stride, capture_policy=arg_obj.capture_policy,
+            capture_queue_size=arg_obj.capture_queue_size, dataset_folder=arg_obj.dataset_folder
         )
         time.sleep(0.1)
         game_executor.run()
@@ -5,7 +5,9 @@ from argparse import ArgumentParser, REMAINDER
 
 import pydantic
 
-from mlgame.argument.model import MLGameArgument
+from mlgame.argument.model import MLGameArgument, TournamentArgument, RenderReplayArgument
+from mlgame.core.env import AI_INIT_TIMEOUT
+from mlgame.utils.enum import ExecutionMode, ProgressFormat, CapturePolicy
 from mlgame.utils.logger import logger
 from mlgame.version import version
 
@@ -40,6 +42,23 @@ def create_cli_args_parser():
     group.add_argument("-f", "--fps", type=int, default=30,
                        help="the updating frequency of the game process [default: %(default)s]")
 
+    group.add_argument("--mode", type=str.upper, default=ExecutionMode.REALTIME.value,
+                       dest="execution_mode",
+                       choices=[mode.value for mode in ExecutionMode],
+                       help="the way to wait for the commands of AI clients at each frame. "
+                            "REALTIME waits a whole frame (1 / fps), "
+                            "BARRIER moves on as soon as all AI clients replied "
+                            "and uses 1 / fps as the deadline. "
+                            "TURBO works like BARRIER without display, "
+                            "and skips the drawing data if nobody uses it. [default: %(default)s]")
+
+    group.add_argument("--ai-init-timeout", type=float, default=AI_INIT_TIMEOUT,
+                       dest="ai_init_timeout", metavar="SECONDS",
+                       help="the seconds to wait for AI clients to be ready before the game starts. "
+                            "The AI clients which are not ready in time are removed from the game. "
+                            "The default could also be set by the environment variable `AI_INIT_TIMEOUT`. "
+                            "[default: %(default)s]")
+
     group.add_argument("-1", "--one-shot", action="store_true",
                        dest="one_shot_mode",
                        help="quit the game when the game is passed or is over. "
@@ -47,6 +66,24 @@ def create_cli_args_parser():
     group.add_argument("--nd", "--no-display", action="store_true",
                        dest="no_display", default=False,
                        help="didn't display the game on screen. [default: %(default)s]")
+    group.add_argument("--dirty-rect", action="store_true",
+                       dest="dirty_rect", default=False,
+                       help="only redraw the areas of the screen changed since the last frame, "
+                            "which is faster for the games with mostly static objects. [default: %(default)s]")
+    group.add_argument("--in-process", action="store_true",
+                       dest="in_process", default=False,
+                       help="run AI clients inside the game process instead of launching a process for each of them. "
+                            "It removes the communication overhead, "
+                            "so only use it with trusted AI clients. [default: %(default)s]")
+    group.add_argument("--shm", "--shared-memory", action="store_true",
+                       dest="shared_memory", default=False,
+                       help="send the scene information to AI processes through shared memory instead of pipes. "
+                            "It is faster for the games sending large observations. [default: %(default)s]")
+    group.add_argument("--shm-capacity", type=int, default=4,
+                       dest="shm_capacity", metavar="MB",
+                       help="the size in MB of the shared memory for each AI process when `--shm` is set. "
+                            "The scene information which doesn't fit in it is sent through the pipe. "
+                            "[default: %(default)s]")
     group.add_argument("--ws_url",
                        type=str,
                        dest="ws_url",
@@ -70,6 +107,25 @@ def create_cli_args_parser():
                        help="Save each frame of game progress into destination folder."
                             "This folder should be existed and it will create a timestamp folder."
                        )
+    group.add_argument("--capture-stride", type=int, default=1,
+                       dest="capture_stride", metavar="N",
+                       help="save a frame every N frames into the output folder [default: %(default)s]")
+    group.add_argument("--capture-policy", type=str.upper, default=CapturePolicy.BLOCK.value,
+                       dest="capture_policy",
+                       choices=[policy.value for policy in CapturePolicy],
+                       help="what to do when the frames are captured faster than they are saved. "
+                            "BLOCK waits for the saving, DROP skips the frame. [default: %(default)s]")
+    group.add_argument("--capture-queue-size", type=int, default=8,
+                       dest="capture_queue_size", metavar="SIZE",
+                       help="the number of captured frames waiting to be saved [default: %(default)s]")
+    group.add_argument("--dataset-folder",
+                       type=os.path.abspath,
+                       dest="dataset_folder",
+                       default=None, metavar="FOLDER",
+                       help="Record the scene information and the commands of each AI client into destination folder "
+                            "as a columnar dataset for training. "
+                            "It will create a timestamp folder, and an episode folder for each round of the game."
+                       )
     group.add_argument("-r", "--progress-folder",
                        # type=validate_file,
                        type=os.path.abspath,
@@ -81,6 +137,26 @@ def create_cli_args_parser():
 
     group.add_argument("-p", "--progress-frame-frequency", type=int, default=300,
                     help="the frequency of the game progress save [default: %(default)s]")
+    group.add_argument("--progress-format", type=str.upper, default=ProgressFormat.NDJSON.value,
+                       dest="progress_format",
+                       choices=[progress_format.value for progress_format in ProgressFormat],
+                       help="the file format of the game progress. "
+                            "NDJSON writes a chunk file every `--progress-frame-frequency` frames, "
+                            "REPLAY writes a single indexed replay file `replay.mlgr` "
+                            "with a keyframe every `--progress-frame-frequency` frames. [default: %(default)s]")
+    group.add_argument("--progress-compress-level", type=int, choices=range(0, 10), default=0,
+                       dest="progress_compress_level", metavar="LEVEL",
+                       help="the gzip compression level of the game progress files, "
+                            "0 means no compression. [default: %(default)s]")
+    group.add_argument("--progress-delta", action="store_true",
+                       dest="progress_delta", default=False,
+                       help="send only the changed view objects of each frame to the websocket, "
+                            "progress log and display processes, "
+                            "which rebuild the full game progress from them. [default: %(default)s]")
+    group.add_argument("--progress-keyframe-interval", type=int, default=300,
+                       dest="progress_keyframe_interval", metavar="FRAMES",
+                       help="send the full game progress every FRAMES frames when `--progress-delta` is set "
+                            "[default: %(default)s]")
     return parser
 
 
@@ -95,3 +171,67 @@ def parse_cmd_and_get_arg_obj(arg_str: list) -> MLGameArgument:
 
     arg_obj = MLGameArgument(**parsed_args.__dict__)
     return arg_obj
+
+
+def create_tournament_args_parser():
+    """
+    Generate an ArgumentParser for parse the arguments of the tournament in the command line
+    """
+    parser = ArgumentParser(usage="python -m mlgame tournament [options] <manifest>",
+                            description="Run the matches listed in the manifest over a pool of processes "
+                                        "and save the game results into one file.")
+    parser.add_argument("manifest", type=os.path.abspath,
+                        help="the json file listing game folder, game params and AI clients of each match")
+    parser.add_argument("-o", "--output", type=os.path.abspath, default=os.path.abspath("tournament_result.ndjson"),
+                        help="the file to append the result of each match as a line of json [default: %(default)s]")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="the number of worker processes [default: the number of cpu cores]")
+    return parser
+
+
+def parse_tournament_cmd_and_get_arg_obj(arg_str: list) -> TournamentArgument:
+    arg_parser = create_tournament_args_parser()
+    parsed_args = arg_parser.parse_args(arg_str)
+    try:
+        arg_obj = TournamentArgument(**parsed_args.__dict__)
+    except pydantic.ValidationError as e:
+        logger.exception(f"Error in parsing command : {e.__str__()}")
+        arg_parser.print_help()
+        sys.exit()
+    return arg_obj
+
+
+def create_render_replay_args_parser():
+    """
+    Generate an ArgumentParser for parse the arguments of rendering the progress log in the command line
+    """
+    parser = ArgumentParser(usage="python -m mlgame render-replay [options] <progress_folder>",
+                            description="Redraw the frames saved by the progress log (-r) into images "
+                                        "over a pool of headless processes.")
+    parser.add_argument("progress_folder", type=os.path.abspath,
+                        help="the folder created by the progress log, "
+                             "which contains game_info.json and the progress files")
+    parser.add_argument("-o", "--output-folder", type=os.path.abspath, dest="output_folder", default=None,
+                        help="the folder to save the images [default: <progress_folder>/images]")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="the number of worker processes [default: the number of cpu cores]")
+    parser.add_argument("--start", type=int, default=0, dest="start_frame",
+                        help="the first frame to draw [default: %(default)s]")
+    parser.add_argument("--stop", type=int, default=None, dest="stop_frame",
+                        help="draw the frames before this frame [default: the last frame]")
+    parser.add_argument("--image-format", type=str.lower, default="jpg", dest="image_format",
+                        choices=["jpg", "png", "bmp", "tga"],
+                        help="the format of the images [default: %(default)s]")
+    return parser
+
+
+def parse_render_replay_cmd_and_get_arg_obj(arg_str: list) -> RenderReplayArgument:
+    arg_parser = create_render_replay_args_parser()
+    parsed_args = arg_parser.parse_args(arg_str)
+    try:
+        arg_obj = RenderReplayArgument(**parsed_args.__dict__)
+    except pydantic.ValidationError as e:
+        logger.exception(f"Error in parsing command : {e.__str__()}")
+        arg_parser.print_help()
+        sys.exit()
+    return arg_obj
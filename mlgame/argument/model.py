@@ -5,6 +5,8 @@ from typing import Union, List, Optional
 import pydantic
 from pydantic import FilePath, validator, DirectoryPath
 from pathlib import Path
+from mlgame.core.env import AI_INIT_TIMEOUT
+from mlgame.utils.enum import ExecutionMode, ProgressFormat, CapturePolicy
 from mlgame.utils.io import check_folder_existed_and_readable_or_create
 
 
@@ -13,15 +15,29 @@ class MLGameArgument(pydantic.BaseModel):
     Data Entity to handle parsed cli arguments
     """
     fps: int = 30
+    execution_mode: ExecutionMode = ExecutionMode.REALTIME
+    ai_init_timeout: pydantic.PositiveFloat = AI_INIT_TIMEOUT
     progress_frame_frequency: int = 300
+    progress_compress_level: int = 0
+    progress_format: ProgressFormat = ProgressFormat.NDJSON
+    progress_delta: bool = False
+    progress_keyframe_interval: pydantic.PositiveInt = 300
     one_shot_mode: bool = False
     ai_clients: Optional[List[FilePath]] = None
     no_display: bool = True
+    dirty_rect: bool = False
+    in_process: bool = False
+    shared_memory: bool = False
+    shm_capacity: pydantic.PositiveInt = 4
     ws_url: pydantic.AnyUrl = None
     game_folder: DirectoryPath
     game_params: List[str]
     output_folder: Union[Path, None] = None
+    capture_stride: pydantic.PositiveInt = 1
+    capture_policy: CapturePolicy = CapturePolicy.BLOCK
+    capture_queue_size: pydantic.PositiveInt = 8
     progress_folder: Union[Path, None] = None
+    dataset_folder: Union[Path, None] = None
 
 
     @validator('output_folder')
@@ -35,7 +51,7 @@ class MLGameArgument(pydantic.BaseModel):
         if check_folder_existed_and_readable_or_create(path):
             return path
 
-    @validator('progress_folder')
+    @validator('progress_folder', 'dataset_folder')
     def update_progress_folder(cls, v, values):
         if v is None:
             return None
@@ -47,6 +63,33 @@ class MLGameArgument(pydantic.BaseModel):
             return path
 
 
+class TournamentArgument(pydantic.BaseModel):
+    """
+    Data Entity to handle parsed cli arguments of the tournament
+    """
+    manifest: FilePath
+    output: Path
+    workers: Optional[pydantic.PositiveInt] = None
+
+
+class RenderReplayArgument(pydantic.BaseModel):
+    """
+    Data Entity to handle parsed cli arguments of rendering the progress log
+    """
+    progress_folder: DirectoryPath
+    output_folder: Optional[Path] = None
+    workers: Optional[pydantic.PositiveInt] = None
+    start_frame: int = 0
+    stop_frame: Optional[int] = None
+    image_format: str = "jpg"
+
+    @validator('output_folder', always=True)
+    def update_output_folder(cls, v, values):
+        if v is None and 'progress_folder' in values:
+            return values['progress_folder'] / "images"
+        return v
+
+
 class UserNumConfig(pydantic.BaseModel):
     """
     Data Entity to handle user_num in game_config.json
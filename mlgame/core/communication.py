@@ -1,10 +1,20 @@
+import time
+from multiprocessing.connection import wait
+from multiprocessing.reduction import ForkingPickler
 from threading import Thread
 from queue import Queue
 
 from mlgame.core.exceptions import GameError
+from mlgame.core.progress_delta import ProgressDeltaEncoder, ProgressDeltaDecoder
+from mlgame.view.view_model import VIEW_LIST_KEYS
+from mlgame.view.wire_format import MAGIC, encode_scene_progress, decode_scene_progress
 
 from mlgame.core.env import WS_WAIT_GAME_TIMEOUT
 
+# The bytes sent to the transition processes at the end of the game.
+# They are neither pickled data nor the wire format of view objects.
+END_OF_STREAM = b"MLGAME_END_OF_STREAM"
+
 
 class CommunicationHandler:
     """
@@ -41,12 +51,51 @@ class CommunicationHandler:
     def poll(self):
         return self._recv_end.poll()
 
+    def is_waitable(self):
+        """
+        Check whether the receiving object could be waited by `multiprocessing.connection.wait`
+        """
+        return hasattr(self._recv_end, "fileno")
+
+    def fileno(self):
+        """
+        The file descriptor of the receiving object.
+        It makes the handler itself could be passed to `multiprocessing.connection.wait`.
+        """
+        return self._recv_end.fileno()
+
     def recv(self):
         return self._recv_end.recv()
 
+    def can_recv_bytes(self):
+        """
+        Check whether the receiving object could receive serialized bytes directly
+        """
+        return hasattr(self._recv_end, "recv_bytes")
+
+    def recv_bytes(self):
+        return self._recv_end.recv_bytes()
+
     def send(self, obj):
         self._send_end.send(obj)
 
+    def can_send_bytes(self):
+        """
+        Check whether the sending object could send serialized bytes directly
+        """
+        return hasattr(self._send_end, "send_bytes")
+
+    def send_bytes(self, buf):
+        self._send_end.send_bytes(buf)
+
+    def close(self):
+        """
+        Close the communication objects which provide `close()`
+        """
+        for comm_obj in (self._recv_end, self._send_end):
+            if hasattr(comm_obj, "close"):
+                comm_obj.close()
+
 
 class CommunicationSet:
     """
@@ -115,6 +164,59 @@ class CommunicationSet:
 
         return objs
 
+    def wait(self, names, timeout: float = None):
+        """
+        Block until any of the specified communication objects has data to read
+
+        The communication objects which can't be waited by the OS (no `fileno()`)
+        are only polled, so they never block the caller.
+
+        @param names The names of the communication objects to wait
+        @param timeout The maximum waiting time in seconds. `None` means waiting forever.
+        @return A list of the names of the communication objects which have data to read
+        """
+        ready_names = []
+        waitable_handlers = {}
+        for name in names:
+            comm_handler = self._comm_handlers[name]
+            if comm_handler.poll():
+                ready_names.append(name)
+            elif comm_handler.is_waitable():
+                waitable_handlers[comm_handler] = name
+
+        if ready_names or not waitable_handlers:
+            return ready_names
+
+        return [waitable_handlers[handler] for handler in wait(list(waitable_handlers), timeout)]
+
+    def recv_all_before_deadline(self, names, deadline: float, is_outdated=None):
+        """
+        Receive one object from each of the specified communication objects
+        until all of them are received or the deadline expires
+
+        @param names The names of the communication objects to receive from
+        @param deadline The deadline in the clock of `time.perf_counter()`
+        @param is_outdated A function `is_outdated(name, obj)` checking whether the received object
+               is outdated. The outdated objects are dropped and the communication object is still waited.
+        @return A dictionary storing received objects. The key is the name of
+                the communication object, the value is the received object.
+                If nothing arrived before the deadline, the value will be None.
+        """
+        objs = {name: None for name in names}
+        pending_names = set(names)
+        while pending_names:
+            ready_names = self.wait(pending_names, max(deadline - time.perf_counter(), 0))
+            if not ready_names:
+                break
+            for name in ready_names:
+                obj = self._comm_handlers[name].recv()
+                if is_outdated is not None and is_outdated(name, obj):
+                    continue
+                objs[name] = obj
+                pending_names.discard(name)
+
+        return objs
+
     def send(self, obj, name: str):
         """
         Send object via the specified communication object
@@ -133,6 +235,44 @@ class CommunicationSet:
         for comm_handlers in self._comm_handlers.values():
             comm_handlers.send(obj)
 
+    def broadcast(self, obj, data: bytes = None):
+        """
+        Send object via all communication objects registered for sending.
+        The object is serialized only once and the same bytes are sent to
+        the communication objects which provide `send_bytes()`.
+
+        @param obj The object to be sent
+        @param data The bytes sent for the object to the communication objects which provide `send_bytes()`.
+               If it is None, they are the pickled object.
+        """
+        for comm_handler in self._comm_handlers.values():
+            if comm_handler.can_send_bytes():
+                if data is None:
+                    data = ForkingPickler.dumps(obj, protocol=5)
+                comm_handler.send_bytes(data)
+            else:
+                comm_handler.send(obj)
+
+    def broadcast_bytes(self, data: bytes):
+        """
+        Send the serialized bytes via all communication objects registered for sending.
+        The communication objects which don't provide `send_bytes()` receive the bytes object.
+
+        @param data The bytes to be sent
+        """
+        for comm_handler in self._comm_handlers.values():
+            if comm_handler.can_send_bytes():
+                comm_handler.send_bytes(data)
+            else:
+                comm_handler.send(data)
+
+    def close_all(self):
+        """
+        Close all the communication objects
+        """
+        for comm_handler in self._comm_handlers.values():
+            comm_handler.close()
+
 class GameCommManager:
     """
     The commnuication manager for the game process
@@ -141,6 +281,16 @@ class GameCommManager:
     def __init__(self):
         self._comm_to_ml_set = CommunicationSet()
         self._comm_to_others = CommunicationSet()
+        self._progress_encoder = None
+
+    def enable_progress_delta(self, keyframe_interval: int = 300):
+        """
+        Send the game progress as the delta from the last frame.
+        The `TransitionCommManager` decodes it back to the full game progress.
+
+        @param keyframe_interval Send the full game progress every `keyframe_interval` frames
+        """
+        self._progress_encoder = ProgressDeltaEncoder(keyframe_interval)
 
     def add_comm_to_ml(self, ml_name, recv_end, send_end):
         """
@@ -169,6 +319,12 @@ class GameCommManager:
         """
         self._comm_to_ml_set.send_all(obj)
 
+    def close_comm_to_ml(self):
+        """
+        Close the communication objects to all the ml processes
+        """
+        self._comm_to_ml_set.close_all()
+
     def recv_from_ml(self, ml_name):
         """
         Receive the object from the specified ml process
@@ -184,6 +340,24 @@ class GameCommManager:
         """
         return self._comm_to_ml_set.recv_all(to_wait=False)
 
+    def wait_for_ml(self, ml_names, timeout: float = None):
+        """
+        Block until any of the specified ml processes has sent something
+
+        @return A list of the names of ml processes which have data to read
+        """
+        return self._comm_to_ml_set.wait(ml_names, timeout)
+
+    def recv_from_ml_before_deadline(self, ml_names, deadline: float, is_outdated=None):
+        """
+        Receive one object from each of the specified ml processes.
+        Return as soon as all of them replied or the deadline expires.
+
+        @param deadline The deadline in the clock of `time.perf_counter()`
+        @param is_outdated A function `is_outdated(ml_name, obj)`. The outdated objects are dropped.
+        """
+        return self._comm_to_ml_set.recv_all_before_deadline(ml_names, deadline, is_outdated)
+
     def add_comm_to_others(self, client_name, recv_end, send_end):
         """
         Set communication objects for communicating with specified ml process
@@ -193,6 +367,12 @@ class GameCommManager:
         comm_handler.set_send_end(send_end)
         self._comm_to_others.add_comm_handler(client_name, comm_handler)
 
+    def has_comm_to_others(self) -> bool:
+        """
+        Check whether any transition process is registered to receive the game data
+        """
+        return len(self._comm_to_others.get_comm_handler_names()) > 0
+
     def send_game_result(self, game_result):
         self._send_data_to_others("game_result", game_result)
 
@@ -205,7 +385,19 @@ class GameCommManager:
     def send_game_progress(self, game_progress_dict):
         """
         Send the game progress to the transition server
-        """
+
+        The lists of view objects in the game progress are sent in the binary wire format of
+        `mlgame.view.wire_format`. If they contain anything else, the game progress is pickled as the other data.
+        """
+        if self._progress_encoder is not None:
+            self._send_data_to_others("game_progress_delta", self._progress_encoder.encode(game_progress_dict))
+            return
+        if self.has_comm_to_others() and any(key in game_progress_dict for key in VIEW_LIST_KEYS):
+            try:
+                self._comm_to_others.broadcast_bytes(encode_scene_progress(game_progress_dict))
+                return
+            except TypeError:
+                pass
         self._send_data_to_others("game_progress", game_progress_dict)
 
     def send_game_error_with_obj(self, error: GameError):
@@ -216,7 +408,10 @@ class GameCommManager:
         })
 
     def send_end_message(self):
-        self._send_to_others(None)
+        """
+        Send `None` to the transition processes, which is sent as `END_OF_STREAM` if they receive bytes
+        """
+        self._comm_to_others.broadcast(None, END_OF_STREAM)
 
     def _send_data_to_others(self, type, data):
         self._send_to_others({
@@ -229,7 +424,7 @@ class GameCommManager:
         Send the object to all ml process
         """
         # print(obj)
-        self._comm_to_others.send_all(obj)
+        self._comm_to_others.broadcast(obj)
 
     def recv_from_others(self):
         """
@@ -317,6 +512,7 @@ class TransitionCommManager:
         self._comm_to_game = CommunicationHandler()
         self.set_comm_to_game(recv_end, send_end)
         self.count = 0
+        self._progress_decoder = ProgressDeltaDecoder()
 
     def start_recv_obj_thread(self):
         """
@@ -331,16 +527,25 @@ class TransitionCommManager:
         """
         Keep receiving object from the game and put it in the queue
 
+        If the receiving object provides `recv_bytes()`, the serialized bytes are put in the queue
+        and they will be decoded when `recv_from_game()` is invoked.
         """
+        recv_raw_bytes = self._comm_to_game.can_recv_bytes()
         while True:
             if self._obj_queue.full():
                 # self._obj_queue.get()
                 print("Warning: The object queue for the process 'ws_comm' is full. ")
 
-            obj = self._comm_to_game.recv()
-            self._obj_queue.put(obj)
-            if obj is None:  # Received `None` from the game, quit the loop.
-                break
+            if recv_raw_bytes:
+                obj = self._comm_to_game.recv_bytes()
+                self._obj_queue.put(obj)
+                if obj == END_OF_STREAM:
+                    break
+            else:
+                obj = self._comm_to_game.recv()
+                self._obj_queue.put(obj)
+                if obj is None:  # Received `None` from the game, quit the loop.
+                    break
 
     def set_comm_to_game(self, recv_end, send_end):
         """
@@ -355,12 +560,27 @@ class TransitionCommManager:
     def recv_from_game(self):
         """
         Receive the object sent from the game process
+
+        The game progress in the binary wire format and the delta of the game progress
+        are decoded to the full game progress.
         """
         try:
-            return self._obj_queue.get(block=True, timeout=WS_WAIT_GAME_TIMEOUT)
+            obj = self._obj_queue.get(block=True, timeout=WS_WAIT_GAME_TIMEOUT)
         except Exception as e:
             print(e.__str__())
             return None
+        if isinstance(obj, bytes):
+            if obj == END_OF_STREAM:
+                return None
+            if obj.startswith(MAGIC):
+                return {"type": "game_progress", "data": decode_scene_progress(obj)}
+            obj = ForkingPickler.loads(obj)
+        if isinstance(obj, dict) and obj.get("type") == "game_progress_delta":
+            return {
+                "type": "game_progress",
+                "data": self._progress_decoder.decode(obj["data"])
+            }
+        return obj
 
     def send_exception(self, exception):
         """
@@ -2,3 +2,5 @@ import os
 
 TIMEOUT = int(os.getenv("WS_TIMEOUT", 60))
 WS_WAIT_GAME_TIMEOUT = int(os.getenv("WS_WAIT_GAME_TIMEOUT", 15))
+# The seconds to wait for the "READY" command of AI clients at the initial stage
+AI_INIT_TIMEOUT = float(os.getenv("AI_INIT_TIMEOUT", 60))
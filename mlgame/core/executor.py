@@ -6,20 +6,27 @@ import json
 import os
 import time
 import traceback
+from collections import deque
 from typing import Callable
 
 import pandas as pd
 import websockets
-from orjson import orjson
 
+from mlgame.core.env import AI_INIT_TIMEOUT
 from mlgame.core.communication import GameCommManager, MLCommManager, TransitionCommManager
 from mlgame.core.exceptions import MLProcessError, GameProcessError, GameError, ErrorEnum, GameException
 from mlgame.game.generic import quit_or_esc
 from mlgame.game.paia_game import PaiaGame
+from mlgame.utils.enum import ExecutionMode, ProgressFormat, CapturePolicy
 from mlgame.utils.io import save_json
 from mlgame.utils.logger import logger
 from mlgame.utils.prof import timeit
+from mlgame.utils.progress_log import NdjsonChunkWriter, save_game_info
+from mlgame.utils.recorder import get_recorder
+from mlgame.utils.replay import ReplayWriter, REPLAY_FILENAME
+from mlgame.view.capture import FrameCapturer
 from mlgame.view.view import PygameViewInterface, PygameView
+from mlgame.view.wire_format import view_object_to_dict
 
 
 class ExecutorInterface(abc.ABC):
@@ -121,12 +128,11 @@ class AIClientExecutor(ExecutorInterface):
                 ai_obj.reset()
                 return True
 
-            if command:
-                # 收到資料就回傳
-                self.ai_comm.send_to_game({
-                    "frame": self._frame_count,
-                    "command": command
-                })
+            # 收到資料就回傳, even if there is no command, so that the game doesn't wait for it
+            self.ai_comm.send_to_game({
+                "frame": self._frame_count,
+                "command": command
+            })
             self._frame_count += 1
 
     def _ml_ready(self):
@@ -147,13 +153,114 @@ class AIClientExecutor(ExecutorInterface):
         return scene_info, keyboard_info
 
 
+class InProcessAIClientExecutor(ExecutorInterface):
+    """
+    Run the AI client inside the game process.
+
+    It provides `send()`, `recv()` and `poll()` of a communication object, so it could be
+    registered to `GameCommManager` in place of the pipes of an ai process.
+    The `update()` of the AI client is invoked directly when the game sends the scene information,
+    and the replies follow the same protocol as `AIClientExecutor`.
+    """
+
+    def __init__(self, ai_client_path: str, ai_name="1P",
+                 game_params: dict = {}, ai_loader: Callable[[str, dict], AIClient] = None):
+        self._frame_count = 0
+        self.ai_loader = ai_loader if ai_loader else functools.partial(ai_client_loader, ai_client_path)
+        self._proc_name = ai_client_path
+        self.ai_name = ai_name
+        self.game_params = game_params
+        self._ai_obj = None
+        self._is_running = False
+        self._replies = deque()
+
+    def run(self):
+        """
+        Load the AI client and send a "READY" command to the game
+        """
+        self._is_running = True
+        self._ai_obj = self._call_ai_client(self.ai_loader, self.ai_name, self.game_params)
+        if self._is_running:
+            logger.info("             AI Client runs in the game process")
+            self._replies.append("READY")
+
+    def send(self, obj):
+        """
+        Receive the object from the game and execute the AI client
+        """
+        if not self._is_running:
+            return
+        if not obj or not obj[0]:
+            # game over
+            self._is_running = False
+            print("             AI Client ends")
+            return
+
+        scene_info, keyboard_info = obj
+        command = self._call_ai_client(self._ai_obj.update, scene_info, keyboard_info)
+        if not self._is_running:
+            return
+
+        if scene_info["status"] != "GAME_ALIVE" or command == "RESET":
+            self._call_ai_client(self._ai_obj.reset)
+            if self._is_running:
+                self._frame_count = 0
+                self._replies.append("READY")
+            return
+
+        # reply even if there is no command, so that the game doesn't wait for it
+        self._replies.append({
+            "frame": self._frame_count,
+            "command": command
+        })
+        self._frame_count += 1
+
+    def poll(self):
+        return len(self._replies) > 0
+
+    def recv(self):
+        return self._replies.popleft()
+
+    def _call_ai_client(self, func, *args):
+        try:
+            return func(*args)
+        except ModuleNotFoundError as e:
+            failed_module_name = e.__str__().split("'")[1]
+            logger.exception(
+                f"Module '{failed_module_name}' is not found in {self._proc_name}")
+            self._stop_with_error_message(
+                f"The process '{self.ai_name}' is exited by itself. {traceback.format_exc()}"
+            )
+        except Exception:
+            logger.exception(f"Error is happened in {self._proc_name}")
+            self._stop_with_error_message(
+                f"The process '{self.ai_name}' is exited by itself. {traceback.format_exc()}"
+            )
+        except SystemExit:
+            print("             System exit at ai client ")
+            self._stop_with_error_message(
+                f"The process '{self.ai_name}' is exited by sys.exit. {traceback.format_exc()}"
+            )
+        return None
+
+    def _stop_with_error_message(self, message):
+        self._is_running = False
+        self._replies.append(GameError(
+            error_type=ErrorEnum.AI_EXEC_ERROR, frame=self._frame_count,
+            message=message
+        ))
+
+
 class GameExecutor(ExecutorInterface):
     def __init__(
             self,
             game: PaiaGame,
             game_comm: GameCommManager,
             game_view: PygameViewInterface,
-            fps=30, one_shot_mode=False, no_display=False, output_folder=None):
+            fps=30, one_shot_mode=False, no_display=False, output_folder=None,
+            execution_mode: ExecutionMode = ExecutionMode.REALTIME, ml_init_timeout: float = AI_INIT_TIMEOUT,
+            capture_stride: int = 1, capture_policy: CapturePolicy = CapturePolicy.BLOCK,
+            capture_queue_size: int = 8, dataset_folder=None):
         self._view_data = None
         self._last_pause_btn_clicked_time = 0
         self._pause_state = False
@@ -167,12 +274,24 @@ class GameExecutor(ExecutorInterface):
         self._dead_ml_names = []
         self._ml_execution_time = 1 / fps
         self._fps = fps
+        self._execution_mode = execution_mode
+        self._ml_init_timeout = ml_init_timeout
+        self._ml_init_latency = {}
         self._output_folder = output_folder
+        self._frame_capturer = None
+        if output_folder is not None:
+            self._frame_capturer = FrameCapturer(
+                output_folder, queue_size=capture_queue_size, policy=capture_policy, stride=capture_stride)
+        self._is_progress_consumed = (
+                execution_mode != ExecutionMode.TURBO or not no_display or
+                output_folder is not None or game_comm.has_comm_to_others())
         for name in self._active_ml_names:
             self._ml_delayed_frames[name] = 0
-        # self._recorder = get_recorder(self._execution_cmd, self._ml_names)
+        self._recorder = get_recorder(dataset_folder, list(self.game_comm.get_ml_names()))
         self._frame_count = 0
         self._total_frame = 0
+        # the time spent on updating the frames, excluding waiting for the ml clients to be ready
+        self._frame_time = 0.0
         self.one_shot_mode = one_shot_mode
         self._proc_name = str(self.game)
 
@@ -188,12 +307,17 @@ class GameExecutor(ExecutorInterface):
                     self.game_view.draw(self._view_data)
                     time.sleep(0.05)
                     continue
+                frame_start_time = time.perf_counter()
                 result = self._update_frame()
+                self._frame_time += time.perf_counter() - frame_start_time
                 # Do reset stuff
                 if result == "QUIT" or (result == "RESET" and self.one_shot_mode):
                     game_result = self._reset()
                     self._end_game_normal(game_result)
-                    time.sleep(1)
+                    if self._execution_mode == ExecutionMode.TURBO:
+                        self._report_fps()
+                    else:
+                        time.sleep(1)
                     return
 
                 if result == "RESET":
@@ -217,27 +341,56 @@ class GameExecutor(ExecutorInterface):
                 message=e.__str__(),
                 frame=self._frame_count
             ))
-
+        finally:
+            # keep the frames recorded before the error
+            self._recorder.flush_to_file()
+            if self._frame_capturer:
+                self._frame_capturer.close()
 
     def _wait_all_ml_ready(self):
         """
         Wait until receiving "READY" commands from all ml processes
+
+        All the ml processes are waited at the same time. The ml processes which are not ready
+        before `ml_init_timeout` are moved to dead.
         """
-        # Wait the ready command one by one
-        for ml_name in self._active_ml_names:
-            recv = ""
-            try:
-                while recv != "READY":
-                    recv = self._recv_from_ml(ml_name)
-            except GameException as e:
-                self._move_ml_to_dead(ml_name, e.game_error)
-            except Exception as e:
-                print("catch error 2")
-                ai_error = GameError(
-                    error_type=ErrorEnum.AI_INIT_ERROR, frame=0,
-                    message=f"AI of {ml_name} has error at initial stage. {e.__str__()}")
-                self._move_ml_to_dead(ml_name, ai_error)
-                traceback.print_exc()
+        start_time = time.perf_counter()
+        deadline = start_time + self._ml_init_timeout
+        pending_ml_names = list(self._active_ml_names)
+        self._ml_init_latency = {}
+        while pending_ml_names:
+            ready_ml_names = self.game_comm.wait_for_ml(
+                pending_ml_names, max(deadline - time.perf_counter(), 0))
+            if not ready_ml_names:
+                if time.perf_counter() >= deadline:
+                    break
+                # Only the communication objects which can't be waited by the OS are left
+                time.sleep(0.001)
+                continue
+
+            for ml_name in ready_ml_names:
+                try:
+                    if self._recv_from_ml(ml_name) != "READY":
+                        continue
+                    self._ml_init_latency[ml_name] = time.perf_counter() - start_time
+                except GameException as e:
+                    self._move_ml_to_dead(ml_name, e.game_error)
+                except Exception as e:
+                    print("catch error 2")
+                    ai_error = GameError(
+                        error_type=ErrorEnum.AI_INIT_ERROR, frame=0,
+                        message=f"AI of {ml_name} has error at initial stage. {e.__str__()}")
+                    self._move_ml_to_dead(ml_name, ai_error)
+                    traceback.print_exc()
+                pending_ml_names.remove(ml_name)
+
+        for ml_name in pending_ml_names:
+            self._move_ml_to_dead(ml_name, GameError(
+                error_type=ErrorEnum.AI_INIT_ERROR, frame=0,
+                message=f"AI of {ml_name} is not ready in {self._ml_init_timeout} seconds."))
+
+        for ml_name, latency in self._ml_init_latency.items():
+            print(f"The client '{ml_name}' is ready in {latency:.3f} s")
 
     def _recv_from_ml(self, ml_name):
         recv = self.game_comm.recv_from_ml(ml_name)
@@ -252,11 +405,14 @@ class GameExecutor(ExecutorInterface):
 
         self._frame_count += 1
         self._total_frame += 1
+        if not self._is_progress_consumed:
+            return result
+
         self._view_data = self.game.get_scene_progress_data()
         self.game_view.draw(self._view_data)
         # save image
-        if self._output_folder:
-            self.game_view.save_image(f"{self._output_folder}/{self._frame_count:05d}.jpg")
+        if self._frame_capturer:
+            self._frame_capturer.capture(self.game_view.get_display_surface(), self._frame_count)
         view_data = self._view_data
         view_data["frame"] = self._total_frame
         self.game_comm.send_game_progress(view_data)
@@ -280,12 +436,18 @@ class GameExecutor(ExecutorInterface):
                 "The game doesn't provide scene information "
                 f"for the client '{ml_name}'")
 
-        time.sleep(self._ml_execution_time)
-        response_dict = self.game_comm.recv_from_all_ml()
+        if self._execution_mode in (ExecutionMode.BARRIER, ExecutionMode.TURBO):
+            response_dict = self.game_comm.recv_from_ml_before_deadline(
+                self._active_ml_names, time.perf_counter() + self._ml_execution_time,
+                self._is_outdated_command)
+        else:
+            time.sleep(self._ml_execution_time)
+            response_dict = self.game_comm.recv_from_all_ml()
 
         cmd_dict = {}
         for ml_name in self._active_ml_names:
             cmd_dict[ml_name] = self._handle_command_from_ml(response_dict[ml_name], ml_name)
+        self._recorder.record(scene_info_dict, cmd_dict)
 
         if not self._active_ml_names:
             error = MLProcessError(
@@ -300,6 +462,16 @@ class GameExecutor(ExecutorInterface):
             raise error
         return cmd_dict
 
+    def _is_outdated_command(self, ml_name, cmd) -> bool:
+        """
+        Check whether the command is the late reply of a previous frame.
+        The delay is still recorded, but the command is not applied to the current frame.
+        """
+        if isinstance(cmd, dict) and cmd["frame"] < self._frame_count:
+            self._check_delay(ml_name, cmd["frame"])
+            return True
+        return False
+
     def _handle_command_from_ml(self, cmd, ml_name):
         if isinstance(cmd, dict):
             self._check_delay(ml_name, cmd["frame"])
@@ -348,13 +520,15 @@ class GameExecutor(ExecutorInterface):
         ))
 
     def _reset(self):
+        self._recorder.flush_to_file()
         scene_info_dict = self.game.get_data_from_game_to_player()
         # send to ml_clients and don't parse any command , while client reset ,
         # self._wait_all_ml_ready() will works and not blocks the process
         for ml_name in self._active_ml_names:
             self.game_comm.send_to_ml((scene_info_dict[ml_name], []), ml_name)
         # TODO check what happen when bigfile is saved
-        time.sleep(0.1)
+        if self._execution_mode != ExecutionMode.TURBO:
+            time.sleep(0.1)
         game_result = self.game.get_game_result()
 
         attachments = game_result['attachment']
@@ -365,6 +539,11 @@ class GameExecutor(ExecutorInterface):
             self._ml_delayed_frames[name] = 0
         return game_result
 
+    def _report_fps(self):
+        if self._frame_time > 0:
+            print(f"Game runs {self._total_frame} frames in {self._frame_time:.2f} s, "
+                  f"{self._total_frame / self._frame_time:.1f} frames/sec")
+
     def _end_game_normal(self, game_result):
         self.game_comm.send_system_message("遊戲結束")
         self.game_comm.send_game_result(game_result)
@@ -375,47 +554,36 @@ class GameExecutor(ExecutorInterface):
 
 
 class ProgressLogExecutor(ExecutorInterface):
-    def __init__(self, progress_folder, progress_frame_frequency, pl_comm: TransitionCommManager):
+    def __init__(self, progress_folder, progress_frame_frequency, pl_comm: TransitionCommManager,
+                 compress_level: int = 0, progress_format: ProgressFormat = ProgressFormat.NDJSON):
+        """
+        @param progress_frame_frequency The number of frames saved in a chunk file,
+            or the interval of keyframes in the replay file
+        @param compress_level The gzip compression level of the chunk files. 0 means no compression.
+        @param progress_format Write the chunk files or a single replay file
+        """
         # super().__init__(name="ws")
         self._proc_name = f"progress_log({progress_folder}"
         self._progress_folder = progress_folder
         self._progress_frame_frequency = progress_frame_frequency
         self._comm_manager = pl_comm
         self._recv_data_func = self._comm_manager.recv_from_game
-        self._filename = "{}.json"
-        self._progress_data = []
-
-
-    def save_json_and_init(self, path):
-
-        with open(path, 'w') as f:
-            # json.dump(self._progress_data, f)
-            f.write(orjson.dumps(self._progress_data).decode())
-        # Get the file size in kilobytes (1 KB = 1024 bytes)
-        file_size_kb = os.path.getsize(path) / 1024
-        # Print the file path and file size in KB
-        print(f"File saved to: {path}, file size: {file_size_kb:.2f} KB")
-
-        self._progress_data = []
+        if progress_format == ProgressFormat.REPLAY:
+            self._writer = ReplayWriter(os.path.join(progress_folder, REPLAY_FILENAME), progress_frame_frequency)
+        else:
+            self._writer = NdjsonChunkWriter(progress_folder, progress_frame_frequency, compress_level)
 
     def run(self):
         self._comm_manager.start_recv_obj_thread()
 
         try:
-            progress_count = -1
             while (game_data := self._recv_data_func())['type'] != 'game_result':
                 if game_data['type'] == 'game_progress':
-                    # print(game_data)
-                    if (game_data['data']['frame'] - 1) % self._progress_frame_frequency == 0 and game_data['data'][
-                        'frame'] != 1:
-                        self.save_json_and_init(os.path.join(
-                            self._progress_folder, self._filename.format(progress_count := progress_count + 1)))
-                    self._progress_data.append(game_data['data'])
+                    self._writer.write(game_data['data'])
+                elif game_data['type'] == 'game_info':
+                    save_game_info(self._progress_folder, game_data['data'])
             else:
-                if self._progress_data != []:
-                    self.save_json_and_init(os.path.join(
-                        self._progress_folder,
-                        self._filename.format(str(progress_count := progress_count + 1) + '-end')))
+                self._writer.close()
         except Exception as e:
             # exception = TransitionProcessError(self._proc_name, traceback.format_exc())
             self._comm_manager.send_exception(
@@ -471,10 +639,10 @@ class WebSocketExecutor():
                 elif data['type'] == "game_result":
                     # raise a flag to recv data
                     is_ready_to_end = True
-                    await websocket.send(json.dumps(data))
+                    await websocket.send(json.dumps(data, default=view_object_to_dict))
                 else:
                     # print(data)
-                    await websocket.send(json.dumps(data))
+                    await websocket.send(json.dumps(data, default=view_object_to_dict))
                     # count += 1
                     pass
                     # print(f'Send to ws : {count}:{data.keys()}')
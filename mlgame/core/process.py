@@ -2,9 +2,10 @@ import time
 from multiprocessing import Process, Pipe
 
 from mlgame.core.env import TIMEOUT
-from mlgame.core.executor import AIClientExecutor, WebSocketExecutor, ProgressLogExecutor
+from mlgame.core.executor import AIClientExecutor, WebSocketExecutor, ProgressLogExecutor, InProcessAIClientExecutor
 from mlgame.core.communication import GameCommManager, MLCommManager, TransitionCommManager
-from mlgame.utils.enum import get_ai_name
+from mlgame.core.shm_transport import SharedMemoryPipe, DEFAULT_CAPACITY
+from mlgame.utils.enum import get_ai_name, ProgressFormat
 from mlgame.utils.logger import logger
 from mlgame.game.paia_game import PaiaGame
 
@@ -23,15 +24,22 @@ def create_process_of_ws_and_start(game_comm: GameCommManager, ws_url) -> Proces
 
 
 def create_process_of_ai_clients_and_start(
-        game_comm: GameCommManager, path_of_ai_clients: list,game_params:dict) -> list:
+        game_comm: GameCommManager, path_of_ai_clients: list, game_params: dict,
+        use_shared_memory: bool = False, shm_capacity: int = DEFAULT_CAPACITY) -> list:
     """
     return a process list to main process and bind pipes to `game_comm`
+
+    If `use_shared_memory` is True, the scene information is sent to ai clients through shared memory.
+    @param shm_capacity The bytes of the shared memory for each ai client
     """
     ai_process = []
     for index, ai_client in enumerate(path_of_ai_clients):
         ai_name = get_ai_name(index)
         recv_pipe_for_game, send_pipe_for_ml = Pipe(False)
-        recv_pipe_for_ml, send_pipe_for_game = Pipe(False)
+        if use_shared_memory:
+            recv_pipe_for_ml, send_pipe_for_game = SharedMemoryPipe(shm_capacity)
+        else:
+            recv_pipe_for_ml, send_pipe_for_game = Pipe(False)
         game_comm.add_comm_to_ml(
             ai_name,
             recv_pipe_for_game, send_pipe_for_game)
@@ -45,12 +53,29 @@ def create_process_of_ai_clients_and_start(
         ai_process.append(process)
     return ai_process
 
-def create_process_of_progress_log_and_start(game_comm: GameCommManager, progress_folder, progress_frame_frequency) -> Process:
+def create_in_process_ai_clients_and_start(
+        game_comm: GameCommManager, path_of_ai_clients: list, game_params: dict) -> list:
+    """
+    load ai_clients in the game process and bind them to `game_comm` in place of pipes
+    """
+    ai_clients = []
+    for index, ai_client in enumerate(path_of_ai_clients):
+        ai_name = get_ai_name(index)
+        ai_executor = InProcessAIClientExecutor(ai_client.__str__(), ai_name=ai_name, game_params=game_params)
+        game_comm.add_comm_to_ml(ai_name, ai_executor, ai_executor)
+        ai_executor.run()
+        ai_clients.append(ai_executor)
+    return ai_clients
+
+
+def create_process_of_progress_log_and_start(game_comm: GameCommManager, progress_folder, progress_frame_frequency,
+                                             compress_level=0, progress_format=ProgressFormat.NDJSON) -> Process:
     recv_pipe_for_game, send_pipe_for_pl = Pipe(False)
     recv_pipe_for_pl, send_pipe_for_game = Pipe(False)
     pl_comm = TransitionCommManager(recv_pipe_for_pl, send_pipe_for_pl)
     game_comm.add_comm_to_others("pl", recv_pipe_for_game, send_pipe_for_game)
-    pl_executor = ProgressLogExecutor(progress_folder=progress_folder, progress_frame_frequency=progress_frame_frequency, pl_comm=pl_comm)
+    pl_executor = ProgressLogExecutor(progress_folder=progress_folder, progress_frame_frequency=progress_frame_frequency, pl_comm=pl_comm,
+                                      compress_level=compress_level, progress_format=progress_format)
     process = Process(target=pl_executor.run, name="pl")
     process.start()
     # time.sleep(0.1)
@@ -66,6 +91,7 @@ def terminate(game_comm: GameCommManager, ai_process: list, ws_proc: Process, pr
             game_comm.send_to_ml(
                 None, ai_proc.name)
             ai_proc.terminate()
+    game_comm.close_comm_to_ml()
     logger.info("Main process will terminate ws process")
 
     if ws_proc is not None:
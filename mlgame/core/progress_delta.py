@@ -0,0 +1,192 @@
+"""
+Delta encoding of the game progress data
+
+Every view object in the lists of the progress data gets an id, which is kept while the object
+is the same object or has the same attributes as an object of the same name in the last frame. The encoder only emits
+the objects which are added, changed or removed since the last frame, and a keyframe carrying
+all the objects periodically. The decoder rebuilds the full progress data from them.
+"""
+import copy
+
+from mlgame.view.view_model import VIEW_LIST_KEYS
+
+
+def get_view_object_attrs(view_obj) -> dict:
+    """
+    Get the public attributes of a view object, which is a dict or an instance of `View`
+    """
+    attrs = view_obj if isinstance(view_obj, dict) else vars(view_obj)
+    return {key: value for key, value in attrs.items() if not key.startswith("_")}
+
+
+def _get_view_object_key(list_key: str, view_obj, attrs: dict) -> tuple:
+    name = attrs.get("name", attrs.get("image_id"))
+    return list_key, type(view_obj).__name__, attrs.get("type"), name
+
+
+def _get_attrs_key(attrs: dict):
+    """
+    Get a hashable key of the attributes, which are equal if the attributes are equal
+    """
+    items = tuple(attrs.items())
+    try:
+        hash(items)
+        return items
+    except TypeError:
+        # the attributes like the points of polygons are lists
+        return repr(items)
+
+
+class ProgressDeltaEncoder:
+    def __init__(self, keyframe_interval: int = 300):
+        """
+        @param keyframe_interval Emit a keyframe every `keyframe_interval` frames
+        """
+        self._keyframe_interval = keyframe_interval
+        self._frame_count = 0
+        self._next_id = 0
+        # the (id, attrs, view object) of the objects in the last frame, grouped by `_get_view_object_key()`
+        self._last_groups = {}
+        self._last_attrs = {}
+        self._last_orders = {}
+
+    def _match_ids(self, last_entries: list, entries: list) -> list:
+        """
+        Give the objects of the same key the ids of the objects in the last frame.
+        An object keeps the id of the last frame if it is the same object, or it has the same attributes.
+        The other objects take the remaining ids in order, and the objects left get new ids.
+        It keeps the ids of the other objects when an object is removed from a run of objects of the same key.
+
+        @param last_entries The (id, attrs, view object) of the objects of the key in the last frame
+        @param entries The (attrs, view object) of the objects of the key in this frame
+        @return The ids of `entries`
+        """
+        ids = [None] * len(entries)
+        unmatched = set(range(len(last_entries)))
+        last_indexes = {id(view_obj): i for i, (_, _, view_obj) in enumerate(last_entries)}
+        for j, (_, view_obj) in enumerate(entries):
+            i = last_indexes.get(id(view_obj))
+            if i is not None and i in unmatched:
+                ids[j] = last_entries[i][0]
+                unmatched.discard(i)
+
+        if unmatched:
+            last_indexes_of_attrs = {}
+            for i in sorted(unmatched, reverse=True):
+                last_indexes_of_attrs.setdefault(_get_attrs_key(last_entries[i][1]), []).append(i)
+            for j, (attrs, _) in enumerate(entries):
+                if ids[j] is None:
+                    candidates = last_indexes_of_attrs.get(_get_attrs_key(attrs))
+                    if candidates:
+                        i = candidates.pop()
+                        ids[j] = last_entries[i][0]
+                        unmatched.discard(i)
+
+        remaining = iter(sorted(unmatched))
+        for j in range(len(entries)):
+            if ids[j] is None:
+                i = next(remaining, None)
+                if i is None:
+                    ids[j] = self._next_id
+                    self._next_id += 1
+                else:
+                    ids[j] = last_entries[i][0]
+        return ids
+
+    def encode(self, progress_data: dict) -> dict:
+        """
+        Encode the progress data into the delta from the last frame
+        """
+        is_keyframe = self._frame_count % self._keyframe_interval == 0
+        self._frame_count += 1
+
+        added = {}
+        changed = {}
+        orders = {}
+        current_attrs = {}
+        current_groups = {}
+        current_orders = {}
+        for list_key in VIEW_LIST_KEYS:
+            if list_key not in progress_data:
+                continue
+            view_objs = progress_data[list_key]
+            groups = {}
+            for index, view_obj in enumerate(view_objs):
+                attrs = get_view_object_attrs(view_obj)
+                groups.setdefault(_get_view_object_key(list_key, view_obj, attrs), []).append((index, attrs, view_obj))
+
+            order = [None] * len(view_objs)
+            for key, group in groups.items():
+                ids = self._match_ids(self._last_groups.get(key, []),
+                                      [(attrs, view_obj) for _, attrs, view_obj in group])
+                current_groups[key] = [(obj_id, attrs, view_obj)
+                                       for obj_id, (_, attrs, view_obj) in zip(ids, group)]
+                for obj_id, (index, attrs, view_obj) in zip(ids, group):
+                    order[index] = obj_id
+                    current_attrs[obj_id] = attrs
+                    last_attrs = self._last_attrs.get(obj_id)
+                    if is_keyframe or last_attrs is None:
+                        added[obj_id] = view_obj
+                    elif last_attrs != attrs:
+                        changed[obj_id] = {
+                            attr: value for attr, value in attrs.items()
+                            if attr not in last_attrs or last_attrs[attr] != value}
+
+            if is_keyframe or self._last_orders.get(list_key) != order:
+                orders[list_key] = order
+            current_orders[list_key] = order
+
+        if not is_keyframe:
+            # the lists missing in this frame are removed from the decoded progress data
+            for list_key in self._last_orders.keys() - current_orders.keys():
+                orders[list_key] = None
+        removed = [] if is_keyframe else [obj_id for obj_id in self._last_attrs if obj_id not in current_attrs]
+        self._last_attrs = current_attrs
+        self._last_groups = current_groups
+        self._last_orders = current_orders
+
+        return {
+            "keyframe": is_keyframe,
+            "orders": orders,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "others": {key: value for key, value in progress_data.items() if key not in VIEW_LIST_KEYS},
+        }
+
+
+class ProgressDeltaDecoder:
+    def __init__(self):
+        self._objects = {}
+        self._orders = {}
+
+    def decode(self, delta: dict) -> dict:
+        """
+        Rebuild the full progress data from the delta
+        """
+        if delta["keyframe"]:
+            self._objects = {}
+            self._orders = {}
+
+        for obj_id in delta["removed"]:
+            self._objects.pop(obj_id, None)
+        self._objects.update(delta["added"])
+        for obj_id, attrs in delta["changed"].items():
+            # copy the object, the object of the last frame may be kept by the consumer
+            view_obj = copy.copy(self._objects[obj_id])
+            if isinstance(view_obj, dict):
+                view_obj.update(attrs)
+            else:
+                for attr, value in attrs.items():
+                    setattr(view_obj, attr, value)
+            self._objects[obj_id] = view_obj
+        for list_key, order in delta["orders"].items():
+            if order is None:
+                self._orders.pop(list_key, None)
+            else:
+                self._orders[list_key] = order
+
+        progress_data = dict(delta["others"])
+        for list_key, order in self._orders.items():
+            progress_data[list_key] = [self._objects[obj_id] for obj_id in order]
+        return progress_data
@@ -0,0 +1,109 @@
+"""
+Redraw the frames of a progress log into images over a pool of headless worker processes
+"""
+import glob
+import os
+import re
+import signal
+from multiprocessing import Pool
+
+from mlgame.argument.tool import get_data_from_json_file
+from mlgame.utils.progress_log import GAME_INFO_FILENAME, iter_ndjson_chunk
+from mlgame.utils.replay import REPLAY_FILENAME, ReplayReader
+
+# the PygameView of each worker process
+_view = None
+
+
+def _init_worker(game_info: dict):
+    global _view
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+    os.environ['SDL_VIDEODRIVER'] = "dummy"
+    from mlgame.view.view import PygameView
+    from mlgame.view.wire_format import view_object_from_dict
+
+    game_info = dict(game_info)
+    game_info["background"] = [view_object_from_dict(data) for data in game_info.get("background", [])]
+    _view = PygameView(game_info)
+    # SDL handles SIGTERM by posting a quit event, restore it to let the pool terminate the worker
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _iter_task_frames(task: tuple):
+    source, start, stop = task
+    if source.endswith(REPLAY_FILENAME):
+        with ReplayReader(source) as reader:
+            yield from reader.iter_frames(start, stop)
+    else:
+        yield from iter_ndjson_chunk(source)
+
+
+def _render_task(args: tuple) -> int:
+    """
+    Draw the frames of a task and save them as images named by their frame numbers
+    @return The number of the saved images
+    """
+    from mlgame.view.view_model import VIEW_LIST_KEYS
+    from mlgame.view.wire_format import view_object_from_dict
+
+    task, output_folder, image_format, frame_range = args
+    count = 0
+    for progress_data in _iter_task_frames(task):
+        frame = progress_data.get("frame", 0)
+        if not frame_range[0] <= frame < frame_range[1]:
+            continue
+        for list_key in VIEW_LIST_KEYS:
+            progress_data[list_key] = [view_object_from_dict(data) for data in progress_data.get(list_key, [])]
+        progress_data.setdefault("game_sys_info", {})
+        _view.draw(progress_data)
+        _view.save_image(os.path.join(output_folder, f"{frame:05d}.{image_format}"))
+        count += 1
+    return count
+
+
+def _get_chunk_number(path: str) -> int:
+    return int(re.match(r"\d+", os.path.basename(path)).group())
+
+
+def split_render_tasks(progress_folder: str, task_count: int) -> list:
+    """
+    Split the frames of the progress log into tasks of (source, start, stop).
+    A chunk file of the ndjson log is a task, and the frames of a replay file are split
+    at the keyframes, so that each task decodes its keyframes only once.
+    """
+    replay_path = os.path.join(progress_folder, REPLAY_FILENAME)
+    if os.path.exists(replay_path):
+        with ReplayReader(replay_path) as reader:
+            frame_count = len(reader)
+            keyframe_interval = reader.keyframe_interval
+        keyframe_count = -(-frame_count // keyframe_interval)
+        keyframes_per_task = max(1, -(-keyframe_count // task_count))
+        step = keyframes_per_task * keyframe_interval
+        return [(replay_path, start, min(start + step, frame_count)) for start in range(0, frame_count, step)]
+
+    chunk_paths = glob.glob(os.path.join(progress_folder, "*.ndjson")) + \
+        glob.glob(os.path.join(progress_folder, "*.ndjson.gz"))
+    return [(path, 0, None) for path in sorted(chunk_paths, key=_get_chunk_number)]
+
+
+def render_replay(progress_folder: str, output_folder: str, workers: int = None,
+                  start_frame: int = 0, stop_frame: int = None, image_format: str = "jpg") -> int:
+    """
+    Redraw the frames saved by the progress log into the images `<frame>.<image_format>`,
+    which are named like the images of `--output-folder`.
+
+    @param progress_folder The folder contains `game_info.json` and the chunk files or the replay file
+    @param workers The number of worker processes. It is the number of cpu cores by default.
+    @param start_frame Only draw the frames whose frame number are in [start_frame, stop_frame)
+    @return The number of saved images
+    """
+    game_info = get_data_from_json_file(os.path.join(progress_folder, GAME_INFO_FILENAME))
+    os.makedirs(output_folder, exist_ok=True)
+    workers = workers or os.cpu_count()
+    frame_range = (start_frame, float("inf") if stop_frame is None else stop_frame)
+    # more tasks than workers to balance the load
+    tasks = split_render_tasks(progress_folder, workers * 4)
+
+    with Pool(processes=workers, initializer=_init_worker, initargs=(game_info,)) as pool:
+        return sum(pool.imap_unordered(
+            _render_task, [(task, output_folder, image_format, frame_range) for task in tasks]))
@@ -0,0 +1,205 @@
+"""
+The transport which sends objects through a ring buffer in shared memory
+
+The ends created by `SharedMemoryPipe()` provide the same `send`, `recv`, `poll` and `fileno`
+as `multiprocessing.connection.Connection`, so they could be used by `CommunicationHandler`.
+The messages which don't fit in the free space of the ring buffer are sent through the doorbell pipe.
+"""
+import pickle
+import struct
+from multiprocessing import Pipe
+from multiprocessing.shared_memory import SharedMemory
+
+# write_pos, read_pos, write_seq, read_seq
+_HEADER = struct.Struct("QQQQ")
+_MSG_LEN = struct.Struct("I")
+# the number of out-of-band buffers, and the length of the pickled data
+_PAYLOAD_HEADER = struct.Struct("IQ")
+_BUFFER_LEN = struct.Struct("Q")
+
+DEFAULT_CAPACITY = 4 * 1024 * 1024
+
+# the doorbell of a message in the ring buffer, and the prefix of a message sent through the doorbell pipe
+_RING_BUFFER_MESSAGE = b"\x01"
+_PIPE_MESSAGE = b"\x02"
+
+
+class SharedMemoryRingBuffer:
+    """
+    A single-producer single-consumer ring buffer of messages in shared memory
+
+    Both positions are monotonic byte counters. The producer writes a message and then
+    increases `write_pos` and `write_seq`, and the consumer does the same to `read_pos`
+    and `read_seq` after copying the message out.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._capacity = capacity
+        self._shm = SharedMemory(create=True, size=_HEADER.size + capacity)
+        _HEADER.pack_into(self._shm.buf, 0, 0, 0, 0, 0)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def _get_header(self):
+        return _HEADER.unpack_from(self._shm.buf, 0)
+
+    def pending_count(self) -> int:
+        _, _, write_seq, read_seq = self._get_header()
+        return write_seq - read_seq
+
+    def free_space(self) -> int:
+        write_pos, read_pos, _, _ = self._get_header()
+        return self._capacity - (write_pos - read_pos)
+
+    def _copy_in(self, pos: int, data):
+        start = pos % self._capacity
+        first_len = min(len(data), self._capacity - start)
+        offset = _HEADER.size
+        self._shm.buf[offset + start:offset + start + first_len] = data[:first_len]
+        if first_len < len(data):
+            self._shm.buf[offset:offset + len(data) - first_len] = data[first_len:]
+
+    def _copy_out(self, pos: int, length: int) -> bytearray:
+        start = pos % self._capacity
+        first_len = min(length, self._capacity - start)
+        offset = _HEADER.size
+        data = bytearray(self._shm.buf[offset + start:offset + start + first_len])
+        if first_len < length:
+            data += self._shm.buf[offset:offset + length - first_len]
+        return data
+
+    def write(self, chunks: list) -> bool:
+        """
+        Write a message composed of `chunks` into the ring buffer if there is enough free space
+        @return Whether the message is written
+        """
+        length = sum(len(chunk) for chunk in chunks)
+        total_length = _MSG_LEN.size + length
+        if self.free_space() < total_length:
+            return False
+
+        write_pos, _, write_seq, _ = self._get_header()
+        self._copy_in(write_pos, _MSG_LEN.pack(length))
+        pos = write_pos + _MSG_LEN.size
+        for chunk in chunks:
+            self._copy_in(pos, chunk)
+            pos += len(chunk)
+        # publish the message after the data is written
+        struct.pack_into("Q", self._shm.buf, 0, pos)
+        struct.pack_into("Q", self._shm.buf, 16, write_seq + 1)
+        return True
+
+    def read(self) -> bytearray:
+        """
+        Read a message from the ring buffer. The caller should make sure that a message is pending.
+        """
+        _, read_pos, write_seq, read_seq = self._get_header()
+        if read_seq >= write_seq:
+            raise BufferError("No message in the shared memory")
+        length, = _MSG_LEN.unpack(self._copy_out(read_pos, _MSG_LEN.size))
+        data = self._copy_out(read_pos + _MSG_LEN.size, length)
+        struct.pack_into("Q", self._shm.buf, 8, read_pos + _MSG_LEN.size + length)
+        struct.pack_into("Q", self._shm.buf, 24, read_seq + 1)
+        return data
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+def dumps(obj) -> list:
+    """
+    Serialize the object with pickle protocol 5.
+    The large buffers, such as numpy arrays, are kept out-of-band to avoid copying them into the pickle.
+    """
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    header = _PAYLOAD_HEADER.pack(len(raw_buffers), len(data)) + b"".join(
+        _BUFFER_LEN.pack(buffer.nbytes) for buffer in raw_buffers)
+    return [header, data] + raw_buffers
+
+
+def loads(payload: bytearray):
+    view = memoryview(payload)
+    buffer_count, data_len = _PAYLOAD_HEADER.unpack_from(view, 0)
+    pos = _PAYLOAD_HEADER.size
+    buffer_lens = []
+    for _ in range(buffer_count):
+        buffer_lens.append(_BUFFER_LEN.unpack_from(view, pos)[0])
+        pos += _BUFFER_LEN.size
+    data = view[pos:pos + data_len]
+    pos += data_len
+    buffers = []
+    for buffer_len in buffer_lens:
+        buffers.append(view[pos:pos + buffer_len])
+        pos += buffer_len
+    return pickle.loads(data, buffers=buffers)
+
+
+class SharedMemorySendEnd:
+    """
+    Write objects into the ring buffer and ring the doorbell.
+    The objects larger than the free space of the ring buffer are sent through the doorbell pipe,
+    so the order of the objects is kept by the doorbell.
+    """
+
+    def __init__(self, ring_buffer: SharedMemoryRingBuffer, doorbell):
+        self._ring_buffer = ring_buffer
+        self._doorbell = doorbell
+
+    def send(self, obj):
+        chunks = dumps(obj)
+        if self._ring_buffer.write(chunks):
+            self._doorbell.send_bytes(_RING_BUFFER_MESSAGE)
+        else:
+            self._doorbell.send_bytes(b"".join([_PIPE_MESSAGE, *chunks]))
+
+    def close(self):
+        self._doorbell.close()
+        self._ring_buffer.close()
+        self._ring_buffer.unlink()
+
+
+class SharedMemoryRecvEnd:
+    """
+    Wait for the doorbell and read objects from the ring buffer.
+    The doorbell is a pipe, so this end could be waited by `multiprocessing.connection.wait`.
+    """
+
+    def __init__(self, ring_buffer: SharedMemoryRingBuffer, doorbell):
+        self._ring_buffer = ring_buffer
+        self._doorbell = doorbell
+
+    def poll(self, timeout: float = 0):
+        return self._doorbell.poll(timeout)
+
+    def fileno(self):
+        return self._doorbell.fileno()
+
+    def recv(self):
+        message = self._doorbell.recv_bytes()
+        if message == _RING_BUFFER_MESSAGE:
+            return loads(self._ring_buffer.read())
+        # copy it to a bytearray, so the arrays are writable like the ones read from the ring buffer
+        return loads(bytearray(memoryview(message)[len(_PIPE_MESSAGE):]))
+
+    def close(self):
+        self._doorbell.close()
+
+
+def SharedMemoryPipe(capacity: int = DEFAULT_CAPACITY):
+    """
+    Create a one-way pipe over shared memory like `multiprocessing.Pipe(False)`
+
+    The pipe should be created before forking the receiving process.
+    @param capacity The bytes of the ring buffer
+    @return A tuple (recv_end, send_end)
+    """
+    ring_buffer = SharedMemoryRingBuffer(capacity)
+    doorbell_recv, doorbell_send = Pipe(False)
+    return SharedMemoryRecvEnd(ring_buffer, doorbell_recv), SharedMemorySendEnd(ring_buffer, doorbell_send)
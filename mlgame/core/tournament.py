@@ -0,0 +1,136 @@
+"""
+Run many matches over a pool of warm worker processes
+"""
+import os
+import time
+import traceback
+from multiprocessing import Pool
+
+from orjson import orjson
+
+from mlgame.argument.tool import get_data_from_json_file, revise_ai_clients
+from mlgame.core.communication import GameCommManager
+from mlgame.utils.enum import ExecutionMode
+
+# GameConfig of each game folder, which is cached in each worker process
+_game_configs = {}
+
+
+class _ResultCollectingCommManager(GameCommManager):
+    """
+    The communication manager keeping the game result and the errors of a match
+    instead of sending them to transition processes
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.game_result = None
+        self.game_errors = []
+
+    def _send_data_to_others(self, type, data):
+        if type == "game_result":
+            self.game_result = data
+        elif type == "game_error":
+            self.game_errors.append(data)
+        super()._send_data_to_others(type, data)
+
+
+def _init_worker():
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+    os.environ.setdefault('SDL_VIDEODRIVER', "dummy")
+
+
+def _get_game_config(game_folder: str):
+    from mlgame.argument.game_argument import GameConfig
+
+    if game_folder not in _game_configs:
+        _game_configs[game_folder] = GameConfig(game_folder)
+    return _game_configs[game_folder]
+
+
+def run_match(match: dict) -> dict:
+    """
+    Run a match in the current process without display.
+    The AI clients are executed in the current process, too.
+
+    @param match A dict contains "game_folder", "ai_clients", and optional "game_params" and "fps"
+    @return A dict of the match, its game result, and the errors happened in the match
+    """
+    from mlgame.core.executor import GameExecutor
+    from mlgame.core.process import create_in_process_ai_clients_and_start
+    from mlgame.game.paia_game import get_paia_game_obj
+    from mlgame.view.view import DummyPygameView
+
+    record = dict(match)
+    start_time = time.perf_counter()
+    try:
+        game_config = _get_game_config(match["game_folder"])
+        parsed_game_params = game_config.parse_game_params(match.get("game_params", []))
+        path_of_ai_clients = revise_ai_clients(match["ai_clients"], game_config.user_num_config)
+        game = get_paia_game_obj(game_config.game_cls, parsed_game_params, len(path_of_ai_clients))
+
+        game_comm = _ResultCollectingCommManager()
+        create_in_process_ai_clients_and_start(game_comm, path_of_ai_clients, parsed_game_params)
+        game_executor = GameExecutor(
+            game, game_comm, DummyPygameView(game.get_scene_init_data()),
+            fps=match.get("fps", 30), one_shot_mode=True, no_display=True,
+            execution_mode=ExecutionMode.TURBO
+        )
+        game_executor.run()
+        record["game_result"] = game_comm.game_result
+        record["errors"] = game_comm.game_errors
+    except Exception:
+        record["game_result"] = None
+        record["errors"] = [{"message": traceback.format_exc(), "error_type": "GAME_EXEC_ERROR"}]
+    record["elapsed_time"] = time.perf_counter() - start_time
+    return record
+
+
+def load_tournament_manifest(manifest_path: str) -> list:
+    """
+    Load the matches from the manifest.
+
+    The manifest is a json file of a list of matches, or a dict with the key "matches".
+    The relative paths of "game_folder" and "ai_clients" are relative to the manifest.
+    ```
+    {
+        "matches": [
+            {"game_folder": "./arkanoid", "game_params": ["--level", "3"], "ai_clients": ["./ml_play.py"]}
+        ]
+    }
+    ```
+    """
+    manifest = get_data_from_json_file(manifest_path)
+    matches = manifest["matches"] if isinstance(manifest, dict) else manifest
+    base_folder = os.path.dirname(os.path.abspath(manifest_path))
+
+    def to_abspath(path):
+        return os.path.abspath(os.path.join(base_folder, path))
+
+    result = []
+    for index, match in enumerate(matches):
+        match = dict(match)
+        match.setdefault("match_id", index)
+        match["game_folder"] = to_abspath(match["game_folder"])
+        match["ai_clients"] = [to_abspath(ai_client) for ai_client in match["ai_clients"]]
+        match["game_params"] = [str(param) for param in match.get("game_params", [])]
+        result.append(match)
+    return result
+
+
+def run_tournament(matches: list, output_path: str, workers: int = None) -> int:
+    """
+    Schedule the matches over a pool of worker processes and append the result of each match
+    to `output_path` as a line of json once it is finished.
+
+    @return The number of matches finished without errors
+    """
+    success_count = 0
+    with open(output_path, "ab") as f, Pool(processes=workers, initializer=_init_worker) as pool:
+        for record in pool.imap_unordered(run_match, matches):
+            f.write(orjson.dumps(record, default=str) + b"\n")
+            f.flush()
+            if not record["errors"] and record["game_result"] is not None:
+                success_count += 1
+            print(f"match {record['match_id']} is finished in {record['elapsed_time']:.2f} s")
+    return success_count
@@ -0,0 +1,263 @@
+"""
+Vectorized environments which step many `PaiaGame` instances with one batched call
+"""
+import abc
+import os
+import traceback
+from multiprocessing import Pipe, Process
+
+import numpy as np
+
+from mlgame.core.exceptions import GameProcessError
+from mlgame.game.paia_game import PaiaGame, GameStatus, get_paia_game_obj
+
+
+def _is_episode_end(game: PaiaGame, update_result) -> bool:
+    return update_result in ("RESET", "QUIT") or game.status != GameStatus.GAME_ALIVE
+
+
+def _stack_values(values: list):
+    if isinstance(values[0], dict):
+        return {key: _stack_values([value[key] for value in values]) for key in values[0]}
+    try:
+        return np.array(values)
+    except ValueError:
+        # the lists of different lengths
+        stacked = np.empty(len(values), dtype=object)
+        for index, value in enumerate(values):
+            stacked[index] = value
+        return stacked
+
+
+def stack_obs(observations: list) -> dict:
+    """
+    Stack the observations of the environments into arrays
+
+    @param observations A list of the observations, one for each environment.
+           All of them should have the same keys as the first one.
+    @return A dict with the same nested keys as an observation, whose values are numpy arrays
+            stacked over the environments. The first dimension is the index of the environment.
+            The lists of different lengths are stacked into an array of objects.
+    """
+    return _stack_values(observations)
+
+
+class VecEnv(abc.ABC):
+    """
+    The interface of vectorized environments
+
+    The observation of each environment is the dict returned by `get_data_from_game_to_player()`,
+    and the commands of each environment is a dict which maps the ai name to its command.
+    The observations of all environments are returned stacked by `stack_obs()`.
+    """
+
+    def __init__(self, num_envs: int):
+        self.num_envs = num_envs
+
+    def reset(self) -> dict:
+        """
+        Reset all the environments
+
+        @return The observations of all environments stacked by `stack_obs()`
+        """
+        return stack_obs(self._reset())
+
+    def step(self, commands: list):
+        """
+        Update all the environments by one frame.
+        The environment is reset automatically when its episode ends.
+
+        @param commands A list of the command dicts, one for each environment
+        @return A tuple (`observations`, `dones`, `infos`).
+                `observations` is the observations after updating stacked by `stack_obs()`,
+                which are the first observations of the next episodes for the ended episodes.
+                `dones` is a bool array indicating whether the episode ended at this frame.
+                `infos` is a list of dicts. If the episode ended, the dict carries
+                "terminal_observation" and "game_result" of the ended episode.
+        """
+        self._check_commands(commands)
+        observations, dones, infos = self._step(commands)
+        return stack_obs(observations), np.array(dones, dtype=bool), infos
+
+    @abc.abstractmethod
+    def _reset(self) -> list:
+        """
+        @return A list of the observations of all environments
+        """
+
+    @abc.abstractmethod
+    def _step(self, commands: list) -> tuple:
+        """
+        @return A tuple (`observations`, `dones`, `infos`) of the lists over the environments
+        """
+
+    def close(self):
+        pass
+
+    def _check_commands(self, commands: list):
+        if len(commands) != self.num_envs:
+            raise ValueError(f"Expect {self.num_envs} command dicts, but got {len(commands)}")
+
+
+class SyncVecEnv(VecEnv):
+    """
+    Step all the environments one by one in the current process
+    """
+
+    def __init__(self, game_cls, game_params: dict, user_num: int, num_envs: int):
+        super().__init__(num_envs)
+        self._games = [
+            get_paia_game_obj(game_cls, dict(game_params), user_num) for _ in range(num_envs)
+        ]
+
+    def _reset(self) -> list:
+        observations = []
+        for game in self._games:
+            game.reset()
+            observations.append(game.get_data_from_game_to_player())
+        return observations
+
+    def _step(self, commands: list) -> tuple:
+        observations = []
+        dones = []
+        infos = []
+        for game, command_dict in zip(self._games, commands):
+            result = game.update(command_dict)
+            info = {}
+            done = _is_episode_end(game, result)
+            if done:
+                info["terminal_observation"] = game.get_data_from_game_to_player()
+                info["game_result"] = game.get_game_result()
+                game.reset()
+            observations.append(game.get_data_from_game_to_player())
+            dones.append(done)
+            infos.append(info)
+        return observations, dones, infos
+
+
+def _vec_env_worker(conn, game_cls, game_params: dict, user_num: int, num_envs: int):
+    """
+    The target of the worker process of `SubprocVecEnv`, which hosts a `SyncVecEnv`
+    """
+    try:
+        env = SyncVecEnv(game_cls, game_params, user_num, num_envs)
+        while True:
+            cmd, data = conn.recv()
+            # send the observations of each environment, which are stacked by the main process
+            if cmd == "step":
+                conn.send(("ok", env._step(data)))
+            elif cmd == "reset":
+                conn.send(("ok", env._reset()))
+            elif cmd == "close":
+                env.close()
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+class SubprocVecEnv(VecEnv):
+    """
+    Distribute the environments to worker processes, one worker per core by default.
+
+    The `game_cls` is passed to the workers as the process arguments, so it must be picklable
+    when the start method of multiprocessing is not "fork".
+    """
+
+    def __init__(self, game_cls, game_params: dict, user_num: int, num_envs: int, num_workers: int = None):
+        super().__init__(num_envs)
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        num_workers = max(1, min(num_workers, num_envs))
+
+        # split environments into chunks as even as possible
+        chunk_sizes = [num_envs // num_workers + (1 if i < num_envs % num_workers else 0)
+                       for i in range(num_workers)]
+        self._chunk_sizes = chunk_sizes
+        self._conns = []
+        self._processes = []
+        for index, chunk_size in enumerate(chunk_sizes):
+            conn, worker_conn = Pipe()
+            process = Process(
+                target=_vec_env_worker,
+                args=(worker_conn, game_cls, game_params, user_num, chunk_size),
+                name=f"vec_env_{index}", daemon=True)
+            process.start()
+            worker_conn.close()
+            self._conns.append(conn)
+            self._processes.append(process)
+        self._closed = False
+
+    def _reset(self) -> list:
+        for conn in self._conns:
+            conn.send(("reset", None))
+        observations = []
+        for worker_observations in self._recv_from_all_workers():
+            observations.extend(worker_observations)
+        return observations
+
+    def _step(self, commands: list) -> tuple:
+        start = 0
+        for conn, chunk_size in zip(self._conns, self._chunk_sizes):
+            conn.send(("step", commands[start:start + chunk_size]))
+            start += chunk_size
+
+        observations = []
+        dones = []
+        infos = []
+        for worker_observations, worker_dones, worker_infos in self._recv_from_all_workers():
+            observations.extend(worker_observations)
+            dones.extend(worker_dones)
+            infos.extend(worker_infos)
+        return observations, dones, infos
+
+    def close(self):
+        if self._closed:
+            return
+        for conn in self._conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._closed = True
+
+    def _recv_from_all_workers(self) -> list:
+        results = []
+        for process, conn in zip(self._processes, self._conns):
+            status, data = conn.recv()
+            if status == "error":
+                raise GameProcessError(process.name, data)
+            results.append(data)
+        return results
+
+    def __del__(self):
+        self.close()
+
+
+def create_vec_env(game_folder: str, game_params: list = None, num_envs: int = 1,
+                   user_num: int = None, use_subprocess: bool = False, num_workers: int = None) -> VecEnv:
+    """
+    Create a `VecEnv` of the game in the `game_folder`
+
+    @param game_params The game parameters in the command line format, such as ["--level", "3"]
+    @param user_num The number of players. Use the minimum of `user_num` in game_config.json if not specified.
+    @param use_subprocess Use `SubprocVecEnv` if True, otherwise `SyncVecEnv`
+    """
+    from mlgame.argument.game_argument import GameConfig
+
+    game_config = GameConfig(game_folder)
+    parsed_game_params = game_config.parse_game_params(game_params or [])
+    if user_num is None:
+        user_num = game_config.user_num_config.min
+    if use_subprocess:
+        return SubprocVecEnv(game_config.game_cls, parsed_game_params, user_num, num_envs, num_workers)
+    return SyncVecEnv(game_config.game_cls, parsed_game_params, user_num, num_envs)
@@ -1,7 +1,10 @@
 """
 The helper functions for physics
 """
+import abc
+import math
 
+import numpy as np
 from pygame import Rect
 from pygame.sprite import Sprite
 from pygame.math import Vector2
@@ -132,6 +135,154 @@ def rect_break_or_contact_box(rect: Rect, box: Rect):
         rect.top <= box.top or
         rect.bottom >= box.bottom)
 
+def rects_to_array(rects) -> np.ndarray:
+    """
+    Convert the sprites or rects to an int array of shape (N, 4),
+    whose rows are (x, y, width, height) as `pygame.Rect`
+
+    @param rects The `Sprite`s which have the `rect` attribute, or the `Rect`s
+    """
+    return np.array([tuple(getattr(rect, "rect", rect)) for rect in rects], dtype=np.int64).reshape(-1, 4)
+
+def _to_edges(rects):
+    """
+    Get the left, top, right and bottom edges of the (x, y, width, height) rows
+    """
+    rects = np.asarray(rects)
+    left = rects[..., 0]
+    top = rects[..., 1]
+    return left, top, left + rects[..., 2], top + rects[..., 3]
+
+def _to_rect_row(rect) -> np.ndarray:
+    return np.asarray(tuple(getattr(rect, "rect", rect)))
+
+def collide_or_contact_mask(rects, target) -> np.ndarray:
+    """
+    The vectorized version of `collide_or_contact` for many rects against one target
+
+    @param rects An int array of shape (N, 4) made by `rects_to_array()`
+    @param target The `Sprite`, `Rect` or (x, y, width, height) to check
+    @return A bool array of shape (N,). The element is True if the rect collides or contacts the target.
+    """
+    left, top, right, bottom = _to_edges(rects)
+    target_left, target_top, target_right, target_bottom = _to_edges(_to_rect_row(target))
+    return ((left <= target_right) & (right >= target_left) &
+        (top <= target_bottom) & (bottom >= target_top))
+
+def collide_or_contact_matrix(rects_a, rects_b) -> np.ndarray:
+    """
+    The vectorized version of `collide_or_contact` for every pair of two arrays of rects
+
+    @param rects_a An int array of shape (N, 4) made by `rects_to_array()`
+    @param rects_b An int array of shape (M, 4)
+    @return A bool array of shape (N, M). The element [i, j] is True if
+            `rects_a[i]` collides or contacts `rects_b[j]`.
+    """
+    left_a, top_a, right_a, bottom_a = _to_edges(np.asarray(rects_a)[:, np.newaxis, :])
+    left_b, top_b, right_b, bottom_b = _to_edges(np.asarray(rects_b)[np.newaxis, :, :])
+    return ((left_a <= right_b) & (right_a >= left_b) &
+        (top_a <= bottom_b) & (bottom_a >= top_b))
+
+def collide_or_contact_pairs(rects_a, rects_b) -> np.ndarray:
+    """
+    Get the index pairs of the rects colliding or contacting each other
+
+    @return An int array of shape (K, 2), whose rows are the indexes (i, j) of
+            `rects_a[i]` and `rects_b[j]` colliding or contacting each other
+    """
+    return np.argwhere(collide_or_contact_matrix(rects_a, rects_b))
+
+def rect_break_or_contact_box_mask(rects, box) -> np.ndarray:
+    """
+    The vectorized version of `rect_break_or_contact_box`
+
+    @param rects An int array of shape (N, 4) made by `rects_to_array()`
+    @param box The `Rect` or (x, y, width, height) of the target box
+    @return A bool array of shape (N,). The element is True if the rect breaks or contacts the box.
+    """
+    left, top, right, bottom = _to_edges(rects)
+    box_left, box_top, box_right, box_bottom = _to_edges(_to_rect_row(box))
+    return ((left <= box_left) | (right >= box_right) |
+        (top <= box_top) | (bottom >= box_bottom))
+
+def _sweep_axis(low, high, obstacle_low, obstacle_high, delta):
+    """
+    Get the times of entering and exiting the obstacle on one axis
+    """
+    if delta > 0:
+        return (obstacle_low - high) / delta, (obstacle_high - low) / delta
+    if delta < 0:
+        return (obstacle_high - low) / delta, (obstacle_low - high) / delta
+    if high < obstacle_low or low > obstacle_high:
+        return math.inf, -math.inf
+    return -math.inf, math.inf
+
+def swept_aabb(x, y, width, height, dx, dy,
+    obstacle_x, obstacle_y, obstacle_width, obstacle_height):
+    """
+    Find when a moving rect hits a static rect in a frame.
+    It works on the plain numbers without creating any vector or rect.
+    The edges are inclusive as `collide_or_contact`, so contacting the obstacle is a hit.
+
+    @param x, y, width, height The moving rect at the start of the frame, like `last_pos`
+    @param dx, dy The displacement of the moving rect in the frame
+    @param obstacle_x, obstacle_y, obstacle_width, obstacle_height The static rect
+    @return A tuple (time, normal_x, normal_y) if the rect hits the obstacle, otherwise None.
+            `time` in [0, 1] is the fraction of the displacement before hitting the obstacle.
+            (normal_x, normal_y) is the normal of the hit surface of the obstacle.
+            Both components are set if the rect hits a corner exactly.
+            It is not a hit if the rects overlap at the start or the rect moves away from the obstacle.
+    """
+    entry_x, exit_x = _sweep_axis(x, x + width, obstacle_x, obstacle_x + obstacle_width, dx)
+    entry_y, exit_y = _sweep_axis(y, y + height, obstacle_y, obstacle_y + obstacle_height, dy)
+    entry = max(entry_x, entry_y)
+    if entry > min(exit_x, exit_y) or entry < 0 or entry > 1:
+        return None
+    normal_x = (-1 if dx > 0 else 1) if entry_x == entry else 0
+    normal_y = (-1 if dy > 0 else 1) if entry_y == entry else 0
+    return entry, normal_x, normal_y
+
+def _sweep_axis_batch(low, high, obstacle_low, obstacle_high, delta):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entry = np.where(delta > 0, (obstacle_low - high) / delta, (obstacle_high - low) / delta)
+        exit = np.where(delta > 0, (obstacle_high - low) / delta, (obstacle_low - high) / delta)
+    separated = (high < obstacle_low) | (low > obstacle_high)
+    entry = np.where(delta == 0, np.where(separated, np.inf, -np.inf), entry)
+    exit = np.where(delta == 0, np.where(separated, -np.inf, np.inf), exit)
+    return entry, exit
+
+def swept_aabb_batch(rects, displacements, obstacles):
+    """
+    The vectorized version of `swept_aabb` for many moving rects against many static rects
+
+    @param rects An array of shape (N, 4) of the moving rects (x, y, width, height) at the start of the frame
+    @param displacements An array of shape (N, 2) of the displacements (dx, dy) of the moving rects
+    @param obstacles An array of shape (M, 4) of the static rects made by `rects_to_array()`
+    @return A tuple (times, normals).
+            `times` is a float array of shape (N, M). The element [i, j] is the time of `rects[i]`
+            hitting `obstacles[j]`, or `inf` if it doesn't hit.
+            `normals` is an int array of shape (N, M, 2) of the normals of the hit surfaces,
+            which are (0, 0) if the rects don't hit.
+    """
+    rects = np.asarray(rects, dtype=np.float64)[:, np.newaxis, :]
+    displacements = np.asarray(displacements, dtype=np.float64)[:, np.newaxis, :]
+    left, top, right, bottom = _to_edges(rects)
+    obstacle_left, obstacle_top, obstacle_right, obstacle_bottom = _to_edges(
+        np.asarray(obstacles, dtype=np.float64)[np.newaxis, :, :])
+    dx = displacements[..., 0]
+    dy = displacements[..., 1]
+
+    entry_x, exit_x = _sweep_axis_batch(left, right, obstacle_left, obstacle_right, dx)
+    entry_y, exit_y = _sweep_axis_batch(top, bottom, obstacle_top, obstacle_bottom, dy)
+    entry = np.maximum(entry_x, entry_y)
+    hit = (entry <= np.minimum(exit_x, exit_y)) & (entry >= 0) & (entry <= 1)
+
+    times = np.where(hit, entry, np.inf)
+    normals = np.stack((
+        np.where(hit & (entry_x == entry), -np.sign(dx), 0),
+        np.where(hit & (entry_y == entry), -np.sign(dy), 0)), axis=-1).astype(np.int64)
+    return times, normals
+
 def bounce_off_ip(bounce_obj_rect: Rect, bounce_obj_speed,
     hit_obj_rect: Rect, hit_obj_speed):
     """
@@ -249,3 +400,229 @@ def bounce_in_box(bounce_obj_rect: Rect, bounce_obj_speed,
     bounce_in_box_ip(new_bounce_obj_rect, new_bounce_obj_speed, box_rect)
 
     return (new_bounce_obj_rect, new_bounce_obj_speed)
+
+def _get_bounds(obj) -> tuple:
+    """
+    Get (left, top, right, bottom) of a `Sprite` or a `Rect`.
+    The edges are inclusive as `collide_or_contact`.
+    """
+    rect = getattr(obj, "rect", obj)
+    return rect.left, rect.top, rect.right, rect.bottom
+
+def _get_swept_bounds(sprite) -> tuple:
+    """
+    Get the bounds covering the sprite and its `last_pos` if it has one
+    """
+    left, top, right, bottom = _get_bounds(sprite)
+    last_pos = getattr(sprite, "last_pos", None)
+    if last_pos is None:
+        return left, top, right, bottom
+    return (min(left, last_pos.left), min(top, last_pos.top),
+        max(right, last_pos.right), max(bottom, last_pos.bottom))
+
+def _bounds_overlap(bounds_a, bounds_b) -> bool:
+    return (bounds_a[0] <= bounds_b[2] and bounds_a[2] >= bounds_b[0] and
+        bounds_a[1] <= bounds_b[3] and bounds_a[3] >= bounds_b[1])
+
+class SpatialIndex(abc.ABC):
+    """
+    The broad-phase index of the sprites or rects in the scene.
+
+    The queries return the candidates whose bounding boxes collide or contact the target,
+    and the exact result should be checked by `collide_or_contact` or `moving_collide_or_contact`.
+    The index doesn't follow the sprites, call `move()` after a sprite moves.
+    """
+    def __init__(self):
+        self._items = {}
+        self._bounds = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return id(item) in self._items
+
+    def insert(self, item, rect: Rect = None):
+        """
+        Add a sprite or a rect to the index
+
+        @param item The `Sprite` which has the `rect` attribute, or a `Rect`
+        @param rect The area of the item. Use the rect of `item` if it is None.
+        """
+        key = id(item)
+        if key in self._items:
+            raise ValueError("The item is already in the index")
+        bounds = _get_bounds(item if rect is None else rect)
+        self._items[key] = item
+        self._bounds[key] = bounds
+        self._insert(key, bounds)
+
+    def move(self, item, rect: Rect = None):
+        """
+        Update the area of the item in the index
+        """
+        key = id(item)
+        bounds = _get_bounds(item if rect is None else rect)
+        if bounds != self._bounds[key]:
+            self._move(key, self._bounds[key], bounds)
+            self._bounds[key] = bounds
+
+    def remove(self, item):
+        key = id(item)
+        self._remove(key, self._bounds.pop(key))
+        del self._items[key]
+
+    def query(self, rect) -> list:
+        """
+        Get the items which may collide or contact the area
+
+        @param rect The `Rect` or the `Sprite` to query
+        """
+        return self._query(_get_bounds(rect))
+
+    def query_pairs(self, sprites) -> list:
+        """
+        Get the candidate pairs of the sprites and the items in the index.
+        The area between `last_pos` and `rect` is queried for the moving sprites.
+
+        @param sprites The sprites to query. The sprite itself is excluded if it is in the index.
+        @return A list of (sprite, item)
+        """
+        pairs = []
+        for sprite in sprites:
+            pairs.extend((sprite, item) for item in self._query(_get_swept_bounds(sprite))
+                if item is not sprite)
+        return pairs
+
+    def _move(self, key, old_bounds, new_bounds):
+        self._remove(key, old_bounds)
+        self._insert(key, new_bounds)
+
+    @abc.abstractmethod
+    def _insert(self, key, bounds):
+        pass
+
+    @abc.abstractmethod
+    def _remove(self, key, bounds):
+        pass
+
+    @abc.abstractmethod
+    def _query(self, bounds) -> list:
+        pass
+
+class UniformGrid(SpatialIndex):
+    """
+    The spatial index which puts the items into the square cells they cover.
+    It fits the scenes whose objects have similar sizes, like bricks or walls.
+    """
+    def __init__(self, cell_size: int):
+        """
+        @param cell_size The width and the height of a cell.
+               It is better to be larger than most of the items.
+        """
+        super().__init__()
+        self._cell_size = cell_size
+        self._cells = {}
+
+    def _get_cell_range(self, bounds) -> tuple:
+        size = self._cell_size
+        return bounds[0] // size, bounds[1] // size, bounds[2] // size, bounds[3] // size
+
+    def _iter_cells(self, cell_range):
+        for cell_x in range(cell_range[0], cell_range[2] + 1):
+            for cell_y in range(cell_range[1], cell_range[3] + 1):
+                yield cell_x, cell_y
+
+    def _insert(self, key, bounds):
+        for cell in self._iter_cells(self._get_cell_range(bounds)):
+            self._cells.setdefault(cell, set()).add(key)
+
+    def _remove(self, key, bounds):
+        for cell in self._iter_cells(self._get_cell_range(bounds)):
+            cell_keys = self._cells[cell]
+            cell_keys.discard(key)
+            if not cell_keys:
+                del self._cells[cell]
+
+    def _move(self, key, old_bounds, new_bounds):
+        # Most of the moves stay in the same cells
+        if self._get_cell_range(old_bounds) != self._get_cell_range(new_bounds):
+            super()._move(key, old_bounds, new_bounds)
+
+    def _query(self, bounds) -> list:
+        keys = set()
+        for cell in self._iter_cells(self._get_cell_range(bounds)):
+            keys.update(self._cells.get(cell, ()))
+        return [self._items[key] for key in keys if _bounds_overlap(self._bounds[key], bounds)]
+
+class _QuadNode:
+    __slots__ = ("bounds", "depth", "keys", "children")
+
+    def __init__(self, bounds, depth):
+        self.bounds = bounds
+        self.depth = depth
+        self.keys = set()
+        self.children = None
+
+    def contains(self, bounds) -> bool:
+        return (self.bounds[0] <= bounds[0] and bounds[2] <= self.bounds[2] and
+            self.bounds[1] <= bounds[1] and bounds[3] <= self.bounds[3])
+
+class QuadTree(SpatialIndex):
+    """
+    The spatial index which splits the area into quadrants recursively.
+    It fits the scenes whose objects have various sizes or are distributed unevenly.
+
+    An item is kept in the smallest node containing it. The items out of the area are kept in the root.
+    """
+    def __init__(self, area: Rect, max_items: int = 8, max_depth: int = 8):
+        """
+        @param area The area of the scene
+        @param max_items The number of the items of a node to split it
+        @param max_depth The maximum depth of the nodes
+        """
+        super().__init__()
+        self._root = _QuadNode(_get_bounds(area), 0)
+        self._max_items = max_items
+        self._max_depth = max_depth
+        self._nodes = {}
+
+    def _insert(self, key, bounds):
+        node = self._root
+        while node.children is not None:
+            child = next((child for child in node.children if child.contains(bounds)), None)
+            if child is None:
+                break
+            node = child
+        node.keys.add(key)
+        self._nodes[key] = node
+        if (node.children is None and len(node.keys) > self._max_items and
+            node.depth < self._max_depth):
+            self._split(node)
+
+    def _split(self, node: _QuadNode):
+        left, top, right, bottom = node.bounds
+        center_x = (left + right) // 2
+        center_y = (top + bottom) // 2
+        node.children = [
+            _QuadNode(child_bounds, node.depth + 1) for child_bounds in (
+                (left, top, center_x, center_y), (center_x, top, right, center_y),
+                (left, center_y, center_x, bottom), (center_x, center_y, right, bottom))]
+        keys = node.keys
+        node.keys = set()
+        for key in keys:
+            self._insert(key, self._bounds[key])
+
+    def _remove(self, key, bounds):
+        self._nodes.pop(key).keys.discard(key)
+
+    def _query(self, bounds) -> list:
+        result = []
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            result.extend(self._items[key] for key in node.keys
+                if _bounds_overlap(self._bounds[key], bounds))
+            if node.children is not None:
+                nodes.extend(child for child in node.children if _bounds_overlap(child.bounds, bounds))
+        return result
@@ -0,0 +1,5 @@
+import os
+
+# The tests of the views open pygame displays, which need the dummy video driver on headless machines.
+# It must be set before pygame opens any display.
+os.environ["SDL_VIDEODRIVER"] = "dummy"
@@ -0,0 +1,51 @@
+import os
+import threading
+
+import pygame
+
+from mlgame.utils.enum import CapturePolicy
+from mlgame.view.capture import FrameCapturer
+
+
+def _create_surface(color):
+    surface = pygame.Surface((20, 10))
+    surface.fill(color)
+    return surface
+
+
+class TestFrameCapturer:
+    def test_capture_with_stride(self, tmp_path):
+        capturer = FrameCapturer(tmp_path, queue_size=2, stride=2, image_format="png")
+        surface = _create_surface((255, 0, 0))
+        for frame_no in range(1, 6):
+            capturer.capture(surface, frame_no)
+        capturer.capture(None, 7)
+        capturer.close()
+
+        assert sorted(os.listdir(tmp_path)) == ["00001.png", "00003.png", "00005.png"]
+        assert pygame.image.load(tmp_path / "00003.png").get_at((5, 5)) == (255, 0, 0, 255)
+
+    def test_the_captured_frame_is_a_copy(self, tmp_path, monkeypatch):
+        saving = threading.Event()
+        release = threading.Event()
+        origin_save = pygame.image.save
+
+        def slow_save(surface, path):
+            saving.set()
+            release.wait(5)
+            origin_save(surface, path)
+
+        monkeypatch.setattr(pygame.image, "save", slow_save)
+        capturer = FrameCapturer(tmp_path, queue_size=1, policy=CapturePolicy.DROP, image_format="png")
+        surface = _create_surface((0, 255, 0))
+        capturer.capture(surface, 1)
+        saving.wait(5)
+        # the display is drawn again while the encoder is saving the last frame
+        surface.fill((0, 0, 255))
+        capturer.capture(surface, 2)
+        release.set()
+        capturer.close()
+
+        assert capturer.dropped_count == 1
+        assert os.listdir(tmp_path) == ["00001.png"]
+        assert pygame.image.load(tmp_path / "00001.png").get_at((5, 5)) == (0, 255, 0, 255)
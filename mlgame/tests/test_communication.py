@@ -0,0 +1,285 @@
+import time
+from multiprocessing import Pipe
+from multiprocessing.reduction import ForkingPickler
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from mlgame.core.communication import GameCommManager, TransitionCommManager
+from mlgame.core.progress_delta import ProgressDeltaEncoder, ProgressDeltaDecoder, get_view_object_attrs
+from mlgame.core.shm_transport import SharedMemoryPipe
+from mlgame.tests.test_executor.comm_mock_prototype import RecvEnd, SendEnd
+from mlgame.view.view_model import create_rect_view_data, create_scene_progress_data, create_text_view_data, \
+    VIEW_LIST_KEYS
+from mlgame.view.wire_format import MAGIC
+
+
+def _create_game_comm_with_pipes(ml_names):
+    """
+    Create a `GameCommManager` and return the ends of ml clients for sending objects to the game
+    """
+    game_comm = GameCommManager()
+    send_ends_of_ml = {}
+    for ml_name in ml_names:
+        recv_pipe_for_game, send_pipe_for_ml = Pipe(False)
+        recv_pipe_for_ml, send_pipe_for_game = Pipe(False)
+        game_comm.add_comm_to_ml(ml_name, recv_pipe_for_game, send_pipe_for_game)
+        send_ends_of_ml[ml_name] = send_pipe_for_ml
+    return game_comm, send_ends_of_ml
+
+
+class TestRecvBeforeDeadline:
+    def test_return_when_all_ml_replied(self):
+        game_comm, send_ends = _create_game_comm_with_pipes(["1P", "2P"])
+        send_ends["1P"].send("cmd_1P")
+        send_ends["2P"].send("cmd_2P")
+
+        start = time.perf_counter()
+        result = game_comm.recv_from_ml_before_deadline(["1P", "2P"], start + 5)
+
+        assert result == {"1P": "cmd_1P", "2P": "cmd_2P"}
+        assert time.perf_counter() - start < 1
+
+    def test_missing_reply_is_none_after_deadline(self):
+        game_comm, send_ends = _create_game_comm_with_pipes(["1P", "2P"])
+        send_ends["1P"].send("cmd_1P")
+
+        start = time.perf_counter()
+        result = game_comm.recv_from_ml_before_deadline(["1P", "2P"], start + 0.05)
+
+        assert result == {"1P": "cmd_1P", "2P": None}
+        assert time.perf_counter() - start >= 0.05
+
+    def test_only_receive_one_object_per_ml(self):
+        game_comm, send_ends = _create_game_comm_with_pipes(["1P"])
+        send_ends["1P"].send("frame_0")
+        send_ends["1P"].send("frame_1")
+
+        assert game_comm.recv_from_ml_before_deadline(["1P"], time.perf_counter() + 1) == {"1P": "frame_0"}
+        assert game_comm.recv_from_ml_before_deadline(["1P"], time.perf_counter() + 1) == {"1P": "frame_1"}
+
+
+class TestSharedMemoryPipe:
+    def test_send_and_recv(self):
+        recv_end, send_end = SharedMemoryPipe(capacity=1024)
+        try:
+            assert not recv_end.poll()
+            send_end.send(({"status": "GAME_ALIVE", "grid": np.arange(12).reshape(3, 4)}, ["key"]))
+            assert recv_end.poll()
+
+            scene_info, keyboard = recv_end.recv()
+            assert scene_info["status"] == "GAME_ALIVE"
+            assert (scene_info["grid"] == np.arange(12).reshape(3, 4)).all()
+            assert keyboard == ["key"]
+            assert not recv_end.poll()
+        finally:
+            send_end.close()
+
+    def test_messages_wrap_around_the_ring_buffer(self):
+        recv_end, send_end = SharedMemoryPipe(capacity=256)
+        try:
+            for i in range(50):
+                send_end.send({"frame": i, "data": "x" * (i % 7)})
+                send_end.send(None)
+                assert recv_end.recv() == {"frame": i, "data": "x" * (i % 7)}
+                assert recv_end.recv() is None
+        finally:
+            send_end.close()
+
+    def test_send_large_message_through_pipe(self):
+        recv_end, send_end = SharedMemoryPipe(capacity=64)
+        try:
+            send_end.send("a")
+            send_end.send({"grid": np.arange(100)})
+            send_end.send("b")
+            assert recv_end.recv() == "a"
+            received = recv_end.recv()
+            assert (received["grid"] == np.arange(100)).all()
+            received["grid"][0] = 1
+            assert recv_end.recv() == "b"
+        finally:
+            send_end.close()
+
+    def test_send_through_pipe_when_ring_buffer_is_full(self):
+        recv_end, send_end = SharedMemoryPipe(capacity=256)
+        try:
+            for i in range(20):
+                send_end.send("x" * 50 + str(i))
+            assert [recv_end.recv() for _ in range(20)] == ["x" * 50 + str(i) for i in range(20)]
+        finally:
+            send_end.close()
+
+    def test_wait_by_game_comm(self):
+        game_comm = GameCommManager()
+        recv_end, send_end = SharedMemoryPipe(capacity=1024)
+        game_comm.add_comm_to_ml("1P", recv_end, send_end)
+        try:
+            start = time.perf_counter()
+            assert game_comm.recv_from_ml_before_deadline(["1P"], start + 0.05) == {"1P": None}
+            assert time.perf_counter() - start >= 0.05
+
+            send_end.send("READY")
+            assert game_comm.wait_for_ml(["1P"], 1) == ["1P"]
+            assert game_comm.recv_from_ml("1P") == "READY"
+        finally:
+            game_comm.close_comm_to_ml()
+
+
+class TestBroadcastToOthers:
+    @staticmethod
+    def _create_game_comm():
+        game_comm = GameCommManager()
+        transition_comms = []
+        for name in ["ws", "pl"]:
+            recv_pipe_for_game, send_pipe_for_transition = Pipe(False)
+            recv_pipe_for_transition, send_pipe_for_game = Pipe(False)
+            game_comm.add_comm_to_others(name, recv_pipe_for_game, send_pipe_for_game)
+            transition_comm = TransitionCommManager(recv_pipe_for_transition, send_pipe_for_transition)
+            transition_comm.start_recv_obj_thread()
+            transition_comms.append(transition_comm)
+        other_send = Mock(SendEnd)
+        game_comm.add_comm_to_others("other", RecvEnd(), other_send)
+        return game_comm, transition_comms, other_send
+
+    def test_serialize_once_and_decode_lazily(self, monkeypatch):
+        game_comm, transition_comms, other_send = self._create_game_comm()
+
+        dumps = Mock(wraps=ForkingPickler.dumps)
+        monkeypatch.setattr(ForkingPickler, "dumps", dumps)
+        game_comm.send_game_result({"frame_used": 1})
+        game_comm.send_end_message()
+
+        # the end message is sent as `END_OF_STREAM` without pickling
+        assert dumps.call_count == 1
+        other_send.send.assert_any_call({"type": "game_result", "data": {"frame_used": 1}})
+        other_send.send.assert_called_with(None)
+        for transition_comm in transition_comms:
+            assert transition_comm.recv_from_game() == {"type": "game_result", "data": {"frame_used": 1}}
+            assert transition_comm.recv_from_game() is None
+
+    def test_send_progress_in_wire_format(self, monkeypatch):
+        game_comm, transition_comms, other_send = self._create_game_comm()
+
+        dumps = Mock(wraps=ForkingPickler.dumps)
+        monkeypatch.setattr(ForkingPickler, "dumps", dumps)
+        game_comm.send_game_progress(_progress(1, 0, 0))
+        game_comm.send_end_message()
+
+        assert dumps.call_count == 0
+        assert other_send.send.call_args_list[0].args[0].startswith(MAGIC)
+        for transition_comm in transition_comms:
+            game_data = transition_comm.recv_from_game()
+            assert game_data["type"] == "game_progress"
+            assert _to_comparable(game_data["data"]) == _to_comparable(_progress(1, 0, 0))
+            assert transition_comm.recv_from_game() is None
+
+    def test_pickle_progress_of_dicts(self):
+        game_comm, transition_comms, other_send = self._create_game_comm()
+        progress = {"frame": 1, "object_list": [{"type": "rect", "x": 0}]}
+        game_comm.send_game_progress(progress)
+        game_comm.send_end_message()
+
+        other_send.send.assert_any_call({"type": "game_progress", "data": progress})
+        for transition_comm in transition_comms:
+            assert transition_comm.recv_from_game() == {"type": "game_progress", "data": progress}
+            assert transition_comm.recv_from_game() is None
+
+
+def _progress(frame, car_x, score):
+    walls = [create_rect_view_data("wall", i * 10, 0, 10, 10, "#FFFFFF") for i in range(5)]
+    return create_scene_progress_data(
+        frame=frame,
+        background=walls,
+        object_list=[create_rect_view_data("car", car_x, 50, 20, 20, "#FF0000")],
+        foreground=[create_text_view_data(f"score={score}", 0, 0, "#FFFFFF")],
+        game_sys_info={"frame": frame})
+
+
+def _to_comparable(progress):
+    return {key: [get_view_object_attrs(obj) for obj in value] if key in VIEW_LIST_KEYS else value
+            for key, value in progress.items()}
+
+
+class TestProgressDelta:
+    def test_emit_only_changed_objects(self):
+        encoder = ProgressDeltaEncoder(keyframe_interval=100)
+        first = encoder.encode(_progress(1, 0, 0))
+        second = encoder.encode(_progress(2, 5, 0))
+
+        assert first["keyframe"]
+        assert len(first["added"]) == 7
+        assert not second["keyframe"]
+        assert second["added"] == {}
+        assert list(second["changed"].values()) == [{"x": 5}]
+        assert second["orders"] == {}
+        assert second["removed"] == []
+
+    def test_decode_to_full_progress(self):
+        encoder = ProgressDeltaEncoder(keyframe_interval=3)
+        decoder = ProgressDeltaDecoder()
+        progress_list = [_progress(i, i * 2, i // 2) for i in range(7)]
+        # remove a wall and add a car
+        progress_list[4]["background"].pop(2)
+        progress_list[5]["object_list"].append(create_rect_view_data("car", 0, 0, 1, 1, "#000000"))
+
+        decoded_list = [decoder.decode(encoder.encode(progress)) for progress in progress_list]
+
+        for progress, decoded in zip(progress_list, decoded_list):
+            assert _to_comparable(decoded) == _to_comparable(progress)
+
+    def test_forget_ids_of_removed_objects(self):
+        encoder = ProgressDeltaEncoder(keyframe_interval=4)
+        decoder = ProgressDeltaDecoder()
+        for frame in range(20):
+            # a new name every frame
+            progress = create_scene_progress_data(
+                frame=frame, object_list=[create_rect_view_data(f"bullet_{frame}", frame, 0, 1, 1, "#FFFFFF")])
+            decoded = decoder.decode(encoder.encode(progress))
+            assert _to_comparable(decoded) == _to_comparable(progress)
+            assert len(encoder._last_groups) == 1
+
+    def test_keep_ids_when_removing_an_object_of_the_same_name(self):
+        encoder = ProgressDeltaEncoder(keyframe_interval=100)
+        decoder = ProgressDeltaDecoder()
+        first = _progress(1, 0, 0)
+        second = _progress(2, 0, 0)
+        second["background"].pop(1)
+        decoder.decode(encoder.encode(first))
+        delta = encoder.encode(second)
+
+        assert delta["changed"] == {}
+        assert delta["added"] == {}
+        assert len(delta["removed"]) == 1
+        assert _to_comparable(decoder.decode(delta)) == _to_comparable(second)
+
+    def test_remove_missing_list(self):
+        encoder = ProgressDeltaEncoder(keyframe_interval=100)
+        decoder = ProgressDeltaDecoder()
+        first = _progress(1, 0, 0)
+        second = _progress(2, 0, 0)
+        del second["foreground"]
+        decoder.decode(encoder.encode(first))
+        decoded = decoder.decode(encoder.encode(second))
+
+        assert "foreground" not in decoded
+        assert _to_comparable(decoded) == _to_comparable(second)
+
+    def test_transition_comm_decodes_delta(self):
+        game_comm = GameCommManager()
+        game_comm.enable_progress_delta()
+        recv_pipe_for_game, send_pipe_for_transition = Pipe(False)
+        recv_pipe_for_transition, send_pipe_for_game = Pipe(False)
+        game_comm.add_comm_to_others("pl", recv_pipe_for_game, send_pipe_for_game)
+        transition_comm = TransitionCommManager(recv_pipe_for_transition, send_pipe_for_transition)
+        transition_comm.start_recv_obj_thread()
+
+        for i in range(3):
+            game_comm.send_game_progress(_progress(i, i, i))
+        game_comm.send_end_message()
+
+        for i in range(3):
+            received = transition_comm.recv_from_game()
+            assert received["type"] == "game_progress"
+            assert _to_comparable(received["data"]) == _to_comparable(_progress(i, i, i))
+        assert transition_comm.recv_from_game() is None
@@ -5,7 +5,8 @@ import pytest
 
 from mlgame.core.communication import MLCommManager
 
-from mlgame.core.executor import AIClientExecutor, AIClient
+from mlgame.core.exceptions import GameError, ErrorEnum
+from mlgame.core.executor import AIClientExecutor, AIClient, InProcessAIClientExecutor
 from mlgame.tests.test_executor.comm_mock_prototype import RecvEnd, SendEnd
 from mlgame.tests.test_executor.test_helper import assert_same
 
@@ -86,3 +87,55 @@ class TestAIExecutor:
         ai_comm.set_comm_to_game(recv_end, send_end)
         return ai_comm, send_end
 
+
+
+class TestInProcessAIExecutor:
+    def test_reply_commands_and_ready_after_game_over(self):
+        ai_client = Mock(MLPlay)
+        ai_client.update = Mock(return_value='AI_COMMAND')
+        executor = InProcessAIClientExecutor('tester', ai_loader=fixed_ai_loader(ai_client))
+
+        executor.run()
+        assert executor.poll()
+        assert executor.recv() == 'READY'
+        assert not executor.poll()
+
+        for i in range(3):
+            executor.send(({'status': 'GAME_ALIVE'}, []))
+            assert executor.recv() == {'frame': i, 'command': 'AI_COMMAND'}
+
+        executor.send(({'status': 'GAME_OVER'}, []))
+        ai_client.reset.assert_called_once()
+        assert executor.recv() == 'READY'
+
+        executor.send(None)
+        executor.send(({'status': 'GAME_ALIVE'}, []))
+        assert not executor.poll()
+
+    def test_reply_without_command(self):
+        ai_client = Mock(MLPlay)
+        ai_client.update = Mock(return_value=None)
+        executor = InProcessAIClientExecutor('tester', ai_loader=fixed_ai_loader(ai_client))
+
+        executor.run()
+        assert executor.recv() == 'READY'
+        # the game in the barrier mode doesn't wait until the deadline for the client without command
+        executor.send(({'status': 'GAME_ALIVE'}, []))
+        assert executor.recv() == {'frame': 0, 'command': None}
+
+    def test_map_error_of_ai_client_to_game_error(self):
+        ai_client = Mock(MLPlay)
+        ai_client.update = Mock(side_effect=ValueError('bad ai'))
+        executor = InProcessAIClientExecutor('tester', ai_loader=fixed_ai_loader(ai_client))
+
+        executor.run()
+        assert executor.recv() == 'READY'
+        executor.send(({'status': 'GAME_ALIVE'}, []))
+
+        error = executor.recv()
+        assert isinstance(error, GameError)
+        assert error.error_type == ErrorEnum.AI_EXEC_ERROR
+        assert 'bad ai' in error.message
+
+        executor.send(({'status': 'GAME_ALIVE'}, []))
+        assert not executor.poll()
@@ -1,4 +1,6 @@
 import os
+import time
+from multiprocessing import Pipe
 from unittest.mock import Mock, ANY
 
 from mlgame.core.exceptions import GameError, ErrorEnum
@@ -12,6 +14,7 @@ from mlgame.core.communication import GameCommManager
 from mlgame.game.paia_game import PaiaGame
 
 from mlgame.core.executor import GameExecutor
+from mlgame.utils.enum import ExecutionMode
 
 
 class TestPaiaGame(PaiaGame):
@@ -142,6 +145,94 @@ class TestGameExecutor:
             expect_calls.send_to_other.send({'type': 'system_message', 'data': {'message': '關閉遊戲'}})
             expect_calls.send_to_other.send(None)
 
+    def test_single_ai_client_barrier_mode(self):
+        game, game_mock = _mock_game(['UPDATE'] * 5 + ['QUIT'])
+        game_comm_manager, send_to_ml, send_to_other = _mock_comm_manager(
+            ['READY'] + [{'command': 'AI_COMMAND', 'frame': i} for i in range(6)]
+        )
+        view, view_mock = _mock_view()
+        func_calls_test = _gather_mocks(game_mock, view_mock, send_to_ml, send_to_other)
+
+        executor = GameExecutor(
+            game,
+            game_comm_manager,
+            view,
+            no_display=True,
+            fps=1,  # the frame should not wait for a whole second when the command has arrived
+            execution_mode=ExecutionMode.BARRIER
+        )
+
+        start = time.perf_counter()
+        executor.run()
+        assert time.perf_counter() - start < 6
+
+        with assert_same(func_calls_test.mock_calls) as expect_calls:
+            expect_calls.send_to_other.send({'type': 'system_message', 'data': {'message': 'AI準備中'}})
+            expect_calls.send_to_other.send({'type': 'game_info', 'data': {'scene': 'aaannn'}})
+            expect_calls.send_to_other.send({'type': 'system_message', 'data': {'message': '遊戲啟動'}})
+            for i in range(1, 7):
+                expect_calls.view_mock.is_paused()
+                expect_calls.send_to_ml.send(('game data', {'info': 'kb'}))
+                expect_calls.game_mock.update({'1P': 'AI_COMMAND'})
+                expect_calls.view_mock.draw({'draw_data': 'DRAW_DATA', 'frame': i})
+                expect_calls.send_to_other.send({'type': 'game_progress', 'data': {'draw_data': 'DRAW_DATA', 'frame': i}})
+
+            expect_calls.send_to_ml.send(('game data', []))
+            expect_calls.send_to_other.send({'type': 'system_message', 'data': {'message': '遊戲結束'}})
+            expect_calls.send_to_other.send({'type': 'game_result', 'data': {'attachment': [1, 2]}})
+            expect_calls.send_to_other.send({'type': 'system_message', 'data': {'message': '關閉遊戲'}})
+            expect_calls.send_to_other.send(None)
+
+    def test_barrier_mode_drops_late_reply(self):
+        game, game_mock = _mock_game(['UPDATE'] * 5 + ['QUIT'])
+        game_comm_manager, send_to_ml, send_to_other = _mock_comm_manager(
+            ['READY'] + [{'command': f'CMD_{i}', 'frame': i} for i in range(6)]
+        )
+        # the client misses the deadline of the frame 0, and replies it late in the frame 1.
+        # "READY" is polled twice, by waiting for it and by receiving it.
+        polls = iter([True, True, False])
+        game_comm_manager._comm_to_ml_set._comm_handlers["1P"]._recv_end.poll = lambda: next(polls, True)
+        view, view_mock = _mock_view()
+
+        executor = GameExecutor(
+            game,
+            game_comm_manager,
+            view,
+            no_display=True,
+            fps=5000,
+            execution_mode=ExecutionMode.BARRIER
+        )
+        executor.run()
+
+        assert [call.args[0] for call in game_mock.update.call_args_list] == \
+               [{'1P': None}] + [{'1P': f'CMD_{i}'} for i in range(1, 6)]
+
+    def test_turbo_mode_skips_progress_without_consumer(self):
+        game, game_mock = _mock_game(['UPDATE'] * 5 + ['QUIT'])
+        game.get_scene_progress_data = Mock(wraps=game.get_scene_progress_data)
+        game_comm_manager = GameCommManager()
+        ml_recv, send_to_ml = _mock_ml_comm(
+            ['READY'] + [{'command': 'AI_COMMAND', 'frame': i} for i in range(6)])
+        game_comm_manager.add_comm_to_ml("1P", ml_recv, send_to_ml)
+        view, view_mock = _mock_view()
+
+        executor = GameExecutor(
+            game,
+            game_comm_manager,
+            view,
+            no_display=True,
+            fps=1,
+            execution_mode=ExecutionMode.TURBO
+        )
+
+        start = time.perf_counter()
+        executor.run()
+        assert time.perf_counter() - start < 1
+
+        assert game_mock.update.call_count == 6
+        game.get_scene_progress_data.assert_not_called()
+        view_mock.draw.assert_not_called()
+
     def test_single_ai_client_no_display_2_games(self):
         game, game_mock = _mock_game(['UPDATE'] * 5 + ['RESET'] + ['UPDATE'] * 5 + ['QUIT'])
         game_comm_manager, send_to_ml, send_to_other = _mock_comm_manager(
@@ -222,3 +313,26 @@ class TestGameExecutor:
                 'type': 'game_error',
                 'data': {'message': ANY, 'error_type': 'GAME_EXEC_ERROR', 'frame': 0}
             })
+
+    def test_ml_not_ready_before_init_timeout_is_dead(self):
+        game, game_mock = _mock_game(['QUIT'])
+        game_comm_manager = GameCommManager()
+        send_ends_of_ml = {}
+        for ml_name in ['1P', '2P']:
+            recv_pipe_for_game, send_pipe_for_ml = Pipe(False)
+            game_comm_manager.add_comm_to_ml(ml_name, recv_pipe_for_game, Mock(SendEnd))
+            send_ends_of_ml[ml_name] = send_pipe_for_ml
+        other_send = Mock(SendEnd)
+        game_comm_manager.add_comm_to_others('other', RecvEnd(), other_send)
+        view, view_mock = _mock_view()
+
+        executor = GameExecutor(game, game_comm_manager, view, no_display=True, ml_init_timeout=0.1)
+        send_ends_of_ml['2P'].send('READY')
+        executor._wait_all_ml_ready()
+
+        assert executor._active_ml_names == ['2P']
+        assert list(executor._ml_init_latency) == ['2P']
+        other_send.send.assert_called_once_with({
+            'type': 'game_error',
+            'data': {'message': 'AI of 1P is not ready in 0.1 seconds.', 'error_type': 'AI_INIT_ERROR', 'frame': 0}
+        })
@@ -0,0 +1,53 @@
+import threading
+
+import pygame
+
+from mlgame.view import font as font_module
+from mlgame.view.font import FontRegistry, parse_font_style
+from mlgame.view.view import PygameView
+from mlgame.view.view_model import create_scene_progress_data, create_scene_view_data, Text
+
+
+def test_parse_font_style():
+    assert parse_font_style("24px Arial") == ("arial", 24, False)
+    assert parse_font_style("16px Arial BOLD") == ("arial", 16, True)
+
+
+class TestFontRegistry:
+    def test_scan_font_styles(self):
+        registry = FontRegistry()
+        assert registry.scan([Text("a", 0, 0, "#FFFFFF", "16px Arial"),
+                              {"type": "text", "font-style": "24px Arial BOLD"},
+                              {"type": "rect"}]) == ["16px Arial", "24px Arial BOLD"]
+        assert registry.scan([Text("b", 0, 0, "#FFFFFF", "16px Arial")]) == []
+        assert registry.font_styles == {"16px Arial", "24px Arial BOLD"}
+
+    def test_load_fonts_in_background(self):
+        pygame.font.init()
+        registry = FontRegistry()
+        registry.scan([Text("a", 0, 0, "#FFFFFF", "10px Arial")], scale=2)
+        for thread in threading.enumerate():
+            if thread.name == "font_loading":
+                thread.join()
+        assert ("10px Arial", 20) in registry._fonts
+        assert registry.get_font("10px Arial", 2) is registry._fonts[("10px Arial", 20)]
+
+    def test_get_font_of_scaled_size(self, monkeypatch):
+        pygame.font.init()
+        font_module.match_font_file.cache_clear()
+        match_calls = []
+        monkeypatch.setattr(pygame.font, "match_font", lambda name, bold=False: match_calls.append(name))
+        registry = FontRegistry()
+        font = registry.get_font("20px Courier")
+        assert registry.get_font("20px Courier", 1.01) is font
+        assert registry.get_font("20px Courier", 0.5).get_height() < font.get_height()
+        assert match_calls.count("courier") == 1
+        font_module.match_font_file.cache_clear()
+
+    def test_draw_text_of_unknown_font_style(self):
+        view = PygameView({"scene": create_scene_view_data(200, 100), "assets": [], "background": []})
+        view.draw(create_scene_progress_data(foreground=[Text("score", 10, 10, "#FFFFFF", "18px Arial")]))
+        assert view.font_registry.font_styles == {"18px Arial"}
+        assert ("18px Arial", 1) in view.font_registry._scanned
+        assert pygame.transform.average_color(view.get_display_surface(), (10, 10, 40, 12))[:3] != (0, 0, 0)
+        pygame.display.quit()
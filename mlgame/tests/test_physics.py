@@ -0,0 +1,136 @@
+import random
+
+import numpy as np
+import pytest
+from pygame import Rect
+from pygame.sprite import Sprite
+
+from mlgame.game.physics import collide_or_contact, moving_collide_or_contact, QuadTree, UniformGrid, \
+    rects_to_array, collide_or_contact_mask, collide_or_contact_pairs, rect_break_or_contact_box, \
+    rect_break_or_contact_box_mask, swept_aabb, swept_aabb_batch
+
+
+def _create_sprite(x, y, width, height):
+    sprite = Sprite()
+    sprite.rect = Rect(x, y, width, height)
+    return sprite
+
+
+def _create_random_sprites(count, rng):
+    return [_create_sprite(rng.randrange(-20, 400), rng.randrange(-20, 300),
+                           rng.randrange(1, 40), rng.randrange(1, 40)) for _ in range(count)]
+
+
+@pytest.fixture(params=["grid", "quadtree"])
+def spatial_index(request):
+    if request.param == "grid":
+        return UniformGrid(32)
+    return QuadTree(Rect(0, 0, 400, 300), max_items=4)
+
+
+class TestSpatialIndex:
+    def test_query_same_result_as_brute_force(self, spatial_index):
+        rng = random.Random(0)
+        sprites = _create_random_sprites(300, rng)
+        for sprite in sprites:
+            spatial_index.insert(sprite)
+        for sprite in sprites[:100]:
+            sprite.rect.move_ip(rng.randrange(-30, 30), rng.randrange(-30, 30))
+            spatial_index.move(sprite)
+        for sprite in sprites[200:]:
+            spatial_index.remove(sprite)
+        assert len(spatial_index) == 200
+
+        for target in _create_random_sprites(50, rng):
+            expected = [sprite for sprite in sprites[:200] if collide_or_contact(target, sprite)]
+            assert set(map(id, spatial_index.query(target))) == set(map(id, expected))
+
+    def test_query_contacting_rect(self, spatial_index):
+        rect = Rect(10, 10, 20, 20)
+        spatial_index.insert(rect)
+        # `collide_or_contact` takes the right and bottom edges into account
+        assert spatial_index.query(Rect(30, 30, 5, 5)) == [rect]
+        assert spatial_index.query(Rect(31, 10, 5, 5)) == []
+        assert rect in spatial_index
+        with pytest.raises(ValueError):
+            spatial_index.insert(rect)
+
+    def test_query_pairs_of_moving_sprite(self, spatial_index):
+        bricks = [_create_sprite(x, 100, 30, 10) for x in range(0, 300, 40)]
+        for brick in bricks:
+            spatial_index.insert(brick)
+        ball = _create_sprite(45, 150, 5, 5)
+        ball.last_pos = ball.rect.copy()
+        ball.rect.move_ip(0, -60)
+        spatial_index.insert(ball)
+
+        pairs = spatial_index.query_pairs([ball])
+        assert pairs == [(ball, bricks[1])]
+        assert [item for sprite, item in pairs if moving_collide_or_contact(sprite, item)] == [bricks[1]]
+
+
+class TestBatchedCollision:
+    def test_same_result_as_pairwise(self):
+        rng = random.Random(1)
+        sprites_a = _create_random_sprites(60, rng)
+        sprites_b = _create_random_sprites(40, rng)
+        rects_a = rects_to_array(sprites_a)
+        rects_b = rects_to_array(sprites_b)
+        assert rects_a.shape == (60, 4)
+
+        assert collide_or_contact_mask(rects_a, sprites_b[0]).tolist() == [
+            collide_or_contact(sprite, sprites_b[0]) for sprite in sprites_a]
+        assert collide_or_contact_pairs(rects_a, rects_b).tolist() == [
+            [i, j] for i, sprite_a in enumerate(sprites_a) for j, sprite_b in enumerate(sprites_b)
+            if collide_or_contact(sprite_a, sprite_b)]
+
+    def test_inclusive_edges(self):
+        rects = rects_to_array([Rect(0, 0, 10, 10), Rect(11, 0, 10, 10), Rect(10, 10, 5, 5)])
+        assert collide_or_contact_mask(rects, (10, 0, 1, 10)).tolist() == [True, True, True]
+        assert collide_or_contact_mask(rects, Rect(16, 16, 1, 1)).tolist() == [False, False, False]
+
+        box = Rect(0, 0, 21, 100)
+        assert rect_break_or_contact_box_mask(rects, box).tolist() == [
+            rect_break_or_contact_box(Rect(*rect), box) for rect in rects.tolist()]
+        assert rect_break_or_contact_box_mask(rects, box).tolist() == [True, True, False]
+
+
+class TestSweptAABB:
+    @pytest.mark.parametrize("rect, displacement, expected", [
+        # the ball moves up into the brick
+        ((45, 150, 5, 5), (0, -80), (0.5, 0, 1)),
+        # contacting the brick at the end of the frame
+        ((45, 150, 5, 5), (0, -40), (1, 0, 1)),
+        ((45, 150, 5, 5), (0, -39), None),
+        # hitting the left side
+        ((0, 100, 5, 5), (50, 0), (0.7, -1, 0)),
+        # hitting the corner exactly
+        ((30, 80, 5, 5), (10, 30), (0.5, -1, -1)),
+        # moving away from the surface
+        ((45, 110, 5, 5), (0, 10), None),
+        ((45, 105, 5, 5), (0, -10), None),
+        ((45, 150, 5, 5), (0, 0), None),
+    ])
+    def test_time_and_normal(self, rect, displacement, expected):
+        brick = (40, 100, 30, 10)
+        assert swept_aabb(*rect, *displacement, *brick) == expected
+
+    def test_batch_same_result_as_scalar(self):
+        rng = random.Random(2)
+        rects = [(rng.randrange(0, 200), rng.randrange(0, 200), rng.randrange(1, 10), rng.randrange(1, 10))
+                 for _ in range(50)]
+        displacements = [(rng.randrange(-40, 40), rng.randrange(-40, 40)) for _ in range(50)]
+        obstacles = rects_to_array(_create_random_sprites(80, rng))
+        times, normals = swept_aabb_batch(rects, displacements, obstacles)
+
+        assert times.shape == (50, 80)
+        assert normals.shape == (50, 80, 2)
+        assert np.isfinite(times).any()
+        for i, (rect, displacement) in enumerate(zip(rects, displacements)):
+            for j, obstacle in enumerate(obstacles.tolist()):
+                hit = swept_aabb(*rect, *displacement, *obstacle)
+                if hit is None:
+                    assert times[i, j] == np.inf
+                    assert normals[i, j].tolist() == [0, 0]
+                else:
+                    assert (times[i, j], *normals[i, j].tolist()) == pytest.approx(hit)
@@ -0,0 +1,40 @@
+import gzip
+import os
+
+from orjson import orjson
+
+from mlgame.utils.progress_log import NdjsonChunkWriter
+from mlgame.view.view_model import Rect
+
+
+def _read_lines(path, opener=open):
+    with opener(path, "rb") as f:
+        return [orjson.loads(line) for line in f]
+
+
+class TestNdjsonChunkWriter:
+    def test_rotate_chunks_and_rename_the_last_one(self, tmp_path):
+        writer = NdjsonChunkWriter(tmp_path, frames_per_chunk=3)
+        for frame in range(1, 8):
+            writer.write({"frame": frame, "object_list": [Rect("car", frame, 0, 1, 1, "#FFFFFF")]})
+        writer.close()
+
+        assert sorted(os.listdir(tmp_path)) == ["0.ndjson", "1.ndjson", "2-end.ndjson"]
+        assert [data["frame"] for data in _read_lines(tmp_path / "1.ndjson")] == [4, 5, 6]
+        assert _read_lines(tmp_path / "2-end.ndjson") == [{"frame": 7, "object_list": [
+            {"type": "rect", "name": "car", "x": 7, "y": 0, "width": 1, "height": 1, "color": "#FFFFFF",
+             "angle": 0}]}]
+
+    def test_compress_chunks(self, tmp_path):
+        writer = NdjsonChunkWriter(tmp_path, frames_per_chunk=3, compress_level=6)
+        for frame in range(1, 4):
+            writer.write({"frame": frame})
+        writer.close()
+
+        assert os.listdir(tmp_path) == ["0-end.ndjson.gz"]
+        assert _read_lines(tmp_path / "0-end.ndjson.gz", gzip.open) == [{"frame": 1}, {"frame": 2}, {"frame": 3}]
+
+    def test_no_file_without_frames(self, tmp_path):
+        writer = NdjsonChunkWriter(tmp_path)
+        writer.close()
+        assert os.listdir(tmp_path) == []
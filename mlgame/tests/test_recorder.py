@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+from mlgame.utils.recorder import Recorder, load_episode
+
+
+def _scene_info(frame):
+    scene_info = {
+        "frame": frame,
+        "status": "GAME_ALIVE" if frame < 4 else "GAME_OVER",
+        "ball": {"x": frame * 2, "y": 10.5},
+        "grid": [[frame, 0], [0, frame]],
+        "bricks": [[0, 0]] * (5 - frame),
+    }
+    if frame >= 2:
+        scene_info["speed"] = frame
+    return scene_info
+
+
+class TestRecorder:
+    def test_record_and_load_episodes(self, tmp_path):
+        recorder = Recorder(["1P", "2P"], tmp_path)
+        for frame in range(5):
+            recorder.record({"1P": _scene_info(frame), "2P": _scene_info(frame)},
+                            {"1P": "MOVE_LEFT" if frame % 2 else ["SERVE", "NONE"], "2P": None})
+        recorder.flush_to_file()
+        recorder.record({"1P": _scene_info(0), "2P": _scene_info(0)}, {"1P": "NONE", "2P": "NONE"})
+        recorder.flush_to_file()
+
+        assert sorted(os.listdir(tmp_path)) == ["episode_00000", "episode_00001"]
+        episode = load_episode(tmp_path / "episode_00000", "1P")
+        assert episode.frame_count == 5
+        assert isinstance(episode.scene_info["ball.x"], np.memmap)
+        assert episode.scene_info["ball.x"].tolist() == [0, 2, 4, 6, 8]
+        assert episode.scene_info["ball.y"].dtype == np.float64
+        assert episode.scene_info["grid"].shape == (5, 2, 2)
+        assert episode.scene_info["grid"][3].tolist() == [[3, 0], [0, 3]]
+        # a column missing in the first frames is filled with nan
+        assert np.isnan(episode.scene_info["speed"][:2]).all()
+        assert episode.scene_info["speed"][2:].tolist() == [2, 3, 4]
+
+        categories = episode.get_categories("status")
+        assert [categories[i] for i in episode.scene_info["status"]] == ["GAME_ALIVE"] * 4 + ["GAME_OVER"]
+        # the lists of different lengths are saved as json
+        assert episode.scene_info["bricks"][4] == [[0, 0]]
+        assert list(episode.scene_info["bricks"])[0] == [[0, 0]] * 5
+        assert episode.decode_commands() == [["SERVE", "NONE"], "MOVE_LEFT"] * 2 + [["SERVE", "NONE"]]
+        assert load_episode(tmp_path / "episode_00000", "2P").decode_commands() == [None] * 5
+        assert load_episode(tmp_path / "episode_00001", "1P").decode_commands() == ["NONE"]
+
+    def test_convert_column_to_fit_values(self, tmp_path):
+        recorder = Recorder(["1P"], tmp_path)
+        values = [1, 2, 3.5, None, [1, 2]]
+        for value in values:
+            recorder.record({"1P": {"value": value, "flag": value is None}}, {"1P": "NONE"})
+        recorder.flush_to_file()
+
+        episode = load_episode(tmp_path / "episode_00000")
+        assert list(episode.scene_info["value"]) == values
+        assert episode.scene_info["flag"].dtype == np.bool_
+        assert episode.scene_info["flag"].tolist() == [False, False, False, True, False]
@@ -0,0 +1,91 @@
+import pytest
+
+from mlgame.utils.replay import ReplayWriter, ReplayReader
+from mlgame.view.view_model import Rect, Text
+
+
+def _progress(frame):
+    progress = {
+        "frame": frame,
+        "background": [Rect("wall", i * 10, 0, 10, 10, "#FFFFFF") for i in range(3)],
+        "object_list": [Rect("car", frame, 50, 20, 20, "#FF0000")],
+        "foreground": [Text(f"score={frame // 4}", 0, 0, "#FFFFFF")],
+    }
+    if frame % 5 == 0:
+        progress["game_sys_info"] = {"frame": frame}
+    return progress
+
+
+def _to_json(view_obj):
+    return {"type": "rect", "name": view_obj.name, "x": view_obj.x, "y": view_obj.y, "width": view_obj.width,
+            "height": view_obj.height, "color": view_obj.color, "angle": view_obj.angle}
+
+
+@pytest.fixture
+def replay_path(tmp_path):
+    path = tmp_path / "replay.mlgr"
+    writer = ReplayWriter(path, keyframe_interval=4)
+    for frame in range(1, 11):
+        writer.write(_progress(frame))
+    writer.close()
+    return path
+
+
+class TestReplay:
+    def test_random_access(self, replay_path):
+        with ReplayReader(replay_path) as reader:
+            assert len(reader) == 10
+            assert reader.keyframe_interval == 4
+            for frame_no in [9, 0, 6, 5, 4, -1]:
+                progress = reader.frame(frame_no)
+                frame = frame_no % 10 + 1
+                assert progress["frame"] == frame
+                assert progress["object_list"] == [_to_json(_progress(frame)["object_list"][0])]
+                assert progress["foreground"][0]["content"] == f"score={frame // 4}"
+                assert ("game_sys_info" in progress) == (frame % 5 == 0)
+
+    def test_iterate_range(self, replay_path):
+        with ReplayReader(replay_path) as reader:
+            assert [progress["frame"] for progress in reader.iter_frames(2, 7)] == [3, 4, 5, 6, 7]
+            assert [progress["frame"] for progress in reader] == list(range(1, 11))
+            with pytest.raises(IndexError):
+                reader.frame(10)
+
+    def test_only_write_changed_view_objects(self, tmp_path):
+        def write_replay(path, keyframe_interval):
+            writer = ReplayWriter(path, keyframe_interval=keyframe_interval)
+            for frame in range(100):
+                progress = _progress(frame)
+                progress["background"] = [Rect(f"wall_{i}", i, 0, 10, 10, "#FFFFFF") for i in range(50)]
+                writer.write(progress)
+            writer.close()
+            return path.stat().st_size
+
+        assert write_replay(tmp_path / "delta.mlgr", 50) * 5 < write_replay(tmp_path / "keyframes.mlgr", 1)
+
+    def test_changed_attribute_in_json_format(self, tmp_path):
+        path = tmp_path / "replay.mlgr"
+        writer = ReplayWriter(path, keyframe_interval=10)
+        writer.write({"frame": 1, "foreground": [Text("score", 0, 0, "#FFFFFF", "16px Arial")]})
+        writer.write({"frame": 2, "foreground": [Text("score", 0, 0, "#FFFFFF", "24px Arial")]})
+        writer.close()
+
+        with ReplayReader(path) as reader:
+            assert reader.frame(1)["foreground"][0]["font-style"] == "24px Arial"
+            assert "font_style" not in reader.frame(1)["foreground"][0]
+            assert reader.frame(0)["foreground"][0]["font-style"] == "16px Arial"
+
+    def test_unclosed_replay(self, tmp_path):
+        path = tmp_path / "replay.mlgr"
+        writer = ReplayWriter(path, keyframe_interval=4)
+        for frame in range(1, 11):
+            writer.write(_progress(frame))
+        writer._file.flush()
+        # the last record is not finished when the writer crashes
+        with open(path, "ab") as f:
+            f.write(b"\xff\x00\x00\x00\x00{")
+
+        with ReplayReader(path) as reader:
+            assert len(reader) == 10
+            assert reader.frame(9)["object_list"] == [_to_json(Rect("car", 10, 50, 20, 20, "#FF0000"))]
+            assert reader.frame(2)["frame"] == 3
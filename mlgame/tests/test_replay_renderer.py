@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from mlgame.core.replay_renderer import split_render_tasks, render_replay
+from mlgame.utils.progress_log import NdjsonChunkWriter, save_game_info
+from mlgame.utils.replay import ReplayWriter, REPLAY_FILENAME
+from mlgame.view.view_model import create_scene_progress_data, Rect, Scene
+
+
+def _write_progress_log(progress_folder, writer):
+    save_game_info(progress_folder, {"scene": Scene(100, 100).__dict__, "assets": [], "background": []})
+    for frame in range(1, 11):
+        writer.write(create_scene_progress_data(
+            frame=frame, object_list=[Rect("car", frame * 5, 10, 10, 10, "#FF0000")]))
+    writer.close()
+
+
+@pytest.mark.parametrize("create_writer", [
+    lambda folder: NdjsonChunkWriter(folder, frames_per_chunk=3),
+    lambda folder: ReplayWriter(folder / REPLAY_FILENAME, keyframe_interval=3),
+])
+def test_render_replay(tmp_path, create_writer):
+    progress_folder = tmp_path / "progress"
+    progress_folder.mkdir()
+    _write_progress_log(progress_folder, create_writer(progress_folder))
+
+    tasks = split_render_tasks(str(progress_folder), 8)
+    assert len(tasks) == 4
+
+    image_count = render_replay(str(progress_folder), str(tmp_path / "images"), workers=2,
+                                start_frame=2, stop_frame=9, image_format="png")
+    assert image_count == 7
+    assert sorted(os.listdir(tmp_path / "images")) == [f"{frame:05d}.png" for frame in range(2, 9)]
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from mlgame.core.vec_env import SyncVecEnv, SubprocVecEnv, stack_obs
+from mlgame.game.paia_game import PaiaGame, GameStatus
+
+
+class CountingGame(PaiaGame):
+    """
+    The game passes after `length` frames, and the position moves when receiving "RIGHT"
+    """
+
+    def __init__(self, user_num, length=3, *args, **kwargs):
+        super().__init__(user_num)
+        self.length = length
+        self.position = 0
+
+    def update(self, commands: dict):
+        self.frame_count += 1
+        if commands.get("1P") == "RIGHT":
+            self.position += 1
+        if self.frame_count >= self.length:
+            self.status = GameStatus.GAME_PASS
+            return "RESET"
+
+    def get_data_from_game_to_player(self) -> dict:
+        return {"1P": {"frame": self.frame_count, "status": self.status, "position": self.position}}
+
+    def reset(self):
+        self.frame_count = 0
+        self.position = 0
+        self.status = GameStatus.GAME_ALIVE
+
+    def get_scene_init_data(self) -> dict:
+        return {}
+
+    def get_scene_progress_data(self) -> dict:
+        return {}
+
+    def get_game_result(self) -> dict:
+        return {"frame_used": self.frame_count, "position": self.position}
+
+
+@pytest.fixture(params=["sync", "subprocess"])
+def vec_env(request):
+    if request.param == "sync":
+        env = SyncVecEnv(CountingGame, {"length": 3}, 1, 3)
+    else:
+        env = SubprocVecEnv(CountingGame, {"length": 3}, 1, 3, num_workers=2)
+    yield env
+    env.close()
+
+
+class TestVecEnv:
+    def test_reset(self, vec_env):
+        observations = vec_env.reset()
+        assert observations.keys() == {"1P"}
+        assert observations["1P"]["frame"].tolist() == [0, 0, 0]
+        assert observations["1P"]["position"].tolist() == [0, 0, 0]
+        assert observations["1P"]["status"].tolist() == [GameStatus.GAME_ALIVE] * 3
+
+    def test_step_in_batch(self, vec_env):
+        vec_env.reset()
+        observations, dones, infos = vec_env.step([{"1P": "RIGHT"}, {"1P": "NONE"}, {"1P": "RIGHT"}])
+
+        assert isinstance(observations["1P"]["position"], np.ndarray)
+        assert observations["1P"]["position"].tolist() == [1, 0, 1]
+        assert dones.dtype == np.bool_
+        assert dones.tolist() == [False] * 3
+        assert infos == [{}] * 3
+
+    def test_auto_reset_when_episode_ends(self, vec_env):
+        vec_env.reset()
+        for _ in range(2):
+            vec_env.step([{"1P": "RIGHT"}] * 3)
+        observations, dones, infos = vec_env.step([{"1P": "RIGHT"}] * 3)
+
+        assert dones.tolist() == [True] * 3
+        assert observations["1P"]["frame"].tolist() == [0, 0, 0]
+        for info in infos:
+            assert info["terminal_observation"]["1P"]["status"] == GameStatus.GAME_PASS
+            assert info["game_result"] == {"frame_used": 3, "position": 3}
+
+    def test_wrong_number_of_commands(self, vec_env):
+        with pytest.raises(ValueError):
+            vec_env.step([{"1P": "RIGHT"}])
+
+
+def test_stack_obs():
+    stacked = stack_obs([
+        {"1P": {"ball": [1, 2], "bricks": [[0, 0]], "status": "GAME_ALIVE"}},
+        {"1P": {"ball": [3, 4], "bricks": [[0, 0], [5, 5]], "status": "GAME_OVER"}},
+    ])
+    assert stacked["1P"]["ball"].tolist() == [[1, 2], [3, 4]]
+    assert stacked["1P"]["status"].tolist() == ["GAME_ALIVE", "GAME_OVER"]
+    # the lists of different lengths are kept as objects
+    assert stacked["1P"]["bricks"].dtype == object
+    assert stacked["1P"]["bricks"][1] == [[0, 0], [5, 5]]
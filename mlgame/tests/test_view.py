@@ -0,0 +1,184 @@
+import logging
+import pickle
+
+import numpy as np
+import pygame
+import pytest
+
+from mlgame.utils.logger import logger
+from mlgame.view.view import PygameView
+from mlgame.view.view_model import create_scene_progress_data, create_scene_view_data, Rect, Line, Polygon, \
+    AAPolygon, Image, Text, SceneInfo, transform_polygon_vertices
+
+
+def _game_info(background=None):
+    return {"scene": create_scene_view_data(200, 100), "assets": [], "background": background or []}
+
+
+def _progress(car_x):
+    return create_scene_progress_data(
+        background=[Rect("wall", i * 20, 0, 10, 10, "#FFFFFF") for i in range(10)],
+        object_list=[Rect("car", car_x, 50, 20, 20, "#FF0000"),
+                     Polygon("tri", [{"x": 150, "y": 60}, {"x": 190, "y": 60}, {"x": 170, "y": 90}], "#00FF00")],
+    )
+
+
+@pytest.fixture(autouse=True)
+def quit_display():
+    yield
+    # the display with SCALED flag could only be created once before quitting
+    pygame.display.quit()
+
+
+@pytest.fixture
+def updated_rects(monkeypatch):
+    rects = []
+    monkeypatch.setattr(pygame.display, "update", lambda update_rects: rects.append(list(update_rects)))
+    return rects
+
+
+class TestDirtyRect:
+    def test_only_update_changed_areas(self, updated_rects):
+        view = PygameView(_game_info(), dirty_rect=True)
+        view.draw(_progress(10))
+        assert updated_rects == []
+
+        view.draw(_progress(15))
+        assert len(updated_rects) == 1
+        union = updated_rects[0][0].unionall(updated_rects[0])
+        assert union.contains(pygame.Rect(10, 50, 25, 20))
+        assert union.width * union.height < 200 * 100 / 4
+        dirty_rect_pixels = pygame.image.tostring(view.get_display_surface(), "RGB")
+        pygame.display.quit()
+
+        full_view = PygameView(_game_info())
+        full_view.draw(_progress(15))
+        assert pygame.image.tostring(full_view.get_display_surface(), "RGB") == dirty_rect_pixels
+
+    def test_redraw_all_when_view_changed(self, updated_rects):
+        view = PygameView(_game_info(), dirty_rect=True)
+        view.draw(_progress(10))
+        view.scale = 0.5
+        view.draw(_progress(10))
+        view.draw(_progress(10))
+        assert updated_rects == [[]]
+
+
+def _create_transparent_scene_info():
+    display = pygame.Surface((200, 100), pygame.SRCALPHA)
+    display.fill((0, 0, 0, 0))
+    return SceneInfo(display, {}, {}, 200, 100)
+
+
+class TestBoundingRect:
+    @pytest.mark.parametrize("view_obj", [
+        Rect("r", 30, 20, 40, 10, "#FFFFFF"),
+        Line("l", 10, 80, 120, 30, "#FFFFFF", 5),
+        Polygon("p", [{"x": 10, "y": 10}, {"x": 60, "y": 20}, {"x": 30, "y": 70}], "#FFFFFF"),
+        AAPolygon("p", [{"x": 10, "y": 10}, {"x": 60, "y": 20}, {"x": 30, "y": 70}], "#FFFFFF"),
+        Text("hello", 20, 30, "#FFFFFF", "16px Arial"),
+    ])
+    @pytest.mark.parametrize("scale", [1, 0.7])
+    def test_cover_drawn_pixels(self, view_obj, scale):
+        pygame.font.init()
+        scene_info = _create_transparent_scene_info()
+        scene_info.fonts["16px Arial"] = pygame.font.Font(None, 16)
+        view_obj.draw(scene_info, 5, 5, scale)
+
+        drawn_rect = scene_info.display.get_bounding_rect()
+        assert drawn_rect.width > 0
+        assert view_obj.bounding_rect(scene_info, 5, 5, scale).contains(drawn_rect)
+
+    def test_rotated_image(self):
+        scene_info = _create_transparent_scene_info()
+        scene_info.assets["img"] = pygame.Surface((30, 10))
+        scene_info.assets["img"].fill((255, 255, 255))
+        view_obj = Image("img", 50, 20, 30, 10, 0.5)
+        view_obj.draw(scene_info)
+
+        drawn_rect = scene_info.display.get_bounding_rect()
+        assert drawn_rect.width > 30
+        assert view_obj.bounding_rect(scene_info).contains(drawn_rect)
+
+
+class TestBackgroundLayer:
+    def test_render_fixed_background_once(self, monkeypatch):
+        walls = [Rect("wall", i * 20, 90, 10, 10, "#FFFFFF") for i in range(10)]
+        draw_count = []
+        origin_draw = Rect.draw
+        monkeypatch.setattr(Rect, "draw", lambda self, *args: draw_count.append(self) or origin_draw(self, *args))
+        view = PygameView(_game_info(walls))
+        view.draw(_progress(10))
+        view.draw(_progress(15))
+        assert draw_count.count(walls[0]) == 1
+        assert view.get_display_surface().get_at((5, 95)) == (255, 255, 255, 255)
+
+        # zooming out renders the layer again
+        view.scale = 0.5
+        view.draw(_progress(15))
+        assert draw_count.count(walls[0]) == 2
+        # the scene is scaled around its center
+        assert view.get_display_surface().get_at((52, 72)) == (255, 255, 255, 255)
+        assert view.get_display_surface().get_at((5, 95)) != (255, 255, 255, 255)
+
+
+class TestCulling:
+    def test_skip_objects_outside_screen(self, monkeypatch, caplog):
+        caplog.set_level(logging.DEBUG, logger=logger.name)
+        drawn = []
+        origin_draw = Rect.draw
+        monkeypatch.setattr(Rect, "draw", lambda self, *args: drawn.append(self.name) or origin_draw(self, *args))
+        view = PygameView(_game_info())
+        view.draw(create_scene_progress_data(object_list=[
+            Rect("visible", 190, 90, 20, 20, "#FF0000"),
+            Rect("right", 201, 50, 20, 20, "#FF0000"),
+            Rect("above", 50, -30, 20, 20, "#FF0000"),
+        ]))
+        assert drawn == ["visible"]
+        assert view.culled_count == 2
+        assert "Culled 2 of 3 view objects outside the screen" in caplog.messages
+
+        # the objects are in the screen after zooming out
+        view.scale = 0.5
+        view.draw(create_scene_progress_data(object_list=[
+            Rect("right", 201, 50, 20, 20, "#FF0000"),
+            Rect("above", 50, -30, 20, 20, "#FF0000"),
+        ]))
+        assert drawn == ["visible", "right", "above"]
+        assert view.culled_count == 0
+
+
+class TestPolygonVertices:
+    def test_batch_transform_vertices(self):
+        scene_info = _create_transparent_scene_info()
+        polygons = [Polygon("p", [{"x": 10, "y": 10}, {"x": 60, "y": 20}, {"x": 30, "y": 70}], "#FFFFFF"),
+                    AAPolygon("a", [[0, 0], [10, 0], [10, 10], [0, 10]], "#FFFFFF")]
+        transform_polygon_vertices([(polygon, 5, -5, 0.5) for polygon in polygons], scene_info)
+
+        assert polygons[0].get_vertices(scene_info, 5, -5, 0.5).tolist() == [[57.5, 27.5], [82.5, 32.5], [67.5, 57.5]]
+        assert polygons[1].get_vertices(scene_info, 5, -5, 0.5).tolist() == [[52.5, 22.5], [57.5, 22.5],
+                                                                            [57.5, 27.5], [52.5, 27.5]]
+        # the vertices of other arguments are transformed again
+        assert polygons[1].get_vertices(scene_info).tolist() == [[0, 0], [10, 0], [10, 10], [0, 10]]
+
+    def test_points_array(self):
+        polygon = Polygon("p", [{"x": 10, "y": 10}, {"x": 60, "y": 20}, {"x": 30, "y": 70}], "#FFFFFF")
+        assert vars(polygon)["_points_array"].dtype == np.float32
+        assert polygon.points_array.dtype == np.float32
+        polygon.points = [{"x": 0, "y": 0}, {"x": 1, "y": 0}, {"x": 0, "y": 1}]
+        assert polygon.points_array.tolist() == [[0, 0], [1, 0], [0, 1]]
+
+        assert "_points_array" not in polygon.__getstate__()
+        restored = pickle.loads(pickle.dumps(polygon))
+        # the array is created when unpickling, before the first frame draws it
+        assert vars(restored)["_points_array"].tolist() == [[0, 0], [1, 0], [0, 1]]
+        assert restored.points_array.tolist() == [[0, 0], [1, 0], [0, 1]]
+
+    def test_aapolygon_outline_when_zoomed_out(self):
+        scene_info = _create_transparent_scene_info()
+        polygon = AAPolygon("a", [[0, 0], [200, 0], [200, 100], [0, 100]], "#FFFFFF")
+        polygon.draw(scene_info, scale=0.1)
+        assert scene_info.display.get_at((90, 45)).a == 255
+        # the polygon is not filled
+        assert scene_info.display.get_at((100, 50)).a == 0
+        assert polygon.bounding_rect(scene_info, scale=0.1).contains(pygame.Rect(89, 44, 22, 12))
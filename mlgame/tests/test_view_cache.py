@@ -0,0 +1,65 @@
+import math
+
+import pygame
+
+from mlgame.view.cache import SurfaceCache, TransformCache, text_surface_cache
+from mlgame.view.view_model import SceneInfo, Text
+
+
+class TestSurfaceCache:
+    def test_evict_least_recently_used_by_bytes(self):
+        surfaces = {key: pygame.Surface((10, 10), 0, 32) for key in "abc"}
+        # each surface has 400 bytes
+        cache = SurfaceCache(max_bytes=800)
+        cache.put("a", surfaces["a"])
+        cache.put("b", surfaces["b"])
+        assert cache.get("a") is surfaces["a"]
+        cache.put("c", surfaces["c"])
+
+        assert cache.get("b") is None
+        assert cache.get("a") is surfaces["a"]
+        assert cache.get("c") is surfaces["c"]
+        assert cache.stats() == {"size": 2, "bytes": 800, "max_bytes": 800, "hits": 3, "misses": 1,
+                                 "hit_rate": 0.75}
+
+    def test_skip_surface_larger_than_cache(self):
+        cache = SurfaceCache(max_bytes=100)
+        cache.put("a", pygame.Surface((10, 10), 0, 32))
+        assert len(cache) == 0
+        assert cache.total_bytes == 0
+
+
+class TestTextSurfaceCache:
+    def test_render_unchanged_text_once(self, monkeypatch):
+        pygame.font.init()
+        font = pygame.font.Font(None, 16)
+        scene_info = SceneInfo(pygame.Surface((100, 100)), {}, {"16px Arial": font}, 100, 100)
+        text_surface_cache.clear()
+        for content in ["score: 1", "score: 1", "score: 2", "score: 1"]:
+            Text(content, 10, 10, "#FFFFFF", "16px Arial").draw(scene_info)
+
+        assert text_surface_cache.hits == 2
+        assert text_surface_cache.misses == 2
+        Text("score: 1", 10, 10, "#FFFFFF", "16px Arial").draw(scene_info, scale=0.5)
+        assert text_surface_cache.misses == 3
+
+
+class TestTransformCache:
+    def test_reuse_quantized_transform(self):
+        cache = TransformCache(max_bytes=1024 * 1024, angle_step=5, scale_step=0.1)
+        img = pygame.Surface((20, 10))
+        rotated = cache.transform(img, 20, 10, 1.01, math.radians(89))
+        assert rotated.get_size() == (10, 20)
+        assert cache.transform(img, 20, 10, 0.98, math.radians(91.5)) is rotated
+        assert cache.transform(img, 20, 10, 0.5, math.radians(90)).get_size() == (5, 10)
+        assert cache.stats()["size"] == 2
+        assert cache.hit_rate == 1 / 3
+
+    def test_bound_memory_of_continuous_rotation(self):
+        cache = TransformCache(max_bytes=4 * 1024 * 1024)
+        img = pygame.Surface((20, 20))
+        for i in range(10000):
+            cache.transform(img, 20, 20, 1 + i * 0.0001, i * 0.001)
+        # 10 radians and 1 unit of scale at the default steps
+        assert len(cache) < 700
+        assert cache.total_bytes <= cache.max_bytes
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from orjson import orjson
+
+from mlgame.view.view_model import Image, Rect, Line, Polygon, AAPolygon, Text
+from mlgame.view.wire_format import encode_scene_progress, decode_scene_progress, view_object_to_dict, \
+    view_object_from_dict
+
+
+def _create_progress():
+    triangle = [{"x": 0, "y": 0}, {"x": 10.5, "y": 0}, {"x": 5, "y": 8.25}]
+    return {
+        "frame": 12,
+        "background": [Image("bg", 0, 0, 800, 600)],
+        "object_list": [
+            Rect("car", 10, 20.5, 30, 40, "#FF0000", 90),
+            Line("road", 0, 0, 100, 200, "#FFFFFF", 3),
+            Polygon("tri", triangle, "#00FF00"),
+            AAPolygon("tri", triangle, "#00FF00"),
+        ],
+        "toggle_with_bias": [],
+        "foreground": [Text("分數: 1", 5, 5, "#FFFFFF", "18px Arial")],
+        "game_sys_info": {"user": "1P"},
+    }
+
+
+def _to_comparable(progress):
+    return json.loads(json.dumps(progress, default=view_object_to_dict))
+
+
+class TestWireFormat:
+    def test_round_trip(self):
+        progress = _create_progress()
+        decoded = decode_scene_progress(encode_scene_progress(progress))
+
+        assert isinstance(decoded["object_list"][3], AAPolygon)
+        # the lists missing in the progress data are decoded as empty lists
+        assert decoded.pop("toggle") == []
+        assert _to_comparable(decoded) == _to_comparable(progress)
+
+    def test_keep_numbers_exactly(self):
+        polygon = Polygon("p", [{"x": 10.1, "y": 2}, {"x": 3.0, "y": -0.5}, {"x": 1, "y": 1e-7}], "#000000")
+        rect = Rect("r", 2.0, 3, 0.1, 2 ** 40, "#000000", -1.5)
+        decoded = decode_scene_progress(encode_scene_progress({"object_list": [polygon, rect]}))
+        decoded_polygon, decoded_rect = decoded["object_list"]
+
+        assert decoded_polygon.points == polygon.points
+        assert [type(point["x"]) for point in decoded_polygon.points] == [float, float, int]
+        assert [type(point["y"]) for point in decoded_polygon.points] == [int, float, float]
+        assert [(decoded_rect.x, type(decoded_rect.x)), (decoded_rect.y, type(decoded_rect.y))] == \
+               [(2.0, float), (3, int)]
+        assert (decoded_rect.width, decoded_rect.height, decoded_rect.angle) == (0.1, 2 ** 40, -1.5)
+
+    def test_reject_numbers_not_kept_exactly(self):
+        for value in [True, None, 2 ** 60]:
+            with pytest.raises(TypeError):
+                encode_scene_progress({"object_list": [Rect("r", value, 0, 1, 1, "#000000")]})
+        with pytest.raises(TypeError):
+            encode_scene_progress({"object_list": [Polygon("p", [(0, 0), (1, 0), (1, 1)], "#000000")]})
+
+    def test_decode_from_memoryview(self):
+        progress = _create_progress()
+        decoded = decode_scene_progress(memoryview(encode_scene_progress(progress)))
+        del decoded["toggle"]
+        assert _to_comparable(decoded) == _to_comparable(progress)
+
+    def test_reject_unknown_data(self):
+        with pytest.raises(ValueError):
+            decode_scene_progress(b"JSON" + bytes(40))
+
+    def test_reject_unknown_object(self):
+        with pytest.raises(TypeError):
+            encode_scene_progress({"object_list": [object()]})
+
+
+class TestJsonFallback:
+    def test_view_object_to_dict(self):
+        assert view_object_to_dict(Text("hi", 1, 2, "#FFFFFF")) == {
+            "type": "text", "content": "hi", "x": 1, "y": 2, "color": "#FFFFFF", "font-style": "24px Arial"}
+        assert orjson.loads(orjson.dumps([Rect("r", 1, 2, 3, 4, "#000000")], default=view_object_to_dict)) == [
+            {"type": "rect", "name": "r", "x": 1, "y": 2, "width": 3, "height": 4, "color": "#000000", "angle": 0}]
+
+    def test_view_object_from_dict(self):
+        for view_obj in _create_progress()["object_list"] + [Text("hi", 1, 2, "#FFFFFF")]:
+            data = view_object_to_dict(view_obj)
+            assert view_object_to_dict(view_object_from_dict(data)) == data
@@ -27,3 +27,35 @@ class StringEnum(str, Enum):
 
     def __hash__(self):
         return hash(self.value)
+
+
+class ExecutionMode(StringEnum):
+    """
+    How the game process waits for the commands of the ml clients at each frame
+    REALTIME sleeps a whole frame interval (1 / fps) and then collects the commands.
+    BARRIER returns as soon as all the ml clients replied or the frame interval expires.
+    TURBO works like BARRIER, and skips the drawing data and the waiting between games
+    when nobody consumes them.
+    """
+    REALTIME = auto()
+    BARRIER = auto()
+    TURBO = auto()
+
+
+class ProgressFormat(StringEnum):
+    """
+    The file format of the progress log
+    NDJSON writes the chunk files of json lines.
+    REPLAY writes a single replay file with a frame index, which could be read by `ReplayReader`.
+    """
+    NDJSON = auto()
+    REPLAY = auto()
+
+
+class CapturePolicy(StringEnum):
+    """
+    What the frame capturer does when the encoder is slower than the game
+    BLOCK waits for the encoder, DROP skips the frame.
+    """
+    BLOCK = auto()
+    DROP = auto()
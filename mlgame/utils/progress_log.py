@@ -0,0 +1,109 @@
+"""
+The writers of the game progress log
+"""
+import abc
+import gzip
+import os
+
+from orjson import orjson
+
+from mlgame.view.wire_format import view_object_to_dict
+
+GAME_INFO_FILENAME = "game_info.json"
+
+
+def save_game_info(progress_folder, game_info: dict):
+    """
+    Save the scene init data of the game beside the progress log, which is needed to redraw the frames
+    """
+    with open(os.path.join(progress_folder, GAME_INFO_FILENAME), "wb") as f:
+        f.write(orjson.dumps(game_info, default=view_object_to_dict))
+
+
+class ProgressWriter(abc.ABC):
+    """
+    The interface of the writers used by `ProgressLogExecutor`
+    """
+
+    @abc.abstractmethod
+    def write(self, progress_data: dict):
+        """
+        Write the progress data of a frame
+        """
+        pass
+
+    @abc.abstractmethod
+    def close(self):
+        """
+        Finish the log. It is called once when the game is over.
+        """
+        pass
+
+
+class NdjsonChunkWriter(ProgressWriter):
+    """
+    Write each frame as a line of json into the chunk files `0.ndjson`, `1.ndjson`, ...
+    and rename the last chunk to `<n>-end.ndjson` when it is closed.
+
+    Frames are appended to the opened chunk file as soon as they arrive,
+    so the memory usage doesn't grow with the number of frames in a chunk.
+    """
+
+    def __init__(self, progress_folder, frames_per_chunk: int = 300, compress_level: int = 0):
+        """
+        @param progress_folder The folder to save the chunk files
+        @param frames_per_chunk The number of frames in a chunk file
+        @param compress_level The gzip compression level from 1 to 9. 0 means no compression.
+        """
+        self._progress_folder = progress_folder
+        self._frames_per_chunk = frames_per_chunk
+        self._compress_level = compress_level
+        self._extension = ".ndjson.gz" if compress_level else ".ndjson"
+        self._chunk_index = -1
+        self._chunk_path = None
+        self._file = None
+        self._frame_count_in_chunk = 0
+
+    def _get_chunk_path(self, name) -> str:
+        return os.path.join(self._progress_folder, f"{name}{self._extension}")
+
+    def _open_next_chunk(self):
+        self._chunk_index += 1
+        self._chunk_path = self._get_chunk_path(self._chunk_index)
+        if self._compress_level:
+            self._file = gzip.open(self._chunk_path, "wb", compresslevel=self._compress_level)
+        else:
+            self._file = open(self._chunk_path, "wb")
+        self._frame_count_in_chunk = 0
+
+    def _close_chunk(self, path: str):
+        self._file.close()
+        self._file = None
+        if path != self._chunk_path:
+            os.replace(self._chunk_path, path)
+        # Get the file size in kilobytes (1 KB = 1024 bytes)
+        file_size_kb = os.path.getsize(path) / 1024
+        print(f"File saved to: {path}, file size: {file_size_kb:.2f} KB")
+
+    def write(self, progress_data: dict):
+        if self._file is not None and self._frame_count_in_chunk >= self._frames_per_chunk:
+            self._close_chunk(self._chunk_path)
+        if self._file is None:
+            self._open_next_chunk()
+        self._file.write(orjson.dumps(
+            progress_data, default=view_object_to_dict, option=orjson.OPT_APPEND_NEWLINE))
+        self._frame_count_in_chunk += 1
+
+    def close(self):
+        if self._file is not None:
+            self._close_chunk(self._get_chunk_path(f"{self._chunk_index}-end"))
+
+
+def iter_ndjson_chunk(path):
+    """
+    Iterate the progress data of the frames in a chunk file written by `NdjsonChunkWriter`
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for line in f:
+            yield orjson.loads(line)
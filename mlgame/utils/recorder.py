@@ -1,101 +1,322 @@
 """
-to deprecated
+Record the scene information and the commands of the ml clients as a columnar dataset
+
+Each episode is saved in `<dataset_folder>/episode_<n>/<ml_name>/`:
+```
+meta.json      : the frame count, and the name, file, kind, dtype, shape and categories of the columns
+c<i>.bin       : the values of a column, appended frame by frame
+c<i>.offsets   : the end offsets of the values of a json column (u8)
+```
+The nested dicts of `scene_info` are flattened into columns named by the keys joined with ".".
+Numbers, booleans and fixed-shape numeric lists are saved as raw numpy arrays,
+strings and commands are saved as category ids (i4, -1 means missing),
+and the other values are saved as json. The columns are loaded back by `np.memmap` without copying.
 """
-import pickle
-import time
+import json
+import os
+
+import numpy as np
+from orjson import orjson
+
+RECORD_FORMAT_VERSION = 3
 
-from pathlib import Path
-from mlgame.argument.execution_command import GameMode
+KIND_NUMBER = "number"
+KIND_ARRAY = "array"
+KIND_CATEGORY = "category"
+KIND_JSON = "json"
 
-RECORD_FORMAT_VERSION = 2
+# the number of values kept in memory before they are appended to the file
+_FLUSH_SIZE = 1024
 
-def get_recorder(execution_cmd, ml_names):
+
+def get_recorder(dataset_folder, ml_names):
     """
     The helper function for generating a recorder object
     """
-    if not execution_cmd.record_progress:
+    if dataset_folder is None:
         return DummyRecorder()
+    return Recorder(ml_names, dataset_folder)
 
-    root_dir_path = Path(__file__).parent.parent
-    log_dir_path = root_dir_path.joinpath(
-        "games", execution_cmd.game_name, "log")
 
-    game_params_str = [str(p) for p in execution_cmd.game_params]
-    filename_prefix = (
-        "manual" if execution_cmd.game_mode == GameMode.MANUAL else "ml")
-    if game_params_str:
-        filename_prefix += "_" + "_".join(game_params_str)
+def _flatten(data: dict, prefix: str = ""):
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, name + ".")
+        else:
+            yield name, value
 
-    return Recorder(ml_names, log_dir_path, filename_prefix)
 
-class Recorder:
+def _is_number(value) -> bool:
+    return isinstance(value, (bool, int, float, np.bool_, np.number))
+
+
+def _is_numeric_list(value) -> bool:
+    item = value
+    while isinstance(item, (list, tuple)):
+        if not item:
+            return False
+        item = item[0]
+    return _is_number(item)
+
+
+def _get_value_kind(value) -> tuple:
+    """
+    @return A tuple (kind, dtype, shape) of the column fitting the value
     """
-    Record the scene information and the game command to the file
+    if _is_number(value):
+        return KIND_NUMBER, np.dtype(type(value)), ()
+    if isinstance(value, str):
+        return KIND_CATEGORY, np.dtype("<i4"), ()
+    array = None
+    if isinstance(value, np.ndarray):
+        array = value
+    elif isinstance(value, (list, tuple)) and _is_numeric_list(value):
+        try:
+            array = np.asarray(value)
+        except ValueError:
+            # the nested lists have different lengths
+            pass
+    if array is not None and array.size and array.dtype.kind in "biuf":
+        return KIND_ARRAY, array.dtype, array.shape
+    return KIND_JSON, np.dtype("u1"), ()
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError
+
+
+class _Column:
+    """
+    A column of values appended frame by frame. The kind of the column is decided by its first value,
+    and the column is converted to a more general kind when a value doesn't fit it.
     """
-    def __init__(
-            self, ml_names: list, saving_directory: Path,
-            filename_prefix: str = ""):
+
+    def __init__(self, name: str, path_prefix: str, is_category: bool = False):
         """
-        Constructor
+        @param is_category Save all the values as category ids
+        """
+        self.name = name
+        self._path_prefix = path_prefix
+        self._is_category = is_category
+        self.kind = KIND_CATEGORY if is_category else None
+        self.dtype = np.dtype("<i4") if is_category else None
+        self.shape = ()
+        self.categories = []
+        self._category_ids = {}
+        self._count = 0
+        self._pending = []
+        self._data_size = 0
 
-        @param ml_names A list containing the name of all ml clients
-        @param saving_directory Specify the directory for saving files
-        @param filename_prefix Specify the prefix of the filename to be generated.
-               The filename will be "<prefix>_YYYY-MM-DD_hh-mm-ss.pickle".
+    @property
+    def data_path(self):
+        return self._path_prefix + ".bin"
+
+    @property
+    def offsets_path(self):
+        return self._path_prefix + ".offsets"
+
+    def _get_category_id(self, value) -> int:
+        key = orjson.dumps(value, default=_json_default)
+        if key not in self._category_ids:
+            self._category_ids[key] = len(self.categories)
+            self.categories.append(value)
+        return self._category_ids[key]
+
+    def _set_kind(self, kind, dtype, shape):
+        missing_count = self._count
+        self.kind, self.dtype, self.shape = kind, dtype, shape
+        self._count = 0
+        for _ in range(missing_count):
+            self.append(None)
+
+    def _fits(self, value) -> bool:
+        if self.kind == KIND_JSON or self._is_category:
+            return True
+        if value is None:
+            return self.kind == KIND_CATEGORY or self.dtype.kind == "f"
+        kind, dtype, shape = _get_value_kind(value)
+        if self.kind == KIND_CATEGORY:
+            return kind == KIND_CATEGORY
+        return kind == self.kind and shape == self.shape and np.can_cast(dtype, self.dtype)
+
+    def _convert_for(self, value):
+        """
+        Convert the column to the kind which fits both the saved values and the new value
         """
-        self._saving_directory = saving_directory
-        if not self._saving_directory.exists():
-            self._saving_directory.mkdir()
+        # a missing number is saved as nan
+        kind, dtype, shape = _get_value_kind(value) if value is not None else (KIND_NUMBER, np.dtype("<f8"), ())
+        if self.kind == KIND_NUMBER and kind == KIND_NUMBER:
+            new_kind = (KIND_NUMBER, np.promote_types(self.dtype, dtype), ())
+        elif self.kind == KIND_ARRAY and kind == KIND_ARRAY and shape == self.shape:
+            new_kind = (KIND_ARRAY, np.promote_types(self.dtype, dtype), self.shape)
+        else:
+            new_kind = (KIND_JSON, np.dtype("u1"), ())
+        values = self.read_values()
+        self._truncate()
+        self.kind, self.dtype, self.shape = new_kind
+        for saved_value in values:
+            self.append(saved_value)
 
-        if not isinstance(filename_prefix, str):
-            raise TypeError("'filename_prefix' should be the type of 'str'")
-        self._filename_prefix = filename_prefix
+    def append(self, value):
+        if self.kind is None:
+            if value is None:
+                self._count += 1
+                return
+            self._set_kind(*_get_value_kind(value))
+        elif not self._fits(value):
+            self._convert_for(value)
 
-        # Create storing slots for each ml client
-        game_progress = {
-            "record_format_version": RECORD_FORMAT_VERSION
+        if self.kind == KIND_CATEGORY:
+            self._pending.append(-1 if value is None else self._get_category_id(value))
+        elif self.kind == KIND_JSON:
+            self._pending.append(orjson.dumps(value, default=_json_default))
+        elif value is None:
+            self._pending.append(np.nan)
+        else:
+            self._pending.append(value)
+        self._count += 1
+        if len(self._pending) >= _FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        if self.kind == KIND_JSON:
+            offsets = np.cumsum([len(data) for data in self._pending], dtype="<u8") + self._data_size
+            self._data_size = int(offsets[-1])
+            with open(self.data_path, "ab") as f:
+                f.write(b"".join(self._pending))
+            with open(self.offsets_path, "ab") as f:
+                f.write(offsets.tobytes())
+        else:
+            with open(self.data_path, "ab") as f:
+                f.write(np.asarray(self._pending, dtype=self.dtype).tobytes())
+        self._pending = []
+
+    def _truncate(self):
+        for path in (self.data_path, self.offsets_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._pending = []
+        self._count = 0
+        self._data_size = 0
+
+    def read_values(self) -> list:
+        """
+        Read the values of the column back to python objects
+        """
+        self.flush()
+        if self.kind is None:
+            return [None] * self._count
+        column = _load_column(self.meta(), os.path.dirname(self._path_prefix), self._count)
+        if self.kind == KIND_CATEGORY:
+            return [None if i < 0 else self.categories[i] for i in column.tolist()]
+        if self.kind == KIND_JSON:
+            return list(column)
+        return [None if self.kind == KIND_NUMBER and value != value else value for value in column.tolist()]
+
+    def meta(self) -> dict:
+        return {
+            "name": self.name,
+            "file": os.path.basename(self._path_prefix),
+            "kind": self.kind or KIND_JSON,
+            "dtype": (self.dtype or np.dtype("u1")).str,
+            "shape": list(self.shape),
+            "categories": self.categories,
         }
-        for name in ml_names:
-            game_progress[name] = {
-                "scene_info": [],
-                "command": []
-            }
-        self._game_progress = game_progress
+
+    def close(self):
+        if self.kind is None:
+            # no value is recorded
+            self.kind, self.dtype = KIND_JSON, np.dtype("u1")
+            self._pending = [b"null"] * self._count
+        self.flush()
+
+
+class _EpisodeWriter:
+    def __init__(self, folder: str):
+        os.makedirs(folder, exist_ok=True)
+        self._folder = folder
+        self._columns = {}
+        self._command = _Column("command", os.path.join(folder, "command"), is_category=True)
+        self._frame_count = 0
+
+    def record(self, scene_info: dict, command):
+        values = dict(_flatten(scene_info))
+        for name, value in values.items():
+            if name not in self._columns:
+                column = _Column(name, os.path.join(self._folder, f"c{len(self._columns)}"))
+                # the column is missing in the previous frames
+                for _ in range(self._frame_count):
+                    column.append(None)
+                self._columns[name] = column
+        for name, column in self._columns.items():
+            column.append(values.get(name))
+        self._command.append(command)
+        self._frame_count += 1
+
+    def close(self):
+        for column in self._columns.values():
+            column.close()
+        self._command.close()
+        meta = {
+            "record_format_version": RECORD_FORMAT_VERSION,
+            "frame_count": self._frame_count,
+            "scene_info": [column.meta() for column in self._columns.values()],
+            "command": self._command.meta(),
+        }
+        with open(os.path.join(self._folder, "meta.json"), "wb") as f:
+            f.write(orjson.dumps(meta, default=_json_default))
+
+
+class Recorder:
+    """
+    Record the scene information and the game command of each frame into a columnar dataset
+    """
+
+    def __init__(self, ml_names: list, dataset_folder):
+        """
+        Constructor
+
+        @param ml_names A list containing the name of all ml clients
+        @param dataset_folder Specify the directory for saving the episodes
+        """
+        self._dataset_folder = str(dataset_folder)
+        os.makedirs(self._dataset_folder, exist_ok=True)
         self._ml_names = ml_names
+        self._episode_count = 0
+        self._writers = None
 
     def record(self, scene_info_dict: dict, cmd_dict: dict):
         """
         Record the scene information and the command
 
-        The received scene information will be stored in a list.
-
         @param scene_info_dict A dict storing the scene information for each client
         @param cmd_dict A dict storing the command received from each client
         """
+        if self._writers is None:
+            episode_folder = os.path.join(self._dataset_folder, f"episode_{self._episode_count:05d}")
+            self._writers = {
+                name: _EpisodeWriter(os.path.join(episode_folder, name)) for name in self._ml_names}
         for name in self._ml_names:
-            target_slot = self._game_progress[name]
             scene_info = scene_info_dict.get(name, None)
             if scene_info:
-                target_slot["scene_info"].append(scene_info)
-                target_slot["command"].append(cmd_dict.get(name, None))
+                self._writers[name].record(scene_info, cmd_dict.get(name, None))
 
     def flush_to_file(self):
         """
-        Flush the stored objects to the file
+        Finish the current episode. The next recorded frame starts a new episode.
         """
-        filename = time.strftime("%Y-%m-%d_%H-%M-%S") + ".pickle"
+        if self._writers is None:
+            return
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = None
+        self._episode_count += 1
 
-        if self._filename_prefix:
-            filename = self._filename_prefix + "_" + filename
-
-        filepath = self._saving_directory.joinpath(filename)
-        with open(filepath, "wb") as f:
-            pickle.dump(self._game_progress, f)
-
-        for name in self._ml_names:
-            target_slot = self._game_progress[name]
-            target_slot["scene_info"].clear()
-            target_slot["command"].clear()
 
 class DummyRecorder:
     """
@@ -109,3 +330,79 @@ class DummyRecorder:
 
     def flush_to_file(self):
         pass
+
+
+class JsonColumn:
+    """
+    A column of json values, which are decoded when they are accessed
+    """
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        start = int(self._offsets[index - 1]) if index > 0 else 0
+        return orjson.loads(self._data[start:int(self._offsets[index])].tobytes())
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def _memmap(path: str, dtype, shape: tuple):
+    if shape[0] == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+def _load_column(column_meta: dict, folder: str, frame_count: int):
+    path_prefix = os.path.join(folder, column_meta["file"])
+    if column_meta["kind"] == KIND_JSON:
+        offsets = _memmap(path_prefix + ".offsets", "<u8", (frame_count,))
+        data_size = int(offsets[-1]) if frame_count else 0
+        return JsonColumn(_memmap(path_prefix + ".bin", "u1", (data_size,)), offsets)
+    return _memmap(path_prefix + ".bin", np.dtype(column_meta["dtype"]),
+                   (frame_count, *column_meta["shape"]))
+
+
+class Episode:
+    """
+    The recorded data of a ml client in an episode
+
+    `scene_info` maps the flattened keys to the columns, which are `np.memmap` or `JsonColumn`.
+    `command` is the array of the category ids of the commands, which are decoded by `command_categories`.
+    """
+
+    def __init__(self, folder, meta: dict):
+        self.frame_count = meta["frame_count"]
+        self.scene_info = {}
+        self._categories = {}
+        for column_meta in meta["scene_info"]:
+            self.scene_info[column_meta["name"]] = _load_column(column_meta, folder, self.frame_count)
+            self._categories[column_meta["name"]] = column_meta["categories"]
+        self.command = _load_column(meta["command"], folder, self.frame_count)
+        self.command_categories = meta["command"]["categories"]
+
+    def get_categories(self, name: str) -> list:
+        """
+        Get the values of the category ids of a string column
+        """
+        return self._categories[name]
+
+    def decode_commands(self) -> list:
+        return [None if i < 0 else self.command_categories[i] for i in self.command.tolist()]
+
+
+def load_episode(episode_folder, ml_name: str = "1P") -> Episode:
+    """
+    Load the recorded data of a ml client in an episode folder `<dataset_folder>/episode_<n>`
+    """
+    folder = os.path.join(str(episode_folder), ml_name)
+    with open(os.path.join(folder, "meta.json"), "rb") as f:
+        meta = json.load(f)
+    return Episode(folder, meta)
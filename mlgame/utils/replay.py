@@ -0,0 +1,204 @@
+"""
+The single-file replay container of the game progress
+
+Layout of version 3, all numbers are little-endian:
+```
+header  : magic "MLGR", version u1, 3 bytes padding, keyframe_interval u4
+records : a record per frame, which is length u4, is_keyframe u1 and the json of the record
+index   : frame_count x `INDEX_DTYPE`
+trailer : index_offset u8, frame_count u8, magic "MLGR"
+```
+The records are the deltas of `ProgressDeltaEncoder`, which only keep the view objects added,
+changed or removed since the last frame. A keyframe record carries all the view objects,
+and a frame is rebuilt by applying the records from its keyframe in order.
+If the writer is not closed properly, the index is rebuilt by scanning the records.
+"""
+import mmap
+import os
+import struct
+
+import numpy as np
+from orjson import orjson
+
+from mlgame.core.progress_delta import ProgressDeltaEncoder, ProgressDeltaDecoder
+from mlgame.utils.logger import logger
+from mlgame.utils.progress_log import ProgressWriter
+from mlgame.view.wire_format import view_object_to_dict
+
+REPLAY_VERSION = 3
+MAGIC = b"MLGR"
+REPLAY_FILENAME = "replay.mlgr"
+
+# the keyframe of a frame is the frame at `base`
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4"), ("base", "<u4")])
+_HEADER = struct.Struct("<4sB3xI")
+_TRAILER = struct.Struct("<QQ4s")
+_RECORD_HEADER = struct.Struct("<IB")
+
+
+def _dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=view_object_to_dict, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _to_json_attrs(attrs: dict) -> dict:
+    # the same attribute names as `view_object_to_dict`
+    if "font_style" in attrs:
+        attrs = dict(attrs)
+        attrs["font-style"] = attrs.pop("font_style")
+    return attrs
+
+
+class ReplayWriter(ProgressWriter):
+    """
+    Write the progress data into a replay file, which could be read by `ReplayReader`
+    """
+
+    def __init__(self, path, keyframe_interval: int = 300):
+        """
+        @param path The path of the replay file
+        @param keyframe_interval Write a keyframe every `keyframe_interval` frames
+        """
+        self._path = path
+        self._keyframe_interval = keyframe_interval
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, REPLAY_VERSION, keyframe_interval))
+        self._index = []
+        self._encoder = ProgressDeltaEncoder(keyframe_interval)
+        self._keyframe_no = 0
+
+    def write(self, progress_data: dict):
+        frame_no = len(self._index)
+        delta = self._encoder.encode(progress_data)
+        if delta["keyframe"]:
+            self._keyframe_no = frame_no
+        delta["changed"] = {obj_id: _to_json_attrs(attrs) for obj_id, attrs in delta["changed"].items()}
+        record = _dumps(delta)
+
+        self._file.write(_RECORD_HEADER.pack(len(record), delta["keyframe"]))
+        self._index.append((self._file.tell(), len(record), self._keyframe_no))
+        self._file.write(record)
+
+    def close(self):
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=INDEX_DTYPE).tobytes())
+        self._file.write(_TRAILER.pack(index_offset, len(self._index), MAGIC))
+        self._file.close()
+        file_size_kb = os.path.getsize(self._path) / 1024
+        print(f"File saved to: {self._path}, file size: {file_size_kb:.2f} KB")
+
+
+class ReplayReader:
+    """
+    Read the frames of a replay file randomly.
+    The file is memory-mapped, only the records from the keyframes to the requested frames are parsed.
+    Reading the frames in order decodes each record once.
+    The view objects in the frames are in the json format of the web.
+    ```
+    with ReplayReader(path) as reader:
+        last_frame = reader.frame(len(reader) - 1)
+        for progress_data in reader.iter_frames(100, 200):
+            ...
+    ```
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.keyframe_interval = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        if version != REPLAY_VERSION:
+            raise ValueError(f"Unsupported replay version {version}")
+        magic = None
+        if len(self._mmap) >= _HEADER.size + _TRAILER.size:
+            index_offset, frame_count, magic = _TRAILER.unpack_from(self._mmap, len(self._mmap) - _TRAILER.size)
+        if magic == MAGIC:
+            self._index = np.frombuffer(self._mmap, dtype=INDEX_DTYPE, count=frame_count, offset=index_offset)
+        else:
+            self._index = self._scan_index()
+            logger.warning(f"The index of {path} is missing, the replay may not be closed properly. "
+                           f"{len(self._index)} frames are recovered.")
+        self._decoder = None
+        # the last decoded frame
+        self._decoded_frame_no = None
+        self._decoded_frame = None
+
+    def __len__(self):
+        return len(self._index)
+
+    def _scan_index(self) -> np.ndarray:
+        """
+        Rebuild the index from the length-prefixed records.
+        The scan stops at the first incomplete record, which the writer didn't finish.
+        """
+        index = []
+        keyframe_no = None
+        pos = _HEADER.size
+        while pos + _RECORD_HEADER.size <= len(self._mmap):
+            length, is_keyframe = _RECORD_HEADER.unpack_from(self._mmap, pos)
+            start = pos + _RECORD_HEADER.size
+            end = start + length
+            if is_keyframe > 1 or length == 0 or end > len(self._mmap) or \
+                    self._mmap[start:start + 1] != b"{" or self._mmap[end - 1:end] != b"}":
+                break
+            if is_keyframe:
+                keyframe_no = len(index)
+            elif keyframe_no is None:
+                break
+            index.append((start, length, keyframe_no))
+            pos = end
+        return np.array(index, dtype=INDEX_DTYPE)
+
+    def _load_record(self, frame_no: int) -> dict:
+        offset, length, _ = self._index[frame_no].tolist()
+        delta = orjson.loads(self._mmap[offset:offset + length])
+        # the ids of the objects are the keys of json objects, which are strings
+        delta["added"] = {int(obj_id): obj for obj_id, obj in delta["added"].items()}
+        delta["changed"] = {int(obj_id): attrs for obj_id, attrs in delta["changed"].items()}
+        return delta
+
+    def frame(self, frame_no: int) -> dict:
+        """
+        Get the progress data of the frame, which is the `frame_no`-th written frame counted from 0.
+        The frames share the unchanged view objects, so they should not be modified in place.
+        """
+        if frame_no < 0:
+            frame_no += len(self)
+        if not 0 <= frame_no < len(self):
+            raise IndexError(f"frame {frame_no} is out of range of {len(self)} frames")
+
+        if frame_no == self._decoded_frame_no:
+            return dict(self._decoded_frame)
+        keyframe_no = int(self._index[frame_no]["base"])
+        if self._decoded_frame_no is not None and keyframe_no <= self._decoded_frame_no < frame_no:
+            # continue from the last decoded frame after the same keyframe
+            start = self._decoded_frame_no + 1
+        else:
+            self._decoder = ProgressDeltaDecoder()
+            start = keyframe_no
+        for record_no in range(start, frame_no + 1):
+            self._decoded_frame = self._decoder.decode(self._load_record(record_no))
+            self._decoded_frame_no = record_no
+        return dict(self._decoded_frame)
+
+    def iter_frames(self, start: int = 0, stop: int = None):
+        """
+        Iterate the frames in the range [start, stop)
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        for frame_no in range(start, stop):
+            yield self.frame(frame_no)
+
+    def __iter__(self):
+        return self.iter_frames()
+
+    def close(self):
+        # the index is a view of the mmap, which should be released before closing it
+        self._index = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
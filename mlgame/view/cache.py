@@ -0,0 +1,140 @@
+"""
+Caches of the rendered surfaces shared by the view objects
+"""
+import math
+from collections import OrderedDict
+
+import pygame
+
+
+def get_surface_bytes(surface: pygame.Surface) -> int:
+    return surface.get_pitch() * surface.get_height()
+
+
+class SurfaceCache:
+    """
+    A LRU cache of surfaces bounded by the total bytes of the pixels.
+    The least recently used surfaces are evicted when the cache is over `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        @param max_bytes The maximum total bytes of the cached surfaces
+        """
+        self.max_bytes = max_bytes
+        self._surfaces = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def get(self, key):
+        """
+        @return The cached surface of the key, or None if it is not cached
+        """
+        surface = self._surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._surfaces.move_to_end(key)
+        return surface
+
+    def put(self, key, surface: pygame.Surface):
+        if key in self._surfaces:
+            self.total_bytes -= get_surface_bytes(self._surfaces.pop(key))
+        surface_bytes = get_surface_bytes(surface)
+        if surface_bytes > self.max_bytes:
+            # the surface would evict all the others
+            return
+        self._surfaces[key] = surface
+        self.total_bytes += surface_bytes
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._surfaces.popitem(last=False)
+            self.total_bytes -= get_surface_bytes(evicted)
+
+    def get_or_create(self, key, create_surface) -> pygame.Surface:
+        """
+        Get the cached surface of the key, or create it by `create_surface()` and cache it
+        """
+        surface = self.get(key)
+        if surface is None:
+            surface = create_surface()
+            self.put(key, surface)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._surfaces),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class TransformCache(SurfaceCache):
+    """
+    A cache of the scaled and rotated images.
+    The scales and the angles are quantized to steps, so that a continuous zoom or rotation
+    reuses a bounded number of surfaces.
+    """
+
+    def __init__(self, max_bytes: int, angle_step: float = 1.0, scale_step: float = 0.01):
+        """
+        @param angle_step The step of the quantized angles in degrees, 0 to disable the quantization
+        @param scale_step The step of the quantized scales, 0 to disable the quantization
+        """
+        super().__init__(max_bytes)
+        self.angle_step = angle_step
+        self.scale_step = scale_step
+
+    def quantize_scale(self, scale: float) -> float:
+        if not self.scale_step:
+            return scale
+        return round(scale / self.scale_step) * self.scale_step
+
+    def quantize_angle(self, radian_angle: float) -> float:
+        """
+        @return The quantized angle in radians
+        """
+        if not self.angle_step:
+            return radian_angle
+        degree = round(math.degrees(radian_angle) / self.angle_step) * self.angle_step % 360
+        return math.radians(degree)
+
+    def transform(self, img: pygame.Surface, width: int, height: int, scale: float,
+                  radian_angle: float) -> pygame.Surface:
+        """
+        Scale the image to the size (`width` * `scale`, `height` * `scale`) and rotate it by `radian_angle`
+        """
+        scale = self.quantize_scale(scale)
+        radian_angle = self.quantize_angle(radian_angle)
+        return self.get_or_create(
+            (img, width, height, scale, radian_angle),
+            lambda: pygame.transform.rotate(
+                pygame.transform.scale(img, (int(width * scale), int(height * scale))),
+                math.degrees(radian_angle) % 360))
+
+    def stats(self) -> dict:
+        return {**super().stats(), "angle_step": self.angle_step, "scale_step": self.scale_step}
+
+
+# the rendered text surfaces of `Text`
+text_surface_cache = SurfaceCache(max_bytes=16 * 1024 * 1024)
+# the scaled and rotated images of `Image`
+image_transform_cache = TransformCache(max_bytes=64 * 1024 * 1024)
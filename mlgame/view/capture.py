@@ -0,0 +1,92 @@
+"""
+Save the frames of the display in a background thread
+"""
+import os
+import queue
+import threading
+
+import pygame
+
+from mlgame.utils.enum import CapturePolicy
+from mlgame.utils.logger import logger
+
+
+class FrameCapturer:
+    """
+    Copy the display surface into a pooled buffer and save it by an encoder thread,
+    so that encoding images and writing files don't block the game loop.
+
+    At most `queue_size` frames are waiting for the encoder. When all the buffers are in use,
+    `CapturePolicy.BLOCK` waits for a free buffer and `CapturePolicy.DROP` skips the frame.
+    """
+
+    def __init__(self, output_folder, queue_size: int = 8, policy: CapturePolicy = CapturePolicy.BLOCK,
+                 stride: int = 1, image_format: str = "jpg"):
+        """
+        @param output_folder The folder to save the images `<frame>.<image_format>`
+        @param queue_size The number of the pooled buffers
+        @param policy What to do when all the buffers are in use
+        @param stride Capture a frame every `stride` frames
+        """
+        self._output_folder = output_folder
+        self._queue_size = queue_size
+        self._policy = policy
+        self._stride = stride
+        self._image_format = image_format
+        self._free_buffers = queue.Queue()
+        self._buffer_size = None
+        self._buffer_count = 0
+        self._pending_frames = queue.Queue()
+        self.captured_count = 0
+        self.dropped_count = 0
+        self._encoder = threading.Thread(target=self._encode_frames, name="frame_encoder", daemon=True)
+        self._encoder.start()
+
+    def _get_free_buffer(self, surface: pygame.Surface):
+        if self._buffer_size != surface.get_size():
+            # the size of the display is changed, the old buffers are dropped when they are returned
+            self._buffer_size = surface.get_size()
+            self._free_buffers = queue.Queue()
+            self._buffer_count = 0
+        if self._free_buffers.empty() and self._buffer_count < self._queue_size:
+            self._buffer_count += 1
+            return pygame.Surface(self._buffer_size, 0, surface)
+        try:
+            return self._free_buffers.get(block=self._policy == CapturePolicy.BLOCK)
+        except queue.Empty:
+            return None
+
+    def capture(self, surface: pygame.Surface, frame_no: int):
+        """
+        Capture the surface as the image of the frame.
+        The frame is skipped if it is not on the stride or the surface is None.
+        """
+        if surface is None or (frame_no - 1) % self._stride != 0:
+            return
+        buffer = self._get_free_buffer(surface)
+        if buffer is None:
+            self.dropped_count += 1
+            return
+        buffer.blit(surface, (0, 0))
+        self._pending_frames.put((
+            buffer, self._free_buffers,
+            os.path.join(self._output_folder, f"{frame_no:05d}.{self._image_format}")))
+
+    def _encode_frames(self):
+        while (pending_frame := self._pending_frames.get()) is not None:
+            buffer, free_buffers, path = pending_frame
+            try:
+                pygame.image.save(buffer, path)
+                self.captured_count += 1
+            except Exception:
+                logger.exception(f"Failed to save the frame {path}")
+            free_buffers.put(buffer)
+
+    def close(self):
+        """
+        Wait for the encoder to save the pending frames
+        """
+        self._pending_frames.put(None)
+        self._encoder.join()
+        print(f"{self.captured_count} frames are saved in {self._output_folder}, "
+              f"{self.dropped_count} frames are dropped")
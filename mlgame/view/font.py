@@ -0,0 +1,110 @@
+"""
+Load the fonts of the font styles used by `Text`, like "24px Arial" or "24px Arial BOLD"
+"""
+import threading
+from functools import lru_cache
+
+import pygame
+
+from mlgame.utils.logger import logger
+
+
+@lru_cache
+def parse_font_style(font_style: str) -> tuple:
+    """
+    @return (font_type, size, bold) of the font style
+    """
+    font_style_list = font_style.split(" ", -1)
+    size = int(font_style_list[0].replace("px", "", 1))
+    font_type = font_style_list[1].lower()
+    return font_type, size, "BOLD" in font_style_list
+
+
+@lru_cache
+def match_font_file(font_type: str, bold: bool):
+    """
+    Find the font file by `pygame.font.match_font()`, which may search the system fonts slowly.
+    @return The path of the font file, or None to use the default font of pygame
+    """
+    return pygame.font.match_font(font_type, bold=bold)
+
+
+class FontRegistry:
+    """
+    The fonts of the font styles at the sizes scaled by the view.
+
+    The fonts of the view objects found by `scan()` are found and loaded in a background thread,
+    so that drawing the frames doesn't wait for searching the system fonts and loading the font files.
+    """
+
+    def __init__(self):
+        self._fonts = {}
+        self._font_styles = set()
+        # the (font_style, scale) already scanned
+        self._scanned = set()
+        self._lock = threading.Lock()
+
+    @property
+    def font_styles(self) -> set:
+        return set(self._font_styles)
+
+    def scan(self, view_objects, scale=1) -> list:
+        """
+        Find the font styles of the view objects and load their fonts at the scale in the background
+        @param view_objects The view objects or the dicts of them in the json format of the web
+        @param scale The scale of the view which the fonts will be drawn at
+        @return The font styles found for the first time
+        """
+        new_font_styles = []
+        font_keys = []
+        for view_object in view_objects:
+            if isinstance(view_object, dict):
+                font_style = view_object.get("font-style")
+            else:
+                font_style = getattr(view_object, "font_style", None)
+            if font_style is None or (font_style, scale) in self._scanned:
+                continue
+            self._scanned.add((font_style, scale))
+            if font_style not in self._font_styles:
+                self._font_styles.add(font_style)
+                new_font_styles.append(font_style)
+            font_key = self._get_font_key(font_style, scale)
+            if font_key not in self._fonts:
+                font_keys.append(font_key)
+        if font_keys:
+            threading.Thread(target=self._load_fonts_in_background, args=(font_keys,), name="font_loading",
+                             daemon=True).start()
+        return new_font_styles
+
+    @staticmethod
+    def _get_font_key(font_style: str, scale) -> tuple:
+        # the scales rounded to the same size share the font
+        return font_style, max(1, round(parse_font_style(font_style)[1] * scale))
+
+    def _load_font(self, font_key: tuple) -> pygame.font.Font:
+        with self._lock:
+            font = self._fonts.get(font_key)
+            if font is None:
+                font_type, _, bold = parse_font_style(font_key[0])
+                font = pygame.font.Font(match_font_file(font_type, bold), font_key[1])
+                self._fonts[font_key] = font
+            return font
+
+    def _load_fonts_in_background(self, font_keys: list):
+        for font_key in font_keys:
+            try:
+                self._load_font(font_key)
+            except Exception:
+                logger.exception(f"Failed to load the font of {font_key[0]}")
+
+    def get_font(self, font_style: str, scale=1) -> pygame.font.Font:
+        """
+        Get the font of the font style whose size is scaled by `scale`.
+        If it is still loaded in the background, wait for it.
+        """
+        font_key = self._get_font_key(font_style, scale)
+        font = self._fonts.get(font_key)
+        if font is None:
+            self._font_styles.add(font_style)
+            font = self._load_font(font_key)
+        return font
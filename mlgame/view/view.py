@@ -1,13 +1,14 @@
 import abc
-import math
 import os.path
 import time
 from functools import lru_cache
 
 import pygame
 
+from mlgame.utils.logger import logger
 from mlgame.view.decorator import K_BACKGROUND, K_SCENE
-from mlgame.view.view_model import SceneInfo, Text
+from mlgame.view.font import FontRegistry
+from mlgame.view.view_model import SceneInfo, transform_polygon_vertices, VIEW_LIST_KEYS
 
 KEYS = [
     pygame.K_a, pygame.K_b, pygame.K_c, pygame.K_d, pygame.K_e, pygame.K_f, pygame.K_g, pygame.K_h, pygame.K_i,
@@ -51,21 +52,6 @@ def scale_bias_of_coordinate(obj_length, scale):
     return obj_length / 2 * (1 - scale)
 
 
-@lru_cache
-def rotate_img(scaled_img, radian_angle):
-    return pygame.transform.rotate(
-        scaled_img,
-        (radian_angle * 180 / math.pi) % 360
-    )
-
-
-@lru_cache
-def scale_img(img, origin_width, origin_height, scale_ratio):
-    return pygame.transform.scale(
-        img, (int(origin_width * scale_ratio), int(origin_height * scale_ratio))
-    )
-
-
 class PygameViewInterface(abc.ABC):
     def __init__(self, game_info: dict):
         pass
@@ -86,6 +72,12 @@ class PygameViewInterface(abc.ABC):
     def save_image(self, img_path: os.path.abspath):
         pass
 
+    def get_display_surface(self):
+        """
+        Get the surface drawn by the view. Return None if the view doesn't draw anything.
+        """
+        return None
+
     def is_paused(self):
         return False
 
@@ -108,7 +100,10 @@ class DummyPygameView(PygameViewInterface):
 
 
 class PygameView(PygameViewInterface):
-    def __init__(self, game_info: dict):
+    def __init__(self, game_info: dict, dirty_rect: bool = False):
+        """
+        @param dirty_rect Only redraw and update the areas changed since the last frame
+        """
         super().__init__(game_info)
         self._pause_state = False
         self._last_pause_btn_clicked_time = 0
@@ -124,7 +119,12 @@ class PygameView(PygameViewInterface):
         screen = pygame.display.set_mode(
             (width, height),
             flags=pygame.RESIZABLE | pygame.SCALED)
-        self.scene_info = SceneInfo(screen, self.loading_image(), {}, width, height)
+        self.font_registry = FontRegistry()
+        # load the fonts of the view objects in the scene init data before drawing the first frame
+        for value in self.scene_init_data.values():
+            if isinstance(value, list):
+                self.font_registry.scan(value)
+        self.scene_info = SceneInfo(screen, self.loading_image(), self.font_registry, width, height)
         # self.map_width = game_info["map_width"]
         # self.map_height = game_info["map_height"]
         self.origin_bias_point = [self.scene_init_data[K_SCENE]["bias_x"], self.scene_init_data[K_SCENE]["bias_y"]]
@@ -136,6 +136,15 @@ class PygameView(PygameViewInterface):
         #     self.image_dict = self.loading_image(game_info["images"])
         self._toggle_on = True
         self._toggle_last_time = 0
+        self._dirty_rect = dirty_rect
+        # the view state and the drawn objects of the last frame in the dirty-rect mode
+        self._last_view_state = None
+        self._last_drawn_objects = None
+        # the fixed background pre-rendered with the background color, and the view state it is rendered for
+        self._background_layer = None
+        self._background_layer_key = None
+        # the number of the view objects outside the screen in the last frame
+        self.culled_count = 0
 
     def reset(self):
         self.bias_point_var = [0, 0]
@@ -144,6 +153,7 @@ class PygameView(PygameViewInterface):
         self.scale = 1
         self._toggle_on = True
         self._toggle_last_time = 0
+        self._last_view_state = None
 
     def loading_image(self):
         result = {}
@@ -156,7 +166,6 @@ class PygameView(PygameViewInterface):
         return result
 
     def draw(self, object_information):
-        self.scene_info.display.fill(self.background_color)
         self.adjust_pygame_screen()
 
         if "view_center_coordinate" in object_information["game_sys_info"]:
@@ -167,54 +176,141 @@ class PygameView(PygameViewInterface):
             self.bias_point[0] = self.origin_bias_point[0] + self.bias_point_var[0]
             self.bias_point[1] = self.origin_bias_point[1] + self.bias_point_var[1]
 
-        # in draw()
-        for game_object in self._fixed_backgound_objs:
-            game_object.draw(
-                self.scene_info,
-                self.bias_point[0], self.bias_point[1], self.scale
-            )
-        try:
-            for game_object in object_information["background"]:
-                game_object.draw(
-                    self.scene_info,
-                    self.bias_point[0], self.bias_point[1], self.scale
-                )
-            for game_object in object_information["object_list"]:
-                # let object could be shifted
-                game_object.draw(
-                    self.scene_info,
-                    self.bias_point[0], self.bias_point[1], self.scale
-                )
-            if self._toggle_on:
-                for game_object in object_information["toggle_with_bias"]:
-                    # let object could be shifted
-                    game_object.draw(
-                        self.scene_info,
-                        self.bias_point[0], self.bias_point[1], self.scale
-                    )
-                for game_object in object_information["toggle"]:
-                    game_object.draw(self.scene_info)
-            for game_object in object_information["foreground"]:
-                # object should not be shifted
-                game_object.draw(self.scene_info)
-        except Text.FontNotFoundError as e:
-            font_style_list = e.font_style.split(" ", -1)
-            size = int(font_style_list[0].replace("px", "", 1))
-            font_type = font_style_list[1].lower()
-            if "BOLD" in font_style_list:
-                font = pygame.font.Font(pygame.font.match_font(font_type, bold=True), size * self.scale)
-            else:
-                font = pygame.font.Font(pygame.font.match_font(font_type), size * self.scale)
-            self.scene_info.fonts[e.font_style] = font
-
-            # retry
-            self.draw(object_information)
-        pygame.display.flip()
+        self._scan_fonts(object_information)
+        draw_calls, rects = self._cull_draw_calls(self._get_draw_calls(object_information))
+        if self._dirty_rect:
+            self._draw_dirty_rects(draw_calls, rects)
+        else:
+            self._draw_all(draw_calls)
+            pygame.display.flip()
+
+    def _scan_fonts(self, object_information):
+        """
+        Load the fonts of the new font styles and the new scale in the background
+        """
+        for list_key in VIEW_LIST_KEYS:
+            self.font_registry.scan(object_information.get(list_key, ()), self.scale)
+
+    def _get_draw_calls(self, object_information) -> list:
+        """
+        Get the view objects to draw in order, with the arguments `bias_x`, `bias_y` and `scale` of `draw()`.
+        The fixed background is drawn by the background layer.
+        """
+        # let object could be shifted
+        biased = (self.bias_point[0], self.bias_point[1], self.scale)
+        # object should not be shifted
+        fixed = (0, 0, 1)
+        draw_calls = [(game_object, *biased) for game_object in object_information["background"]]
+        draw_calls.extend((game_object, *biased) for game_object in object_information["object_list"])
+        if self._toggle_on:
+            draw_calls.extend((game_object, *biased) for game_object in object_information["toggle_with_bias"])
+            draw_calls.extend((game_object, *fixed) for game_object in object_information["toggle"])
+        draw_calls.extend((game_object, *fixed) for game_object in object_information["foreground"])
+        return draw_calls
+
+    def _cull_draw_calls(self, draw_calls: list) -> tuple:
+        """
+        Skip the view objects whose bounding rects are outside the screen
+        @return The visible draw calls and their bounding rects. The rect is None if it is unknown.
+        """
+        transform_polygon_vertices(draw_calls, self.scene_info)
+        screen_rect = self.scene_info.display.get_rect()
+        visible_draw_calls = []
+        rects = []
+        for draw_call in draw_calls:
+            game_object, bias_x, bias_y, scale = draw_call
+            rect = game_object.bounding_rect(self.scene_info, bias_x, bias_y, scale)
+            if rect is None or screen_rect.colliderect(rect):
+                visible_draw_calls.append(draw_call)
+                rects.append(rect)
+        self.culled_count = len(draw_calls) - len(visible_draw_calls)
+        logger.debug("Culled %d of %d view objects outside the screen", self.culled_count, len(draw_calls))
+        return visible_draw_calls, rects
+
+    def _get_background_layer(self) -> pygame.Surface:
+        """
+        Get the surface of the background color and the fixed background in the scene init data.
+        It is rendered again only when the view is zoomed, shifted or resized.
+        """
+        display = self.scene_info.display
+        key = (self.scale, tuple(self.bias_point), display.get_size())
+        if key != self._background_layer_key:
+            layer = pygame.Surface(display.get_size(), 0, display)
+            layer.fill(self.background_color)
+            layer_scene_info = SceneInfo(
+                layer, self.scene_info.assets, self.scene_info.fonts, self.scene_info.width, self.scene_info.height)
+            for game_object in self._fixed_backgound_objs:
+                game_object.draw(layer_scene_info, self.bias_point[0], self.bias_point[1], self.scale)
+            self._background_layer = layer
+            self._background_layer_key = key
+        return self._background_layer
+
+    def _draw_all(self, draw_calls: list):
+        self.scene_info.display.blit(self._get_background_layer(), (0, 0))
+        for game_object, bias_x, bias_y, scale in draw_calls:
+            game_object.draw(self.scene_info, bias_x, bias_y, scale)
+
+    def _draw_dirty_rects(self, draw_calls: list, rects: list):
+        """
+        Redraw the areas of the objects which are added, removed or changed since the last frame,
+        and update only these areas of the screen.
+        The whole screen is redrawn when the view is zoomed, shifted or toggled.
+        """
+        display = self.scene_info.display
+        view_state = (self.scale, tuple(self.bias_point), self._toggle_on, display.get_size())
+        drawn_objects = []
+        for (game_object, bias_x, bias_y, scale), rect in zip(draw_calls, rects):
+            attrs = [value for key, value in vars(game_object).items() if not key.startswith("_")]
+            drawn_objects.append(((type(game_object), attrs, bias_x, bias_y, scale), rect))
+        dirty_rects = self._get_dirty_rects(view_state, drawn_objects)
+        if dirty_rects is None:
+            self._draw_all(draw_calls)
+            pygame.display.flip()
+        else:
+            background_layer = self._get_background_layer()
+            try:
+                for dirty_rect in dirty_rects:
+                    display.set_clip(dirty_rect)
+                    display.blit(background_layer, dirty_rect, dirty_rect)
+                    for index in dirty_rect.collidelistall(rects):
+                        game_object, bias_x, bias_y, scale = draw_calls[index]
+                        game_object.draw(self.scene_info, bias_x, bias_y, scale)
+            finally:
+                display.set_clip(None)
+            pygame.display.update(dirty_rects)
+        # keep the state only after the frame is drawn completely
+        self._last_view_state = view_state
+        self._last_drawn_objects = drawn_objects
+
+    def _get_dirty_rects(self, view_state, drawn_objects):
+        """
+        Compare the objects with the objects drawn at the same position of the drawing order in the last frame
+        @return The list of the changed areas, or None if the whole screen should be redrawn
+        """
+        if view_state != self._last_view_state or any(rect is None for _, rect in drawn_objects):
+            return None
+        last_drawn_objects = self._last_drawn_objects
+        dirty_rects = []
+        for index in range(max(len(drawn_objects), len(last_drawn_objects))):
+            current = drawn_objects[index] if index < len(drawn_objects) else None
+            last = last_drawn_objects[index] if index < len(last_drawn_objects) else None
+            if current is not None and last is not None and current[0] == last[0]:
+                continue
+            dirty_rects.extend(drawn[1] for drawn in (current, last) if drawn is not None)
+
+        screen_area = self.scene_info.width * self.scene_info.height
+        if sum(rect.width * rect.height for rect in dirty_rects) > screen_area / 2:
+            # redrawing the whole screen is cheaper
+            return None
+        return dirty_rects
 
     def save_image(self, img_path: os.path.abspath):
         pygame.image.save(self.scene_info.display, img_path)
         pass
 
+    def get_display_surface(self):
+        return self.scene_info.display
+
     def adjust_pygame_screen(self):
         """
         zoom in zoom out and shift the window.
@@ -3,8 +3,12 @@ import math
 import random
 from functools import lru_cache
 
+import numpy as np
 import pygame
 
+from mlgame.view.cache import image_transform_cache, text_surface_cache
+from mlgame.view.font import FontRegistry
+
 class SceneInfo:
     def __init__(self, display, assets, fonts, width, height):
         self.display = display
@@ -18,6 +22,20 @@ class View(abc.ABC):
     def draw(self, scene_info: SceneInfo, bias_x=0, bias_y=0, scale=1):
         pass
 
+    def bounding_rect(self, scene_info: SceneInfo, bias_x=0, bias_y=0, scale=1):
+        """
+        Get the area on the screen covered by `draw()` with the same arguments.
+        Return None if the area is unknown.
+        """
+        return None
+
+
+def _to_bounding_rect(left, top, right, bottom, padding=1) -> pygame.Rect:
+    # pad the rect for the anti-aliased and rounded pixels
+    left = math.floor(left) - padding
+    top = math.floor(top) - padding
+    return pygame.Rect(left, top, math.ceil(right) + padding - left + 1, math.ceil(bottom) + padding - top + 1)
+
 class Scene:
     def __init__(self, width: int, height: int, color: str = "#000000", bias_x=0, bias_y=0):
         """
@@ -32,19 +50,6 @@ class Scene:
         self.bias_x = bias_x
         self.bias_y = bias_y
 
-@lru_cache
-def scale_img(img, origin_width, origin_height, scale_ratio):
-    return pygame.transform.scale(
-        img, (int(origin_width * scale_ratio), int(origin_height * scale_ratio))
-    )
-
-@lru_cache
-def rotate_img(scaled_img, radian_angle):
-    return pygame.transform.rotate(
-        scaled_img,
-        (radian_angle * 180 / math.pi) % 360
-    )
-
 @lru_cache
 def scale_bias_of_coordinate(obj_length, scale):
     return obj_length / 2 * (1 - scale)
@@ -69,14 +74,23 @@ class Image(View):
         self.angle = angle
 
     def draw(self, scene_info, bias_x=0, bias_y=0, scale=1):
-        scaled_img = scale_img(scene_info.assets[self.image_id], self.width, self.height, scale)
-        rotated_img = rotate_img(scaled_img, self.angle)
-        # print(angle)
+        rotated_img = image_transform_cache.transform(
+            scene_info.assets[self.image_id], self.width, self.height, scale, self.angle)
         rect = rotated_img.get_rect()
         rect.x = self.x * scale + scale_bias_of_coordinate(scene_info.width, scale)
         rect.y = self.y * scale + scale_bias_of_coordinate(scene_info.height, scale)
         scene_info.display.blit(rotated_img, rect)
 
+    def bounding_rect(self, scene_info, bias_x=0, bias_y=0, scale=1):
+        # the image is transformed with the quantized scale and angle
+        image_scale = image_transform_cache.quantize_scale(scale)
+        angle = image_transform_cache.quantize_angle(self.angle)
+        width, height = int(self.width * image_scale), int(self.height * image_scale)
+        cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+        left = self.x * scale + scale_bias_of_coordinate(scene_info.width, scale)
+        top = self.y * scale + scale_bias_of_coordinate(scene_info.height, scale)
+        return _to_bounding_rect(left, top, left + width * cos + height * sin, top + width * sin + height * cos, 2)
+
 
 class Rect(View):
     """
@@ -108,6 +122,11 @@ class Rect(View):
                         self.width * scale,
                         self.height * scale))
 
+    def bounding_rect(self, scene_info, bias_x=0, bias_y=0, scale=1):
+        left = self.x * scale + scale_bias_of_coordinate(scene_info.width, scale)
+        top = self.y * scale + scale_bias_of_coordinate(scene_info.height, scale)
+        return _to_bounding_rect(left, top, left + self.width * scale, top + self.height * scale)
+
 
 class Line(View):
     """
@@ -136,49 +155,131 @@ class Line(View):
         else:
             pygame.draw.line(scene_info.display, self.color, (self.x1, self.y1), (self.x2 * scale, self.y2), int(self.width))
 
+    def bounding_rect(self, scene_info, bias_x=0, bias_y=0, scale=1):
+        offset_width = scale_bias_of_coordinate(scene_info.width, scale)
+        offset_height = scale_bias_of_coordinate(scene_info.height, scale)
+        xs = (self.x1 * scale + offset_width, self.x2 * scale + offset_width)
+        ys = (self.y1 * scale + offset_height, self.y2 * scale + offset_height)
+        half_width = int(self.width * scale) / 2
+        return _to_bounding_rect(min(xs) - half_width, min(ys) - half_width,
+                                 max(xs) + half_width, max(ys) + half_width)
+
+
+def _to_points_array(points) -> np.ndarray:
+    return np.array([(p["x"], p["y"]) if isinstance(p, dict) else (p[0], p[1]) for p in points],
+                    dtype=np.float32).reshape(-1, 2)
 
-class Polygon(View):
+
+class _PolygonView(View):
     """
-    這是一個用來繪製多邊形的資料格式，
-    points欄位至少三個 # [[100,101],[52.1,31.3],[53.1,12.3]]
-    :return:dict
+    The base of the polygons, which keeps the points as a float32 array of shape (point_count, 2).
+    The array is created with the polygon, and created again when `points` is replaced by another list.
     """
     def __init__(self, name: str, points: list, color: str):
         assert len(points) >= 3
         self.name = name
         self.points = points
         self.color = color
+        self._update_points_array()
 
-    def draw(self, scene_info, bias_x=0, bias_y=0, scale=1):
-        vertices = []
-        for p in self.points:
-            vertices.append((
-                (p["x"] + bias_x) * scale + scale_bias_of_coordinate(scene_info.width, scale),
-                (p["y"] + bias_y) * scale + scale_bias_of_coordinate(scene_info.height, scale)
-            ))
-        pygame.draw.polygon(scene_info.display, self.color, vertices)
+    def __getstate__(self):
+        # the arrays are created again after unpickling
+        return {key: value for key, value in vars(self).items() if not key.startswith("_")}
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self._update_points_array()
+
+    def _update_points_array(self):
+        self._points_array = _to_points_array(self.points)
+        self._points_source = self.points
+
+    @property
+    def points_array(self) -> np.ndarray:
+        if self._points_source is not self.points:
+            self._update_points_array()
+        return self._points_array
+
+    def set_vertices(self, scene_info, bias_x, bias_y, scale, vertices: np.ndarray):
+        """
+        Keep the vertices on the screen transformed by `transform_polygon_vertices()`
+        """
+        self._vertices = vertices
+        self._vertices_key = (self._points_array, bias_x, bias_y, scale, scene_info.width, scene_info.height)
+
+    def get_vertices(self, scene_info, bias_x=0, bias_y=0, scale=1) -> np.ndarray:
+        """
+        Get the vertices on the screen, which are transformed in the batch of the frame if possible
+        """
+        points_array = self.points_array
+        key = getattr(self, "_vertices_key", None)
+        if key is not None and key[0] is points_array and \
+                key[1:] == (bias_x, bias_y, scale, scene_info.width, scene_info.height):
+            return self._vertices
+        return _transform_points(points_array, scene_info, bias_x, bias_y, scale)
 
+    def _get_bounding_rect(self, scene_info, bias_x, bias_y, scale, line_width=0):
+        vertices = self.get_vertices(scene_info, bias_x, bias_y, scale)
+        left, top = vertices.min(axis=0).tolist()
+        right, bottom = vertices.max(axis=0).tolist()
+        return _to_bounding_rect(left - line_width, top - line_width, right + line_width, bottom + line_width)
 
-class AAPolygon(View):
+
+def _transform_points(points_array: np.ndarray, scene_info, bias_x, bias_y, scale) -> np.ndarray:
+    offset = np.array([bias_x * scale + scale_bias_of_coordinate(scene_info.width, scale),
+                       bias_y * scale + scale_bias_of_coordinate(scene_info.height, scale)], dtype=np.float32)
+    return points_array * np.float32(scale) + offset
+
+
+def transform_polygon_vertices(draw_calls, scene_info):
+    """
+    Transform the points of all the polygons to the screen with one vectorized operation
+    for each (bias_x, bias_y, scale), and keep the vertices in the polygons for drawing them.
+    @param draw_calls The iterable of (view_object, bias_x, bias_y, scale)
+    """
+    polygon_groups = {}
+    for view_object, bias_x, bias_y, scale in draw_calls:
+        if isinstance(view_object, _PolygonView):
+            polygon_groups.setdefault((bias_x, bias_y, scale), []).append(view_object)
+    for (bias_x, bias_y, scale), polygons in polygon_groups.items():
+        points_arrays = [polygon.points_array for polygon in polygons]
+        vertices = _transform_points(np.concatenate(points_arrays), scene_info, bias_x, bias_y, scale)
+        split_indexes = np.cumsum([len(points_array) for points_array in points_arrays[:-1]])
+        for polygon, polygon_vertices in zip(polygons, np.split(vertices, split_indexes)):
+            polygon.set_vertices(scene_info, bias_x, bias_y, scale, polygon_vertices)
+
+
+class Polygon(_PolygonView):
     """
     這是一個用來繪製多邊形的資料格式，
     points欄位至少三個 # [[100,101],[52.1,31.3],[53.1,12.3]]
     :return:dict
     """
-    def __init__(self, name: str, points: list, color: str):
-        assert len(points) >= 3
-        self.name = name
-        self.points = points
-        self.color = color
+    def draw(self, scene_info, bias_x=0, bias_y=0, scale=1):
+        vertices = self.get_vertices(scene_info, bias_x, bias_y, scale)
+        pygame.draw.polygon(scene_info.display, self.color, vertices.tolist())
 
+    def bounding_rect(self, scene_info, bias_x=0, bias_y=0, scale=1):
+        return self._get_bounding_rect(scene_info, bias_x, bias_y, scale)
+
+
+class AAPolygon(_PolygonView):
+    """
+    這是一個用來繪製多邊形的資料格式，
+    points欄位至少三個 # [[100,101],[52.1,31.3],[53.1,12.3]]
+    :return:dict
+    """
     def draw(self, scene_info, bias_x=0, bias_y=0, scale=1):
-        vertices = []
-        for p in self.points:
-            vertices.append((
-                (p["x"] + bias_x) * scale + scale_bias_of_coordinate(scene_info.width, scale),
-                (p["y"] + bias_y) * scale + scale_bias_of_coordinate(scene_info.height, scale)
-            ))
-        pygame.draw.polygon(scene_info.display, self.color, vertices, width=scale * 5)
+        vertices = self.get_vertices(scene_info, bias_x, bias_y, scale)
+        pygame.draw.polygon(scene_info.display, self.color, vertices.tolist(), width=self._get_line_width(scale))
+
+    def bounding_rect(self, scene_info, bias_x=0, bias_y=0, scale=1):
+        return self._get_bounding_rect(scene_info, bias_x, bias_y, scale, self._get_line_width(scale))
+
+    @staticmethod
+    def _get_line_width(scale) -> int:
+        # the width 0 fills the polygon, so the outline is at least 1 pixel wide
+        return max(1, int(scale * 5))
 
 class Text(View):
     """
@@ -200,17 +301,37 @@ class Text(View):
         def __init__(self, font_style: str):
             self.font_style = font_style
 
-    def draw(self, scene_info, bias_x=0, bias_y=0, scale=1):
+    def _get_font(self, scene_info, scale):
+        """
+        Get the font from the `FontRegistry`, or from the dict of the fonts which are not scaled
+        """
+        if isinstance(scene_info.fonts, FontRegistry):
+            return scene_info.fonts.get_font(self.font_style, scale)
         if self.font_style not in scene_info.fonts.keys():
             raise self.FontNotFoundError(self.font_style)
+        return scene_info.fonts[self.font_style]
 
-        font = scene_info.fonts[self.font_style]
-        text_surface = font.render(self.content, True, self.color)
+    def draw(self, scene_info, bias_x=0, bias_y=0, scale=1):
+        font = self._get_font(scene_info, scale)
+        # the font object is in the key, because the font of a style could be loaded again
+        text_surface = text_surface_cache.get_or_create(
+            (self.font_style, self.content, self.color, scale, font),
+            lambda: font.render(self.content, True, self.color))
         text_rect = text_surface.get_rect()
         text_rect.x, text_rect.y = (self.x * scale + scale_bias_of_coordinate(scene_info.width, scale),
                                     self.y * scale + scale_bias_of_coordinate(scene_info.height, scale))
         scene_info.display.blit(text_surface, text_rect)
 
+    def bounding_rect(self, scene_info, bias_x=0, bias_y=0, scale=1):
+        try:
+            font = self._get_font(scene_info, scale)
+        except self.FontNotFoundError:
+            return None
+        width, height = font.size(self.content)
+        left = self.x * scale + scale_bias_of_coordinate(scene_info.width, scale)
+        top = self.y * scale + scale_bias_of_coordinate(scene_info.height, scale)
+        return _to_bounding_rect(left, top, left + width, top + height)
+
 def create_asset_init_data(image_id: str, width: int, height: int, file_path: str, github_raw_url: str):
     # assert file_path is valid
     return {
@@ -232,6 +353,10 @@ def create_scene_view_data(width: int, height: int, color: str = "#000000", bias
     }
 
 
+# The keys of the lists of view objects in the progress data, in the drawing order
+VIEW_LIST_KEYS = ("background", "object_list", "toggle_with_bias", "toggle", "foreground")
+
+
 def create_scene_progress_data(frame: int = 0, background=None, object_list=None,
                                toggle=None, toggle_with_bias=None, foreground=None, user_info=None,
                                game_sys_info=None):
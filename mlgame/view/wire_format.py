@@ -0,0 +1,272 @@
+"""
+The compact binary encoding of view objects, and the json fallback for the web
+
+The view objects are grouped by their types, and each type is encoded as an array of
+numpy structured records whose fields are the arguments of the constructor of the type.
+
+The numbers are kept as float64 with a flag of whether each number is an `int`,
+so that the decoded progress data is the same as the encoded one.
+
+Binary layout of version 3, all numbers are little-endian:
+```
+header  : magic "MLGV", version u1, 3 bytes padding,
+          string_count u4, point_count u4, others_len u4,
+          the record count of each type in `_TYPE_SPECS` (u4 each),
+          the object count of each list in `VIEW_LIST_KEYS` (u4 each)
+tags    : the tag u1 of each view object in the order of the lists
+strings : (string_count + 1) offsets u4, utf-8 bytes
+records : the records of each type in `_TYPE_SPECS`
+points  : point_count x `POINT_DTYPE`
+others  : the remaining keys of the progress data in json
+```
+"""
+import struct
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
+from orjson import orjson
+
+from mlgame.view.view_model import Image, Rect, Line, Polygon, AAPolygon, Text, VIEW_LIST_KEYS
+
+WIRE_FORMAT_VERSION = 3
+MAGIC = b"MLGV"
+
+TAG_IMAGE = 1
+TAG_RECT = 2
+TAG_LINE = 3
+TAG_POLYGON = 4
+TAG_AAPOLYGON = 5
+TAG_TEXT = 6
+
+# The fields of each type in the order of the arguments of the constructor.
+# "s" is an index of the string table, "n" is a number and "p" is a list of points.
+_TYPE_SPECS = {
+    TAG_IMAGE: (Image, (("image_id", "s"), ("x", "n"), ("y", "n"), ("width", "n"), ("height", "n"),
+                        ("angle", "n"))),
+    TAG_RECT: (Rect, (("name", "s"), ("x", "n"), ("y", "n"), ("width", "n"), ("height", "n"),
+                      ("color", "s"), ("angle", "n"))),
+    TAG_LINE: (Line, (("name", "s"), ("x1", "n"), ("y1", "n"), ("x2", "n"), ("y2", "n"),
+                      ("color", "s"), ("width", "n"))),
+    TAG_POLYGON: (Polygon, (("name", "s"), ("points", "p"), ("color", "s"))),
+    TAG_AAPOLYGON: (AAPolygon, (("name", "s"), ("points", "p"), ("color", "s"))),
+    TAG_TEXT: (Text, (("content", "s"), ("x", "n"), ("y", "n"), ("color", "s"), ("font_style", "s"))),
+}
+_TAGS = {view_cls: tag for tag, (view_cls, _) in _TYPE_SPECS.items()}
+
+
+def _to_record_dtype(fields) -> np.dtype:
+    dtype_fields = []
+    for name, kind in fields:
+        if kind == "s":
+            dtype_fields.append((name, "<u4"))
+        elif kind == "n":
+            dtype_fields.append((name, "<f8"))
+        else:
+            dtype_fields += [("point_offset", "<u4"), ("point_count", "<u4")]
+    # the bit i is set if the i-th number field is an `int`
+    dtype_fields.append(("int_flags", "<u1"))
+    return np.dtype(dtype_fields)
+
+
+RECORD_DTYPES = {tag: _to_record_dtype(fields) for tag, (_, fields) in _TYPE_SPECS.items()}
+# the bit 0 and 1 of the int flags are set if x and y are `int`
+POINT_DTYPE = np.dtype([("x", "<f8"), ("y", "<f8"), ("int_flags", "<u1")])
+# the integers beyond it could not be kept by float64
+_MAX_EXACT_INT = 2 ** 53
+_HEADER = struct.Struct("<4sB3xIII" + "I" * (len(_TYPE_SPECS) + len(VIEW_LIST_KEYS)))
+
+# The type names used in the json format of the web
+_JSON_TYPES = {
+    Image: "image", Rect: "rect", Line: "line",
+    Polygon: "polygon", AAPolygon: "aapolygon", Text: "text",
+}
+
+
+def _from_numbers(values: list) -> (np.ndarray, np.ndarray):
+    """
+    @return The float64 array of the numbers and the bool array of whether each number is an `int`
+    @exception TypeError If any value is not an `int` or a `float`, or the `int` could not be kept by float64
+    """
+    value_types = list(map(type, values))
+    if not set(value_types) <= {int, float}:
+        raise TypeError("The number fields of the view objects must be int or float")
+    numbers = np.array(values, dtype="<f8")
+    is_int = np.fromiter((value_type is int for value_type in value_types), dtype=bool, count=len(values))
+    if is_int.any() and np.abs(numbers[is_int]).max() > _MAX_EXACT_INT:
+        raise TypeError(f"The integers larger than {_MAX_EXACT_INT} could not be encoded into the wire format")
+    return numbers, is_int
+
+
+def _to_numbers(column: np.ndarray, is_int: np.ndarray) -> list:
+    """
+    Convert the float64 column back to a list of numbers, in which the flagged numbers are `int`
+    """
+    numbers = column.astype(object)
+    numbers[is_int] = column[is_int].astype(np.int64)
+    return numbers.tolist()
+
+
+def encode_scene_progress(progress_data: dict) -> bytes:
+    """
+    Encode the progress data into the binary wire format
+
+    @exception TypeError If any object in the lists of view objects is not a view object in `_TYPE_SPECS`,
+               or the other data could not be serialized to json
+    """
+    view_lists = [progress_data.get(list_key, []) for list_key in VIEW_LIST_KEYS]
+    view_objs = list(chain.from_iterable(view_lists))
+    try:
+        tags = np.fromiter((_TAGS[type(obj)] for obj in view_objs), dtype="<u1", count=len(view_objs))
+    except KeyError as e:
+        raise TypeError(f"{e.args[0].__name__} could not be encoded into the wire format") from None
+
+    # group the objects by their types
+    order = np.argsort(tags, kind="stable").tolist()
+    type_counts = np.bincount(tags, minlength=len(_TYPE_SPECS) + 1)[1:].tolist()
+    sorted_objs = [view_objs[i] for i in order]
+
+    records_list = []
+    string_columns = []
+    points_list = []
+    point_count = 0
+    start = 0
+    for (tag, (_, fields)), count in zip(_TYPE_SPECS.items(), type_counts):
+        objs = sorted_objs[start:start + count]
+        start += count
+        records = np.zeros(count, dtype=RECORD_DTYPES[tag])
+        number_index = 0
+        for name, kind in fields:
+            if kind == "s":
+                string_columns.append((records[name], list(map(attrgetter(name), objs))))
+            elif kind == "n":
+                records[name], is_int = _from_numbers(list(map(attrgetter(name), objs)))
+                records["int_flags"] |= is_int.astype("<u1") << number_index
+                number_index += 1
+            else:
+                type_points = [obj.points for obj in objs]
+                lengths = np.fromiter(map(len, type_points), dtype="<u4", count=count)
+                records["point_count"] = lengths
+                records["point_offset"] = point_count + np.cumsum(lengths) - lengths
+                points_list += chain.from_iterable(type_points)
+                point_count += int(lengths.sum())
+        records_list.append(records)
+
+    points = np.zeros(point_count, dtype=POINT_DTYPE)
+    try:
+        points["x"], is_int_x = _from_numbers([point["x"] for point in points_list])
+        points["y"], is_int_y = _from_numbers([point["y"] for point in points_list])
+    except (KeyError, IndexError):
+        raise TypeError("The points of the polygons must be the dicts of x and y") from None
+    points["int_flags"] = is_int_x.astype("<u1") | is_int_y.astype("<u1") << 1
+
+    # all the string fields share a table of the unique strings
+    all_strings = list(chain.from_iterable(column for _, column in string_columns))
+    if not all(type(string) is str for string in all_strings):
+        raise TypeError("The string fields of the view objects must be str")
+    unique_strings, string_indexes = np.unique(np.array(all_strings, dtype=object), return_inverse=True)
+    start = 0
+    for record_field, column in string_columns:
+        record_field[:] = string_indexes[start:start + len(column)]
+        start += len(column)
+    encoded_strings = [string.encode("utf-8") for string in unique_strings.tolist()]
+    string_offsets = np.cumsum([0] + [len(string) for string in encoded_strings], dtype="<u4")
+
+    others = orjson.dumps({key: value for key, value in progress_data.items() if key not in VIEW_LIST_KEYS},
+                          default=view_object_to_dict)
+
+    return b"".join([
+        _HEADER.pack(MAGIC, WIRE_FORMAT_VERSION, len(encoded_strings), point_count, len(others),
+                     *type_counts, *map(len, view_lists)),
+        tags.tobytes(), string_offsets.tobytes(), b"".join(encoded_strings),
+        *[records.tobytes() for records in records_list], points.tobytes(), others
+    ])
+
+
+def decode_scene_progress(buf) -> dict:
+    """
+    Decode the binary wire format back to the progress data of view objects
+    """
+    if bytes(buf[:len(MAGIC)]) != MAGIC or len(buf) < _HEADER.size:
+        raise ValueError("The data is not in the wire format of view objects")
+    magic, version, string_count, point_count, others_len, *counts = _HEADER.unpack_from(buf, 0)
+    if version != WIRE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported wire format version {version}")
+    type_counts, list_counts = counts[:len(_TYPE_SPECS)], counts[len(_TYPE_SPECS):]
+
+    pos = _HEADER.size
+    tags = np.frombuffer(buf, dtype="<u1", count=sum(list_counts), offset=pos)
+    pos += tags.nbytes
+    string_offsets = np.frombuffer(buf, dtype="<u4", count=string_count + 1, offset=pos)
+    pos += string_offsets.nbytes
+    offsets = string_offsets.tolist()
+    string_bytes = bytes(buf[pos:pos + offsets[-1]])
+    strings = np.array([string_bytes[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(string_count)],
+                       dtype=object)
+    pos += offsets[-1]
+    records_list = []
+    for (tag, _), count in zip(_TYPE_SPECS.items(), type_counts):
+        records = np.frombuffer(buf, dtype=RECORD_DTYPES[tag], count=count, offset=pos)
+        pos += records.nbytes
+        records_list.append(records)
+    points = np.frombuffer(buf, dtype=POINT_DTYPE, count=point_count, offset=pos)
+    pos += points.nbytes
+    progress_data = orjson.loads(bytes(buf[pos:pos + others_len]))
+
+    xs = _to_numbers(points["x"], (points["int_flags"] & 1).astype(bool))
+    ys = _to_numbers(points["y"], (points["int_flags"] & 2).astype(bool))
+    sorted_objs = []
+    for (tag, (view_cls, fields)), records in zip(_TYPE_SPECS.items(), records_list):
+        columns = []
+        number_index = 0
+        for name, kind in fields:
+            if kind == "s":
+                columns.append(strings[records[name]].tolist())
+            elif kind == "n":
+                columns.append(_to_numbers(records[name], (records["int_flags"] >> number_index & 1).astype(bool)))
+                number_index += 1
+            else:
+                columns.append([
+                    [{"x": x, "y": y} for x, y in zip(xs[offset:offset + count], ys[offset:offset + count])]
+                    for offset, count in zip(records["point_offset"].tolist(), records["point_count"].tolist())])
+        sorted_objs += map(view_cls, *columns)
+
+    # restore the order of the objects grouped by their types
+    order = np.argsort(tags, kind="stable")
+    inverse_order = np.empty_like(order)
+    inverse_order[order] = np.arange(len(order))
+    view_objs = [sorted_objs[i] for i in inverse_order.tolist()]
+
+    start = 0
+    for list_key, count in zip(VIEW_LIST_KEYS, list_counts):
+        progress_data[list_key] = view_objs[start:start + count]
+        start += count
+    return progress_data
+
+
+def view_object_to_dict(obj) -> dict:
+    """
+    Convert a view object to the json format of the web.
+    It could be used as the `default` of `json.dumps` and `orjson.dumps`.
+    """
+    json_type = _JSON_TYPES.get(type(obj))
+    if json_type is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    data = {"type": json_type}
+    for key, value in vars(obj).items():
+        if key.startswith("_"):
+            continue
+        data["font-style" if key == "font_style" else key] = value
+    return data
+
+
+def view_object_from_dict(data: dict):
+    """
+    Convert the json format of the web back to a view object
+    """
+    attrs = {("font_style" if key == "font-style" else key): value
+             for key, value in data.items() if key != "type"}
+    for view_cls, json_type in _JSON_TYPES.items():
+        if json_type == data["type"]:
+            return view_cls(**attrs)
+    raise ValueError(f"Unknown type of view object: {data['type']}")
@@ -35,7 +35,9 @@ setuptools.setup(
         "pygame==2.0.1",
         'pandas==1.4.1',
         "pydantic==1.9.0",
-        "websockets==10.2"
+        "websockets==10.2",
+        "orjson",
+        "numpy"
     ]
 
 )